@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# benchmark_viewport.py
+# Compares frames per second while panning a large level between the
+# raster and OpenGL level view viewports.
+#
+# Usage: python3 benchmark_viewport.py [-w WIDTH] [-t HEIGHT] [-f FRAMES]
+# (level size is in tiles.) To try Mesa's software renderer on a
+# headless machine, run it under xvfb-run with LIBGL_ALWAYS_SOFTWARE=1.
+
+
+################################################################
+################################################################
+
+# Imports
+import argparse
+import sys
+import time
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+Qt = QtCore.Qt
+
+import reggienext
+
+
+def makeLevelScene(width, height):
+    """
+    Make a LevelScene filled with one pixmap item per tile, which is
+    roughly what a very busy level looks like to the view
+    """
+    scene = reggienext.LevelScene(0, 0, width, height, None)
+
+    tiles = []
+    for hue in range(0, 360, 30):
+        pix = QtGui.QPixmap(24, 24)
+        pix.fill(QtGui.QColor.fromHsv(hue, 160, 200, 220))
+        tiles.append(pix)
+
+    for y in range(height):
+        for x in range(width):
+            item = QtWidgets.QGraphicsPixmapItem(tiles[(x * 7 + y * 3) % len(tiles)])
+            item.setScale(1 / 24)
+            item.setPos(x, y)
+            scene.addItem(item)
+
+    return scene
+
+
+def measurePanning(app, view, frames):
+    """
+    Pan the view from left to right, repainting once per step, and
+    return the number of frames per second achieved
+    """
+    scrollbar = view.horizontalScrollBar()
+    span = max(scrollbar.maximum() - scrollbar.minimum(), 1)
+    scrollbar.setValue(scrollbar.minimum())
+    app.processEvents()
+
+    start = time.perf_counter()
+    for i in range(frames):
+        scrollbar.setValue(scrollbar.minimum() + (i * span // frames))
+        view.viewport().repaint()
+        if view.hardwareAccelerated:
+            # Don't let the driver queue up frames we haven't paid for
+            view.viewport().makeCurrent()
+            reggienext.GL.glFinish()
+            view.viewport().doneCurrent()
+        app.processEvents()
+    elapsed = time.perf_counter() - start
+
+    return frames / elapsed
+
+
+def main():
+    """
+    Run the benchmark
+    """
+    parser = argparse.ArgumentParser(description='Compare raster and OpenGL level view panning performance.')
+    parser.add_argument('-w', '--width', type=int, default=512, help='level width, in tiles')
+    parser.add_argument('-t', '--height', type=int, default=64, help='level height, in tiles')
+    parser.add_argument('-f', '--frames', type=int, default=300, help='number of frames to render per viewport')
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+
+    print('>> Building a %dx%d tile level...' % (args.width, args.height))
+    scene = makeLevelScene(args.width, args.height)
+
+    results = []
+    for accelerated in (False, True):
+        name = 'OpenGL' if accelerated else 'Raster'
+
+        view = reggienext.LevelViewWidget(scene, None)
+        if not view.setHardwareAccelerated(accelerated):
+            print('>> %s: unavailable on this system; skipped' % name)
+            continue
+        if accelerated:
+            name += ' (%s)' % reggienext.getOpenGLInfo()[0]
+
+        view.zoomTiles(24)
+        view.resize(1280, 720)
+        view.show()
+        app.processEvents()
+
+        reggienext.getFrameScheduler().frameTimes.clear()
+        fps = measurePanning(app, view, args.frames)
+        results.append((name, fps))
+        print('>> %s: %.1f fps (%.2f ms per paint)' % (name, fps, reggienext.getFrameScheduler().averageFrameTime()))
+
+        view.close()
+        view.deleteLater()
+
+    if len(results) == 2:
+        print('>> OpenGL/raster ratio: %.2fx' % (results[1][1] / results[0][1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,27 @@
 # Module for the abstract NSMB series.
 
+import importlib
+import io
+import os
+import struct
+import sys
+
 from PyQt5 import QtWidgets, QtGui, QtCore
 
 import rn_api
+from lib import itemcolumns, objectlayout, records
+
+
+
+def getSpriteLib():
+    """
+    Return the spritelib module, which sprite image modules import as
+    "spritelib" from this folder
+    """
+    folder = os.path.dirname(os.path.abspath(__file__))
+    if folder not in sys.path:
+        sys.path.append(folder)
+    return importlib.import_module('spritelib')
 
 
 
@@ -11,7 +30,10 @@ class Level_NSMB_Abstract(rn_api.RLevel_2D):
     Class for an abstract NSMB level.
     """
 
-    STRUCT_SPRITES = None
+    # Block index -> lib.records.RecordFormat, for each course file
+    # block that's a list of records. Set by each game.
+    BLOCK_FORMATS = {}
+    OBJECT_FORMAT = None
 
     @classmethod
     def initClass(cls):
@@ -27,6 +49,545 @@ class Level_NSMB_Abstract(rn_api.RLevel_2D):
         Initialize the abstract NSMB level
         """
         super().__init__()
+        self.areas = []
+
+
+    def areaCount(self):
+        """
+        Return the number of areas in the level
+        """
+        return max(len(self.areas), 1)
+
+
+    def preload(self):
+        """
+        Decode every area's blocks and layers, and build its item
+        columns, ahead of time
+        """
+        for i, area in enumerate(self.areas):
+            for idx in self.BLOCK_FORMATS:
+                area.decodeBlock(idx)
+            for layer in range(len(area.layers)):
+                area.objects(layer)
+            area.objectColumns()
+            area.spriteColumns()
+            yield (i + 1) / len(self.areas)
+
+
+    def spriteTypes(self):
+        """
+        Return the type of every sprite in the level
+        """
+        types = []
+        for area in self.areas:
+            types.extend(area.decodeBlock(self.BLOCK_SPRITES).column('type'))
+        return types
+
+
+    def tilesetNames(self):
+        """
+        Return the set of tilesets used by any area
+        """
+        names = set()
+        for area in self.areas:
+            names.update(area.tilesetNames())
+        names.discard('')
+        return names
+
+
+    def areaTilesetNames(self, area):
+        """
+        Return the names of the four tilesets area uses
+        """
+        if area >= len(self.areas): return []
+        return self.areas[area].tilesetNames()
+
+
+    def setAreaTilesetNames(self, area, names):
+        """
+        Change the four tilesets area uses
+        """
+        self.areas[area].setTilesetNames(names)
+
+
+    def tilesetImageLoaded(self, filename, image):
+        """
+        Give sprite images the tiles of tileset 0, which some of them
+        draw
+        """
+        if any(area.tilesetNames()[0] == filename for area in self.areas):
+            getSpriteLib().loadTiles(image)
+
+
+    def itemColumns(self, area):
+        """
+        Return the objects and sprites in area as item columns
+        """
+        if area >= len(self.areas): return []
+        a = self.areas[area]
+        return [
+            (a.objectColumns(), ObjectPresenter_NSMB_Abstract.forTilesets(a.tilesetNames())),
+            (a.spriteColumns(), SpritePresenter_NSMB_Abstract),
+            ]
+
+
+    def cacheState(self):
+        """
+        Return each area's decoded records and item columns
+        """
+        return [area.cacheState() for area in self.areas]
+
+
+    def restoreCacheState(self, state):
+        """
+        Put back the decoded records and item columns from cacheState()
+        """
+        for area, areaState in zip(self.areas, state):
+            area.restoreCacheState(areaState)
+
+
+    def releaseArea(self, area):
+        """
+        Drop the decoded records for area; they're decoded again if
+        they're needed
+        """
+        if area < len(self.areas):
+            self.areas[area].release()
+
+
+    def save(self):
+        """
+        Save the level to binary data. Prefer saveTo() or
+        saveToFile(), which don't build the whole level in memory.
+        """
+        f = io.BytesIO()
+        self.saveTo(f)
+        return f.getvalue()
+
+
+
+class CourseError(Exception):
+    """
+    Raised when an area's course file is malformed
+    """
+    pass
+
+
+
+class Area_NSMB_Abstract:
+    """
+    One area of an NSMB level. Holds memoryviews of the area's files,
+    and slices them into blocks only when asked.
+    """
+    BLOCK_COUNT = 14
+    BLOCK_TILESETS = 0
+    BLOCK_ALIGNMENT = 4
+    TILESET_NAME_LENGTH = 32
+    SPRITE_DATA_SIZE = 8
+    SPRITE_UNITS_PER_TILE = 16
+
+    def __init__(self, level, number, course, layers):
+        """
+        Initialize the area from its course file and layer files
+        (None for missing layers)
+        """
+        if len(course) < self.BLOCK_COUNT * 8:
+            raise CourseError('The course file of area %d is too short' % number)
+
+        self.level = level
+        self.number = number
+        self.course = course
+        self.layers = layers
+        self._blocks = None
+        self._decodedBlocks = {}
+        self._decodedLayers = {}
+
+        # Serialized blocks and layers that have been edited since
+        # loading. Anything not in here is saved straight from the
+        # original file without being re-encoded.
+        self._encodedBlocks = {}
+        self._encodedLayers = {}
+        self._dirtyBlocks = set()
+        self._dirtyLayers = set()
+
+        # lib.itemcolumns.ItemColumns built from the decoded records,
+        # with the version they were last synced at
+        self._objectColumns = self._spriteColumns = None
+        self._objectColumnsVersion = self._spriteColumnsVersion = None
+
+
+    @property
+    def blocks(self):
+        """
+        The course file's blocks, as memoryview slices
+        """
+        if self._blocks is None:
+            course = self.course
+            header = struct.iter_unpack('>II', course[:self.BLOCK_COUNT * 8])
+            blocks = []
+            for offset, size in header:
+                if offset + size > len(course):
+                    raise CourseError('Block %d of area %d extends past the end of its course file' % (len(blocks), self.number))
+                blocks.append(course[offset:offset + size])
+            self._blocks = blocks
+        return self._blocks
+
+
+    def decodeBlock(self, idx):
+        """
+        Return block idx decoded into a lib.records.RecordTable. The
+        result is cached, and is meant to be shared: don't modify it.
+        """
+        if idx not in self._decodedBlocks:
+            self._decodedBlocks[idx] = self.level.BLOCK_FORMATS[idx].decode(self.blockBytes(idx))
+        return self._decodedBlocks[idx]
+
+
+    def objects(self, layer):
+        """
+        Return the objects in layer as a lib.records.RecordTable
+        """
+        if layer not in self._decodedLayers:
+            data = self.layerBytes(layer)
+            if data is None: data = b''
+            self._decodedLayers[layer] = self.level.OBJECT_FORMAT.decode(data)
+        return self._decodedLayers[layer]
+
+
+    def objectTypes(self, layer):
+        """
+        Return (tileset numbers, object numbers) for the objects in
+        layer, as two columns. Both are packed into the "type" field.
+        """
+        types = self.objects(layer).column('type')
+        if isinstance(types, list):
+            return [t >> 12 for t in types], [t & 0xFFF for t in types]
+        return types >> 12, types & 0xFFF
+
+
+    def replaceBlock(self, idx, newRecords):
+        """
+        Replace the contents of block idx with newRecords (tuples in field
+        order), and mark it as needing to be re-encoded
+        """
+        fmt = self.level.BLOCK_FORMATS[idx]
+        self._decodedBlocks[idx] = records.RecordTable(fmt, [fmt.record._make(r) for r in newRecords])
+        self._dirtyBlocks.add(idx)
+
+        # Sprites such as liquids and fog are drawn to fit their zone
+        # or location
+        if idx == self.level.BLOCK_ZONES:
+            getSpriteLib().zonesRepositioned()
+        elif idx == self.level.BLOCK_LOCATIONS:
+            getSpriteLib().locationsRepositioned()
+
+
+    def replaceObjects(self, layer, newRecords):
+        """
+        Replace the objects in layer with newRecords (tuples in field
+        order), and mark the layer as needing to be re-encoded
+        """
+        fmt = self.level.OBJECT_FORMAT
+        self._decodedLayers[layer] = records.RecordTable(fmt, [fmt.record._make(r) for r in newRecords])
+        self._dirtyLayers.add(layer)
+
+
+    def blockBytes(self, idx):
+        """
+        Return the serialized contents of block idx, only re-encoding
+        it if it was edited since it was last serialized
+        """
+        if idx in self._dirtyBlocks:
+            table = self._decodedBlocks[idx]
+            self._encodedBlocks[idx] = table.format.encode(table.tuples())
+            self._dirtyBlocks.discard(idx)
+        return self._encodedBlocks.get(idx, self.blocks[idx])
+
+
+    def layerBytes(self, layer):
+        """
+        Return the serialized contents of layer (None if the area has
+        no such layer), re-encoding it only if it was edited
+        """
+        if layer in self._dirtyLayers:
+            table = self._decodedLayers[layer]
+            self._encodedLayers[layer] = table.format.encode(table.tuples()) if len(table) else None
+            self._dirtyLayers.discard(layer)
+        if layer in self._encodedLayers:
+            return self._encodedLayers[layer]
+        return self.layers[layer]
+
+
+    def objectColumns(self):
+        """
+        Return the objects in all layers as one ItemColumns
+        """
+        if self._objectColumns is None:
+            columns = itemcolumns.ItemColumns()
+            for layer in range(len(self.layers)):
+                table = self.objects(layer)
+                columns.extend(table.column('type'), table.column('x'), table.column('y'),
+                    table.column('width'), table.column('height'), [layer] * len(table))
+            self._objectColumns = columns
+            self._objectColumnsVersion = columns.version
+        return self._objectColumns
+
+
+    def spriteColumns(self):
+        """
+        Return the sprites as an ItemColumns. Each sprite is one tile
+        in size; its settings are the item data.
+        """
+        if self._spriteColumns is None:
+            table = self.decodeBlock(self.level.BLOCK_SPRITES)
+            count = len(table)
+            data = table.column('data')
+            data = data.tobytes() if table.isNumpy else b''.join(data)
+
+            unit = self.SPRITE_UNITS_PER_TILE
+            columns = itemcolumns.ItemColumns(self.SPRITE_DATA_SIZE, unit)
+            columns.extend(table.column('type'), table.column('x'), table.column('y'),
+                [unit] * count, [unit] * count, [0] * count, data)
+            self._spriteColumns = columns
+            self._spriteColumnsVersion = columns.version
+        return self._spriteColumns
+
+
+    def syncColumns(self):
+        """
+        Copy any edits made through the item columns back into the
+        records, so they're saved
+        """
+        columns = self._objectColumns
+        if columns is not None and columns.version != self._objectColumnsVersion:
+            for layer in range(len(self.layers)):
+                self.replaceObjects(layer, [
+                    (c.type, c.x, c.y, c.width, c.height) for c in columns if c.layer == layer])
+            self._objectColumnsVersion = columns.version
+
+        columns = self._spriteColumns
+        if columns is not None and columns.version != self._spriteColumnsVersion:
+            self.replaceBlock(self.level.BLOCK_SPRITES, [
+                (c.type, c.x, c.y, c.data) for c in columns])
+            self._spriteColumnsVersion = columns.version
+
+
+    def cacheState(self):
+        """
+        Return this area's decoded records and item columns, in a
+        picklable form
+        """
+        def plain(table):
+            # namedtuple classes made at runtime can't be pickled
+            return table.records if table.isNumpy else table.tuples()
+
+        return {
+            'blocks': {idx: plain(table) for idx, table in self._decodedBlocks.items()},
+            'layers': {layer: plain(table) for layer, table in self._decodedLayers.items()},
+            'objectColumns': self._objectColumns,
+            'spriteColumns': self._spriteColumns,
+            }
+
+
+    def restoreCacheState(self, state):
+        """
+        Restore what cacheState() returned
+        """
+        def table(fmt, rows):
+            if not isinstance(rows, list): return records.RecordTable(fmt, rows)
+            return records.RecordTable(fmt, [fmt.record._make(r) for r in rows])
+
+        for idx, rows in state['blocks'].items():
+            self._decodedBlocks[idx] = table(self.level.BLOCK_FORMATS[idx], rows)
+        for layer, rows in state['layers'].items():
+            self._decodedLayers[layer] = table(self.level.OBJECT_FORMAT, rows)
+
+        self._objectColumns = state['objectColumns']
+        self._spriteColumns = state['spriteColumns']
+        if self._objectColumns is not None:
+            self._objectColumnsVersion = self._objectColumns.version
+        if self._spriteColumns is not None:
+            self._spriteColumnsVersion = self._spriteColumns.version
+
+
+    def release(self):
+        """
+        Drop all decoded records and item columns. Edits are encoded
+        first, so nothing is lost; only the serialized bytes are kept.
+        """
+        self.syncColumns()
+        self._objectColumns = self._spriteColumns = None
+
+        for idx in list(self._dirtyBlocks):
+            self.blockBytes(idx)
+        for layer in list(self._dirtyLayers):
+            self.layerBytes(layer)
+        self._decodedBlocks.clear()
+        self._decodedLayers.clear()
+
+
+    def courseChunks(self):
+        """
+        Generator that yields the serialized course file in chunks:
+        the block offset table, then each block
+        """
+        blocks = [self.blockBytes(i) for i in range(self.BLOCK_COUNT)]
+
+        header = bytearray()
+        offset = self.BLOCK_COUNT * 8
+        for block in blocks:
+            header += struct.pack('>II', offset, len(block))
+            offset += len(block) + self.paddingAfter(len(block))
+        yield header
+
+        for block in blocks:
+            yield block
+            yield bytes(self.paddingAfter(len(block)))
+
+
+    def paddingAfter(self, size):
+        """
+        Return how many bytes of padding follow a block of this size
+        """
+        return -size % self.BLOCK_ALIGNMENT
+
+
+    def tilesetNames(self):
+        """
+        Return the names of the four tilesets this area uses ('' for
+        empty slots)
+        """
+        block = self.blockBytes(self.BLOCK_TILESETS)
+        length = self.TILESET_NAME_LENGTH
+        names = []
+        for i in range(4):
+            raw = bytes(block[i * length:(i + 1) * length])
+            names.append(raw.split(b'\0', 1)[0].decode('latin-1'))
+        return names
+
+
+    def setTilesetNames(self, names):
+        """
+        Change the names of the four tilesets this area uses. Anything
+        in the block after the names is kept.
+        """
+        block = self.blockBytes(self.BLOCK_TILESETS)
+        length = self.TILESET_NAME_LENGTH
+        new = bytearray()
+        for name in names:
+            raw = name.encode('latin-1')[:length - 1]
+            new += raw + bytes(length - len(raw))
+        new += block[len(new):]
+        self._encodedBlocks[self.BLOCK_TILESETS] = bytes(new)
+
+
+
+class ObjectPresenter_NSMB_Abstract(rn_api.RLevelItemPresenter_2D):
+    """
+    Presenter for an object. Objects are drawn from the tilesets in
+    TILESETS (one name per slot, '' if empty), so each area gets its own
+    subclass from forTilesets().
+    """
+    TILESETS = ('', '', '', '')
+
+    # Tileset images are grids of 32x32 cells, each holding a 24x24
+    # tile with a 4-pixel border
+    TILE_SIZE = 24
+    CELL_SIZE = 32
+    CELL_BORDER = 4
+
+    subclasses = {}  # tileset names -> subclass
+
+    @classmethod
+    def forTilesets(cls, names):
+        """
+        Return the subclass that draws objects from these tilesets
+        """
+        names = tuple(names)
+        if names not in cls.subclasses:
+            cls.subclasses[names] = type(cls.__name__, (cls,), {'TILESETS': names})
+        return cls.subclasses[names]
+
+
+    def label(self):
+        """
+        Label the object with its tileset and object numbers
+        """
+        objType = self.columns.type[self.index]
+        return '%d:%d' % (objType >> 12, objType & 0xFFF)
+
+
+    def usesTileset(self, filename):
+        """
+        Objects can be drawn from any of the area's tilesets
+        """
+        return filename in self.TILESETS
+
+
+    def paint(self, painter, option, widget=None):
+        """
+        Draw the object's prerendered pixmap, or a labeled box if it
+        can't be drawn (yet)
+        """
+        if self.columns is None: return
+
+        pixmap = None
+        catalog = self.resources
+        if catalog is not None:
+            objType = self.columns.type[self.index]
+            slot, number = objType >> 12, objType & 0xFFF
+            width, height = self.columns.width[self.index], self.columns.height[self.index]
+            pixmap = catalog.objectPixmap(
+                (self.TILESETS, slot, number, width, height),
+                lambda: self.render(catalog, slot, number, width, height))
+
+        if pixmap is None:
+            super().paint(painter, option, widget)
+        else:
+            painter.drawPixmap(self.rect, pixmap, QtCore.QRectF(pixmap.rect()))
+
+
+    def render(self, catalog, slot, number, width, height):
+        """
+        Draw an object at the given size (in tiles) from the tilesets in
+        catalog, or return None if it can't be drawn yet
+        """
+        if slot >= len(self.TILESETS) or not self.TILESETS[slot]: return None
+        objects = catalog.objects(self.TILESETS[slot])
+        if not objects or number >= len(objects): return None
+
+        grid = objectlayout.layoutObject(objects[number], width, height)
+        slots = {tile >> 8 for row in grid for tile in row if tile != objectlayout.EMPTY}
+        if any(s >= len(self.TILESETS) or not self.TILESETS[s] for s in slots): return None
+
+        # Wait until every tileset the object uses has been decoded, so
+        # nothing half-drawn gets cached
+        images = {s: catalog.readyImage(self.TILESETS[s]) for s in slots}
+        if any(image is None for image in images.values()): return None
+
+        size, cell, border = self.TILE_SIZE, self.CELL_SIZE, self.CELL_BORDER
+        pixmap = QtGui.QPixmap(width * size, height * size)
+        pixmap.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(pixmap)
+        for y, row in enumerate(grid):
+            for x, tile in enumerate(row):
+                if tile == objectlayout.EMPTY: continue
+                image = images[tile >> 8]
+                tile &= 0xFF
+                columns = image.width() // cell
+                source = QtCore.QRectF((tile % columns) * cell + border, (tile // columns) * cell + border, size, size)
+                painter.drawImage(QtCore.QRectF(x * size, y * size, size, size), image, source)
+        painter.end()
+        return pixmap
+
+
+
+class SpritePresenter_NSMB_Abstract(rn_api.RLevelItemPresenter_2D):
+    """
+    Presenter for a sprite
+    """
+    FILL = QtGui.QColor(196, 0, 64, 120)
+    OUTLINE = QtGui.QColor(196, 0, 64)
 
 
 
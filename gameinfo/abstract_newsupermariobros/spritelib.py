@@ -31,6 +31,7 @@
 
 # Imports
 import os.path
+import weakref
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 Qt = QtCore.Qt
@@ -41,12 +42,17 @@ OutlineBrush = None
 ImageCache = {}
 Tiles = {}
 SpriteImagesLoaded = set()
+SpriteImages = weakref.WeakSet()  # every live SpriteImage
 
 SpritesFolders = []
 RealViewEnabled = False
 Area = None
 MapPositionToZoneID = None
 
+DirtyRects = {}
+InvalidationQueued = False
+MAX_DIRTY_RECTS = 32
+
 
 ################################################################
 ################################################################
@@ -104,21 +110,149 @@ def loadIfNotInImageCache(name, filename):
 
 
 
+class TilesetTile():
+    """
+    A tile from tileset 0, as sprite images draw it
+    """
+    def __init__(self, main):
+        self.main = main
+
+
+def loadTiles(image):
+    """
+    Fills Tiles from the decoded image of tileset 0. The image is a grid
+    of 32x32 cells, each holding a 24x24 tile with a 4-pixel border.
+    """
+    columns = image.width() // 32
+    for i in range(columns * (image.height() // 32)):
+        x, y = (i % columns) * 32 + 4, (i // columns) * 32 + 4
+        Tiles[i] = TilesetTile(QtGui.QPixmap.fromImage(image.copy(x, y, 24, 24)))
+
+
 def getNearestZoneTo(objx, objy):
     """
     Returns the nearest zone to the given position
     """
-    print('getNearestZoneTo(%d, %d):' % (objx, objy))
     if not hasattr(Area, 'zones'):
-        print('    not hasattr; bye bye')
         return None
 
     id = MapPositionToZoneID(Area.zones, objx, objy, True)
     for z in Area.zones:
         if z.id == id:
-            print(('    Found something for id %d; returning ' % id) + str(z))
             return z
-    print('    Found nothing for id %d; bye bye' % id)
+
+
+def invalidate(scene, rect):
+    """
+    Marks rect (in scene coordinates) as needing to be repainted.
+    Rects invalidated during one event loop iteration are merged
+    and sent to the scene together, right before the next frame.
+    """
+    global InvalidationQueued
+    if scene is None or rect is None or rect.isEmpty(): return
+
+    DirtyRects.setdefault(scene, []).append(QtCore.QRectF(rect))
+
+    if not InvalidationQueued:
+        InvalidationQueued = True
+        QtCore.QTimer.singleShot(0, flushInvalidations)
+
+
+def invalidateSprite(imageObj):
+    """
+    Call this from a sprite image whenever it changes in a way
+    Qt doesn't already know about. Invalidates the sprite and its
+    auxiliary items, and the areas its Real View effects covered
+    before and cover now.
+    """
+    item = imageObj.parent
+    scene = item.scene()
+    if scene is None: return
+
+    invalidate(scene, item.mapRectToScene(item.boundingRect() | item.childrenBoundingRect()))
+
+    newRect = imageObj.realViewRect() if RealViewEnabled else None
+    invalidate(scene, imageObj.lastRealViewRect)
+    invalidate(scene, newRect)
+    imageObj.lastRealViewRect = newRect
+
+
+def flushInvalidations():
+    """
+    Sends all pending dirty rects to their scenes
+    """
+    global InvalidationQueued
+    InvalidationQueued = False
+
+    pending = list(DirtyRects.items())
+    DirtyRects.clear()
+
+    for scene, rects in pending:
+        for rect in mergeRects(rects):
+            scene.update(rect)
+
+
+def mergeRects(rects):
+    """
+    Merges a list of QRectFs into a shorter list that still covers
+    all of them. Two rects are merged only if that doesn't make Qt
+    repaint much more than it otherwise would.
+    """
+    merged = []
+    for rect in rects:
+        # Keep merging until this rect doesn't combine with anything
+        changed = True
+        while changed:
+            changed = False
+            for i, other in enumerate(merged):
+                union = rect.united(other)
+                unionArea = union.width() * union.height()
+                sumArea = rect.width() * rect.height() + other.width() * other.height()
+                if rect.intersects(other) or unionArea <= sumArea * 1.25:
+                    rect = union
+                    del merged[i]
+                    changed = True
+                    break
+        merged.append(rect)
+
+    if len(merged) > MAX_DIRTY_RECTS:
+        # Too fragmented to be worth it
+        bounds = merged[0]
+        for rect in merged[1:]:
+            bounds = bounds.united(rect)
+        return [bounds]
+
+    return merged
+
+
+def zonesRepositioned():
+    """
+    Call this whenever zones are moved or resized. Tells every sprite
+    image, so the ones that depend on zones can update.
+    """
+    for imageObj in list(SpriteImages):
+        imageObj.zoneRepositioned()
+
+
+def locationsRepositioned():
+    """
+    Call this whenever locations are moved or resized. Tells every
+    sprite image, so the ones that depend on locations can update.
+    """
+    for imageObj in list(SpriteImages):
+        imageObj.locationRepositioned()
+
+
+def getLocationByID(id):
+    """
+    Returns the location with the given id, or None
+    """
+    if not hasattr(Area, 'locations'):
+        return None
+
+    for loc in Area.locations:
+        if loc.id == id:
+            return loc
 
 
 
@@ -145,6 +279,8 @@ class SpriteImage():
         self.dimensions = 0, 0, 16, 16
         self.scale = scale
         self.aux = []
+        self.lastRealViewRect = None
+        SpriteImages.add(self)
 
     @staticmethod
     def loadImages():
@@ -165,12 +301,31 @@ class SpriteImage():
         """
         pass
 
+    def zoneRepositioned(self):
+        """
+        Called whenever a zone is moved or resized
+        """
+        pass
+
+    def locationRepositioned(self):
+        """
+        Called whenever a location is moved or resized
+        """
+        pass
+
     def paint(self, painter):
         """
         Paints the sprite
         """
         pass
 
+    def realViewRect(self):
+        """
+        Returns the scene rect covered by the sprite's Real View
+        effects, if any, for invalidateSprite()
+        """
+        return None
+
     # Offset property
     def getOffset(self):
         return (self.xOffset, self.yOffset)
@@ -688,8 +843,7 @@ class AuxiliaryImage_FollowsRect(AuxiliaryImage):
         self.setPos(newx, newy)
 
         # Update the affected area of the scene
-        if self.scene() is not None:
-            self.scene().update(oldx + parent.x(), oldy + parent.y(), self.width, self.height)
+        invalidate(self.scene(), QtCore.QRectF(oldx + parent.x(), oldy + parent.y(), self.width, self.height))
 
 
 class AuxiliaryZoneItem(AuxiliaryItem, QtWidgets.QGraphicsItem):
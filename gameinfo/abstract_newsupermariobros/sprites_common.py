@@ -295,11 +295,15 @@ class SpriteImage_OldStoneBlock(SLib.SpriteImage): # 30, 81, 82, 83, 84, 85, 86
 
 
 class SpriteImage_LiquidOrFog(SLib.SpriteImage): # 64, 138, 139, 216, 358, 374, 435
-    
+
     class FreeAuxiliaryItem_LiquidOrFog(QtWidgets.QGraphicsItem):
         """
         An item that acts sort of like an auxiliary item, but isn't one. Biggest difference is that the sprite isn't its parent.
         It paints liquid or fog in a zone or location.
+
+        All geometry is worked out in updateSize(), which must be called
+        whenever the sprite, zone or location changes. paint() only draws
+        the cached tiled pixmaps, and never changes anything.
         """
         def __init__(self, imageObj):
             super().__init__()
@@ -309,6 +313,9 @@ class SpriteImage_LiquidOrFog(SLib.SpriteImage): # 64, 138, 139, 216, 358, 374,
             self.BoundingRect = QtCore.QRectF(0, 0, 0, 0)
             self.mode = 'z' # 'z' = zones, 'l' = locations
 
+            # Tuple of (x, y, width, height, pixmap), in local coordinates
+            self.tiles = ()
+
         def boundingRect(self):
             """
             Required by Qt
@@ -316,190 +323,77 @@ class SpriteImage_LiquidOrFog(SLib.SpriteImage): # 64, 138, 139, 216, 358, 374,
             return self.BoundingRect
 
         def paint(self, painter, option, widget=None):
-            painter.setClipRect(option.rect)
-
-            y, h = self.y(), self.OuterRect.height()
-
-            # Get info
-            selfTop = self.OuterRect.y()
-            spriteTop = self.ImageObj.parent.y()
-            y = spriteTop
-            h -= spriteTop - selfTop
-
-            # Create the new bounding rect
-            print(h)
-            y = max(0, y)
-            h = max(0, h)
-            self.BoundingRect = QtCore.QRectF(self.OuterRect)
-            self.setY(y)
-            self.BoundingRect.setHeight(h)
-
-            # # Determine the rise and top to be drawn, if any
-            # riseToDraw = self.ImageObj.rise if self.ImageObj.drawCrest else self.ImageObj.riseCrestless          
-
-            # Temp stuff: paint the bounding rect
-            painter.setBrush(QtGui.QBrush(Qt.red))
-            painter.save()
-            painter.setOpacity(0.2)
-            painter.drawRect(0, 0, self.BoundingRect.width(), self.BoundingRect.height())
-            painter.restore()
-            self.scene().update()
-
-            # # Paint the water top
-            # if self.waterTopUsesRise:
-            #     wTNRPH = self.waterTopNonRisePartHeight
-            #     crestToDraw = self.imageObj.crest if self.imageObj.drawCrest else self.imageObj.mid
-            #     painter.drawTiledPixmap(0, self.waterTop, self.BoundingRect.width(), wTNRPH, crestToDraw)
-            #     painter.drawTiledPixmap(0, self.waterTop + wTNRPH, self.BoundingRect.width(), riseToDraw.height() - wTNRPH, riseToDraw, 0, wTNRPH)
-            # else:
-            #     drawCrest = self.imageObj.drawCrest
-            #     if self.waterTopCrestOverride is not None:
-            #         drawCrest = self.waterTopCrestOverride
-            #     if drawCrest:
-            #         painter.drawTiledPixmap(0, self.waterTop, self.BoundingRect.width(), min(self.waterDepth, self.imageObj.crest.height()), self.imageObj.crest)
-            #         painter.drawTiledPixmap(0, self.waterTop + self.imageObj.crest.height(), self.BoundingRect.width(), max(0, self.waterDepth - self.imageObj.crest.height()), self.imageObj.mid)
-            #     else:
-            #         painter.drawTiledPixmap(0, self.waterTop, self.BoundingRect.width(), self.waterDepth, self.imageObj.mid)
-
-            # # Paint the rise, if going up
-            # if self.imageObj.risingHeight > 0:
-            #     painter.drawTiledPixmap(0, 0, self.BoundingRect.width(), riseToDraw.height(), riseToDraw)
-
-            # # Paint the rise, if going down
-            # if self.imageObj.risingHeight < 0:
-            #     painter.drawTiledPixmap(0, -self.imageObj.risingHeight, self.BoundingRect.width(), riseToDraw.height(), riseToDraw)
+            if not SLib.RealViewEnabled: return
+            painter.setClipRect(option.exposedRect)
 
+            for x, y, w, h, pix in self.tiles:
+                painter.drawTiledPixmap(QtCore.QRectF(x, y, w, h), pix)
 
         def updateSize(self):
             """
-            Updates the size and position of the aux
+            Updates the size and position of the aux, and works out
+            where each of the crest, mid and rise pixmaps will go
             """
-            if None in (self.OuterRect, self.ImageObj.rise, self.ImageObj.riseCrestless): return
-
-            # # Reset stuff
-            # self.waterTop = 0
-            # self.waterDepth = 0
-            # self.riseTop = 0
-            # self.waterTopUsesRise = False
-            # self.waterTopNonRisePartHeight = 0
-            # self.waterTopCrestOverride = None
-
-            # # Determine the rise to be drawn, if any
-            # riseToDraw = self.imageObj.rise if self.imageObj.drawCrest else self.imageObj.riseCrestless
-
-            # # Realign
-            # self.alignToZone()
-            # width = self.BoundingRect.width()
-
-            # # Keep track of the old position
-            # oldy, oldh = self.y(), self.BoundingRect.height()
-
-            # # First, calculate simple offsets
-            # self.waterTop = 0
-            # if self.imageObj.top < 0:
-            #     self.waterTop = 0
-            #     self.waterTopCrestOverride = False
-            #     if self.imageObj.risingHeight > 0:
-            #         self.waterTop += self.imageObj.risingHeight
-            # self.waterDepth = self.BoundingRect.height() - self.imageObj.top
-            # if self.waterDepth < riseToDraw.height():
-            #     self.waterDepth = riseToDraw.height()
-            # if self.imageObj.risingHeight > 0:
-            #     self.waterTop = self.imageObj.risingHeight
-            #     if self.imageObj.top < 0:
-            #         self.waterTop += self.imageObj.top
-            # elif self.imageObj.risingHeight < 0:
-            #     self.riseTop = -self.imageObj.risingHeight
-            # if self.BoundingRect.height() - self.imageObj.top < riseToDraw.height():
-            #     self.waterTopUsesRise = True
-            #     self.waterTopNonRisePartHeight = self.BoundingRect.height() - self.imageObj.top
-            #     self.waterTopNonRisePartHeight = max(0, self.waterTopNonRisePartHeight)
-
-            # print('------------------')
-            # print(self.waterTop)
-            # print(self.waterDepth)
-            # print(self.riseTop)
-            # print(self.waterTopUsesRise)
-            # print(self.waterTopNonRisePartHeight)
-            # print(self.waterTopCrestOverride)
-
-            # # Determine the top edge
-            # y = self.imageObj.top
-
-            # # Don't allow negative y
-            # y = max(0, y)
-
-            # # Determine the height
-            # h = self.BoundingRect.height() - y
-
-            # # Special case: if there is a rise going up
-            # if self.imageObj.risingHeight > 0:
-            #     y = self.imageObj.top - self.imageObj.risingHeight
-            #     h += self.imageObj.risingHeight
-
-            # # Don't allow negative height
-            # h = max(h, 0)
-
-            # # Special case: if the water to be drawn is smaller than the rise image
-            # if y + self.waterTop > self.BoundingRect.height() - riseToDraw.height():
-            #     h = riseToDraw.height()
-            #     if self.imageObj.risingHeight > 0:
-            #         h += self.imageObj.risingHeight
-
-            # # Special case: if there is a rise going down
-            # if self.imageObj.risingHeight < 0:
-            #     h = max(h, -self.imageObj.risingHeight + riseToDraw.height())
-
-            # # Set the settings
-            # self.setPos(0, y)
-            # self.BoundingRect.setHeight(h)
-
-            # # Update the old area
-            # self.parent.scene().update(self.parent.x(), self.parent.y() + oldy, width, oldh)
-
-        def paintLiquidInRect(self, painter, rect):
+            imageObj = self.ImageObj
+
+            if self.OuterRect is None or imageObj.mid is None:
+                self.setTiles(QtCore.QRectF(0, 0, 0, 0), ())
+                return
+
+            outer = self.OuterRect
+            width = outer.width()
+            outerTop, outerBottom = outer.top(), outer.bottom()
+
+            # Find the liquid surface
+            if imageObj.topAtSpritePos:
+                surface = imageObj.parent.objy * 1.5
+                surface = min(max(surface, outerTop), outerBottom)
+            else:
+                surface = outerTop
+
+            # Find the rise, if any
+            rise = imageObj.rise if imageObj.drawCrest else imageObj.riseCrestless
+            if rise is None or imageObj.risingHeight == 0:
+                rise = None
+                riseY = surface
+            else:
+                riseY = surface - imageObj.risingHeight * 24
+                riseY = min(max(riseY, outerTop), outerBottom)
+
+            top = min(surface, riseY)
+            bottom = outerBottom
+
+            # Lay out the pixmaps, top to bottom
+            tiles = []
+            y = surface
+            crest = imageObj.crest
+            if imageObj.drawCrest and imageObj.topAtSpritePos and crest is not None:
+                h = min(crest.height(), bottom - y)
+                if h > 0:
+                    tiles.append((0, y - top, width, h, crest))
+                    y += h
+            if bottom > y:
+                tiles.append((0, y - top, width, bottom - y, imageObj.mid))
+            if rise is not None:
+                h = min(rise.height(), bottom - riseY)
+                if h > 0:
+                    tiles.append((0, riseY - top, width, h, rise))
+
+            self.setTiles(QtCore.QRectF(outer.x(), top, width, bottom - top), tiles)
+
+        def setTiles(self, rect, tiles):
             """
-            Generic liquid-in-rect painter
+            Moves the aux to the scene rect given, and sets the pixmaps
+            to be drawn in it
             """
-            return
-        #     rx, ry, rw, rh = rect.topLeft().x(), rect.topLeft().y(), rect.width(), rect.height()
-
-        #     drawRise = self.risingHeight != 0
-        #     drawCrest = self.drawCrest
-        #     drawRiseCrest = drawCrest
-
-        #     # Get positions
-        #     offsetFromTop = self.top
-        #     if offsetFromTop < 0:
-        #         offsetFromTop = 0
-        #         drawCrest = False # off the top of the rect; no crest
-        #     if self.top > rh:
-        #         # the sprite is below the rect; don't draw anything
-        #         return
-
-        #     # If all that fits in the rect is some of the crest, determine how much
-        #     if drawCrest:
-        #         crestSizeRemoval = (ry + offsetFromTop + self.crest.height()) - (ry + rh)
-        #         if crestSizeRemoval < 0: crestSizeRemoval = 0
-        #         crestHeight = self.crest.height() - crestSizeRemoval
-
-        #     # Determine where to put the rise image
-        #     offsetRise = offsetFromTop - self.risingHeight
-        #     riseToDraw = self.rise
-        #     if not drawRiseCrest:
-        #         riseToDraw = self.riseCrestless
-
-        #     # Draw everything!
-        #     if drawCrest:
-        #         painter.drawTiledPixmap(0, offsetFromTop, rw, crestHeight, self.crest)
-        #         painter.drawTiledPixmap(0, offsetFromTop + crestHeight, rw, rh - crestHeight - offsetFromTop, self.mid)
-        #     else:
-        #         painter.drawTiledPixmap(0, offsetFromTop, rw, rh - offsetFromTop - 4, self.mid)
-        #     if drawRise:
-        #         painter.drawTiledPixmap(0, offsetRise, rw, riseToDraw.height(), riseToDraw)
+            self.prepareGeometryChange()
+            self.setPos(rect.x(), rect.y())
+            self.BoundingRect = QtCore.QRectF(0, 0, rect.width(), max(rect.height(), 0))
+            self.tiles = tuple(tiles)
+            self.update()
 
-    def __init__(self, parent):
-        super().__init__(parent)
+    def __init__(self, parent, scale=1.5):
+        super().__init__(parent, scale)
 
         self.updateSceneAfterZoneMoved = True
         self.updateSceneAfterLocationMoved = True
@@ -509,43 +403,55 @@ class SpriteImage_LiquidOrFog(SLib.SpriteImage): # 64, 138, 139, 216, 358, 374,
         self.rise = None
         self.riseCrestless = None
 
-        self.top = 0
-
+        self.topAtSpritePos = False
         self.drawCrest = False
-        self.risingHeight = 0
+        self.risingHeight = 0 # in tiles; negative if falling
 
-        self.paintZone = False
+        self.paintZone = True
+        self.locationID = 0
 
         self.LiqOrFogAux = self.FreeAuxiliaryItem_LiquidOrFog(self)
         self.parent.scene().addItem(self.LiqOrFogAux)
 
-    def dataChanged(self):
-        super().dataChanged()
-        
-        z = SLib.getNearestZoneTo(self.parent.objx, self.parent.objy)
-        if z is not None:
-            self.LiqOrFogAux.OuterRect = QtCore.QRectF(z.BoundingRect)
+    def updateAux(self):
+        """
+        Finds the zone or location to paint in, and updates the aux
+        """
+        rect = None
+        if self.paintZone:
+            z = SLib.getNearestZoneTo(self.parent.objx, self.parent.objy)
+            if z is not None:
+                rect = QtCore.QRectF(z.x() + 4, z.y(), z.BoundingRect.width() - 8, z.BoundingRect.height())
+            self.LiqOrFogAux.mode = 'z'
+        else:
+            loc = SLib.getLocationByID(self.locationID)
+            if loc is not None:
+                rect = QtCore.QRectF(loc.x(), loc.y(), loc.BoundingRect.width(), loc.BoundingRect.height())
+            self.LiqOrFogAux.mode = 'l'
 
-            self.LiqOrFogAux.setX(z.x() + 4)
-            self.LiqOrFogAux.setY(z.y())
-            self.LiqOrFogAux.OuterRect.setWidth(z.BoundingRect.width() - 8)
-            self.LiqOrFogAux.OuterRect.setHeight(z.BoundingRect.height())
+        self.LiqOrFogAux.OuterRect = rect
+        self.LiqOrFogAux.updateSize()
 
-            self.LiqOrFogAux.updateSize()
+    def dataChanged(self):
+        super().dataChanged()
+        self.locationID = self.parent.spritedata[5]
+        self.updateAux()
 
     def positionChanged(self):
         super().positionChanged()
+        self.updateAux()
 
-        z = SLib.getNearestZoneTo(self.parent.objx, self.parent.objy)
-        if z is not None:
-            self.LiqOrFogAux.OuterRect = QtCore.QRectF(z.BoundingRect)
-
-            self.LiqOrFogAux.setX(z.x() + 4)
-            self.LiqOrFogAux.setY(z.y())
-            self.LiqOrFogAux.OuterRect.setWidth(z.BoundingRect.width() - 8)
-            self.LiqOrFogAux.OuterRect.setHeight(z.BoundingRect.height())
+    def zoneRepositioned(self):
+        """
+        Called when a zone is moved or resized
+        """
+        if self.paintZone: self.updateAux()
 
-            self.LiqOrFogAux.updateSize()
+    def locationRepositioned(self):
+        """
+        Called when a location is moved or resized
+        """
+        if not self.paintZone: self.updateAux()
 
 
 class SpriteImage_HammerBro(SLib.SpriteImage_Static): # 95, 308
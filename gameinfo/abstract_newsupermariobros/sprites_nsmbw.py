@@ -32,10 +32,12 @@
 # Imports
 import math
 import random
+import weakref
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 Qt = QtCore.Qt
 
+import rn_api
 
 import spritelib as SLib
 ImageCache = SLib.ImageCache
@@ -345,258 +347,7 @@ class SpriteImage_OldStoneBlock(SLib.SpriteImage): # 30, 81, 82, 83, 84, 85, 86
         painter.drawPixmap(column3x, row3y, ImageCache['OldStoneBR'])
 
 
-class SpriteImage_LiquidOrFog(SLib.SpriteImage): # 64, 138, 139, 216, 358, 374, 435
-    
-    class FreeAuxiliaryItem_LiquidOrFog(QtWidgets.QGraphicsItem):
-        """
-        An item that acts sort of like an auxiliary item, but isn't one. Biggest difference is that the sprite isn't its parent.
-        It paints liquid or fog in a zone or location.
-        """
-        def __init__(self, imageObj):
-            super().__init__()
-            self.ImageObj = imageObj
-
-            self.OuterRect = None
-            self.BoundingRect = QtCore.QRectF(0, 0, 0, 0)
-            self.mode = 'z' # 'z' = zones, 'l' = locations
-
-        def boundingRect(self):
-            """
-            Required by Qt
-            """
-            return self.BoundingRect
-
-        def paint(self, painter, option, widget=None):
-            painter.setClipRect(option.rect)
-
-            y, h = self.y(), self.OuterRect.height()
-
-            # Get info
-            selfTop = self.OuterRect.y()
-            spriteTop = self.ImageObj.parent.y()
-            y = spriteTop
-            h -= spriteTop - selfTop
-
-            # Create the new bounding rect
-            print(h)
-            y = max(0, y)
-            h = max(0, h)
-            self.BoundingRect = QtCore.QRectF(self.OuterRect)
-            self.setY(y)
-            self.BoundingRect.setHeight(h)
-
-            # # Determine the rise and top to be drawn, if any
-            # riseToDraw = self.ImageObj.rise if self.ImageObj.drawCrest else self.ImageObj.riseCrestless          
-
-            # Temp stuff: paint the bounding rect
-            painter.setBrush(QtGui.QBrush(Qt.red))
-            painter.save()
-            painter.setOpacity(0.2)
-            painter.drawRect(0, 0, self.BoundingRect.width(), self.BoundingRect.height())
-            painter.restore()
-            self.scene().update()
-
-            # # Paint the water top
-            # if self.waterTopUsesRise:
-            #     wTNRPH = self.waterTopNonRisePartHeight
-            #     crestToDraw = self.imageObj.crest if self.imageObj.drawCrest else self.imageObj.mid
-            #     painter.drawTiledPixmap(0, self.waterTop, self.BoundingRect.width(), wTNRPH, crestToDraw)
-            #     painter.drawTiledPixmap(0, self.waterTop + wTNRPH, self.BoundingRect.width(), riseToDraw.height() - wTNRPH, riseToDraw, 0, wTNRPH)
-            # else:
-            #     drawCrest = self.imageObj.drawCrest
-            #     if self.waterTopCrestOverride is not None:
-            #         drawCrest = self.waterTopCrestOverride
-            #     if drawCrest:
-            #         painter.drawTiledPixmap(0, self.waterTop, self.BoundingRect.width(), min(self.waterDepth, self.imageObj.crest.height()), self.imageObj.crest)
-            #         painter.drawTiledPixmap(0, self.waterTop + self.imageObj.crest.height(), self.BoundingRect.width(), max(0, self.waterDepth - self.imageObj.crest.height()), self.imageObj.mid)
-            #     else:
-            #         painter.drawTiledPixmap(0, self.waterTop, self.BoundingRect.width(), self.waterDepth, self.imageObj.mid)
-
-            # # Paint the rise, if going up
-            # if self.imageObj.risingHeight > 0:
-            #     painter.drawTiledPixmap(0, 0, self.BoundingRect.width(), riseToDraw.height(), riseToDraw)
-
-            # # Paint the rise, if going down
-            # if self.imageObj.risingHeight < 0:
-            #     painter.drawTiledPixmap(0, -self.imageObj.risingHeight, self.BoundingRect.width(), riseToDraw.height(), riseToDraw)
-
-
-        def updateSize(self):
-            """
-            Updates the size and position of the aux
-            """
-            if None in (self.OuterRect, self.ImageObj.rise, self.ImageObj.riseCrestless): return
-
-            # # Reset stuff
-            # self.waterTop = 0
-            # self.waterDepth = 0
-            # self.riseTop = 0
-            # self.waterTopUsesRise = False
-            # self.waterTopNonRisePartHeight = 0
-            # self.waterTopCrestOverride = None
-
-            # # Determine the rise to be drawn, if any
-            # riseToDraw = self.imageObj.rise if self.imageObj.drawCrest else self.imageObj.riseCrestless
-
-            # # Realign
-            # self.alignToZone()
-            # width = self.BoundingRect.width()
-
-            # # Keep track of the old position
-            # oldy, oldh = self.y(), self.BoundingRect.height()
-
-            # # First, calculate simple offsets
-            # self.waterTop = 0
-            # if self.imageObj.top < 0:
-            #     self.waterTop = 0
-            #     self.waterTopCrestOverride = False
-            #     if self.imageObj.risingHeight > 0:
-            #         self.waterTop += self.imageObj.risingHeight
-            # self.waterDepth = self.BoundingRect.height() - self.imageObj.top
-            # if self.waterDepth < riseToDraw.height():
-            #     self.waterDepth = riseToDraw.height()
-            # if self.imageObj.risingHeight > 0:
-            #     self.waterTop = self.imageObj.risingHeight
-            #     if self.imageObj.top < 0:
-            #         self.waterTop += self.imageObj.top
-            # elif self.imageObj.risingHeight < 0:
-            #     self.riseTop = -self.imageObj.risingHeight
-            # if self.BoundingRect.height() - self.imageObj.top < riseToDraw.height():
-            #     self.waterTopUsesRise = True
-            #     self.waterTopNonRisePartHeight = self.BoundingRect.height() - self.imageObj.top
-            #     self.waterTopNonRisePartHeight = max(0, self.waterTopNonRisePartHeight)
-
-            # print('------------------')
-            # print(self.waterTop)
-            # print(self.waterDepth)
-            # print(self.riseTop)
-            # print(self.waterTopUsesRise)
-            # print(self.waterTopNonRisePartHeight)
-            # print(self.waterTopCrestOverride)
-
-            # # Determine the top edge
-            # y = self.imageObj.top
-
-            # # Don't allow negative y
-            # y = max(0, y)
-
-            # # Determine the height
-            # h = self.BoundingRect.height() - y
-
-            # # Special case: if there is a rise going up
-            # if self.imageObj.risingHeight > 0:
-            #     y = self.imageObj.top - self.imageObj.risingHeight
-            #     h += self.imageObj.risingHeight
-
-            # # Don't allow negative height
-            # h = max(h, 0)
-
-            # # Special case: if the water to be drawn is smaller than the rise image
-            # if y + self.waterTop > self.BoundingRect.height() - riseToDraw.height():
-            #     h = riseToDraw.height()
-            #     if self.imageObj.risingHeight > 0:
-            #         h += self.imageObj.risingHeight
-
-            # # Special case: if there is a rise going down
-            # if self.imageObj.risingHeight < 0:
-            #     h = max(h, -self.imageObj.risingHeight + riseToDraw.height())
-
-            # # Set the settings
-            # self.setPos(0, y)
-            # self.BoundingRect.setHeight(h)
-
-            # # Update the old area
-            # self.parent.scene().update(self.parent.x(), self.parent.y() + oldy, width, oldh)
-
-        def paintLiquidInRect(self, painter, rect):
-            """
-            Generic liquid-in-rect painter
-            """
-            return
-        #     rx, ry, rw, rh = rect.topLeft().x(), rect.topLeft().y(), rect.width(), rect.height()
-
-        #     drawRise = self.risingHeight != 0
-        #     drawCrest = self.drawCrest
-        #     drawRiseCrest = drawCrest
-
-        #     # Get positions
-        #     offsetFromTop = self.top
-        #     if offsetFromTop < 0:
-        #         offsetFromTop = 0
-        #         drawCrest = False # off the top of the rect; no crest
-        #     if self.top > rh:
-        #         # the sprite is below the rect; don't draw anything
-        #         return
-
-        #     # If all that fits in the rect is some of the crest, determine how much
-        #     if drawCrest:
-        #         crestSizeRemoval = (ry + offsetFromTop + self.crest.height()) - (ry + rh)
-        #         if crestSizeRemoval < 0: crestSizeRemoval = 0
-        #         crestHeight = self.crest.height() - crestSizeRemoval
-
-        #     # Determine where to put the rise image
-        #     offsetRise = offsetFromTop - self.risingHeight
-        #     riseToDraw = self.rise
-        #     if not drawRiseCrest:
-        #         riseToDraw = self.riseCrestless
-
-        #     # Draw everything!
-        #     if drawCrest:
-        #         painter.drawTiledPixmap(0, offsetFromTop, rw, crestHeight, self.crest)
-        #         painter.drawTiledPixmap(0, offsetFromTop + crestHeight, rw, rh - crestHeight - offsetFromTop, self.mid)
-        #     else:
-        #         painter.drawTiledPixmap(0, offsetFromTop, rw, rh - offsetFromTop - 4, self.mid)
-        #     if drawRise:
-        #         painter.drawTiledPixmap(0, offsetRise, rw, riseToDraw.height(), riseToDraw)
-
-    def __init__(self, parent, scale=1.5):
-        super().__init__(parent, scale)
-
-        self.updateSceneAfterZoneMoved = True
-        self.updateSceneAfterLocationMoved = True
-
-        self.crest = None
-        self.mid = None
-        self.rise = None
-        self.riseCrestless = None
-
-        self.top = 0
-
-        self.drawCrest = False
-        self.risingHeight = 0
-
-        self.paintZone = False
-
-        self.LiqOrFogAux = self.FreeAuxiliaryItem_LiquidOrFog(self)
-        self.parent.scene().addItem(self.LiqOrFogAux)
-
-    def dataChanged(self):
-        super().dataChanged()
-        
-        z = SLib.getNearestZoneTo(self.parent.objx, self.parent.objy)
-        if z is not None:
-            self.LiqOrFogAux.OuterRect = QtCore.QRectF(z.BoundingRect)
-
-            self.LiqOrFogAux.setX(z.x() + 4)
-            self.LiqOrFogAux.setY(z.y())
-            self.LiqOrFogAux.OuterRect.setWidth(z.BoundingRect.width() - 8)
-            self.LiqOrFogAux.OuterRect.setHeight(z.BoundingRect.height())
-
-            self.LiqOrFogAux.updateSize()
-
-    def positionChanged(self):
-        super().positionChanged()
-
-        z = SLib.getNearestZoneTo(self.parent.objx, self.parent.objy)
-        if z is not None:
-            self.LiqOrFogAux.OuterRect = QtCore.QRectF(z.BoundingRect)
-
-            self.LiqOrFogAux.setX(z.x() + 4)
-            self.LiqOrFogAux.setY(z.y())
-            self.LiqOrFogAux.OuterRect.setWidth(z.BoundingRect.width() - 8)
-            self.LiqOrFogAux.OuterRect.setHeight(z.BoundingRect.height())
-
-            self.LiqOrFogAux.updateSize()
+SpriteImage_LiquidOrFog = sprites_common.SpriteImage_LiquidOrFog # 64, 138, 139, 216, 358, 374, 435
 
 
 class SpriteImage_HammerBro(SLib.SpriteImage_Static): # 95, 308
@@ -1857,19 +1608,10 @@ class SpriteImage_OutdoorsFog(SpriteImage_LiquidOrFog): # 64
         SLib.loadIfNotInImageCache('OutdoorsFog', 'fog_outdoors.png')
 
     def dataChanged(self):
-        super().dataChanged()
-        self.parent.scene().update()
-
-    def realViewZone(self, painter, zoneRect):
-
         self.paintZone = self.parent.spritedata[5] == 0
+        self.topAtSpritePos = True
 
-        self.top = self.parent.objy
-
-        # Get pixmaps
-        mid = ImageCache['OutdoorsFog']
-
-        super().realViewZone(painter, zoneRect)
+        super().dataChanged()
 
 
 class SpriteImage_PipePiranhaUp(SLib.SpriteImage_Static): # 65
@@ -2507,9 +2249,19 @@ class SpriteImage_Sunlight(SLib.SpriteImage): # 110
         self.aux.append(SLib.AuxiliaryImage_FollowsRect(parent, i.width(), i.height()))
         self.aux[0].realimage = i
         self.aux[0].alignment = Qt.AlignTop | Qt.AlignRight
-        self.parent.scene().views()[0].repaint.connect(lambda: self.moveSunlight())
         self.aux[0].hover = False
 
+        # Follow the view around. Only hold a weak reference, so the
+        # subscription doesn't keep the image alive after the sprite's gone.
+        moveSunlight = weakref.WeakMethod(self.moveSunlight)
+        def frameRendered(view):
+            method = moveSunlight()
+            if method is None:
+                rn_api.rFrameScheduler().unsubscribe(frameRendered, view)
+            else:
+                method()
+        rn_api.rFrameScheduler().subscribe(frameRendered, self.parent.scene().views()[0])
+
     @staticmethod
     def loadImages():
         SLib.loadIfNotInImageCache('Sunlight', 'sunlight.png')
@@ -3130,7 +2882,6 @@ class SpriteImage_Water(SpriteImage_LiquidOrFog): # 138
 
         self.risingHeight = (self.parent.spritedata[3] & 0xF) << 4
         self.risingHeight |= self.parent.spritedata[4] >> 4
-        self.risingHeight *= 24
 
         if self.parent.spritedata[2] > 7: # falling water
             self.risingHeight = -self.risingHeight
@@ -3155,10 +2906,9 @@ class SpriteImage_Lava(SpriteImage_LiquidOrFog): # 139
         ImageCache['LiquidLavaRise'] = SLib.GetImg('liquid_lava_rise.png')
         ImageCache['LiquidLavaRiseCrest'] = SLib.GetImg('liquid_lava_rise_crest.png')
 
-    def realViewZone(self, painter, zoneRect):
-
+    def dataChanged(self):
         self.paintZone = self.parent.spritedata[5] == 0
-        self.top = self.parent.objy
+        self.topAtSpritePos = True
         self.drawCrest = self.parent.spritedata[4] & 15 == 0
         self.risingHeight = (self.parent.spritedata[3] & 0xF) << 4
         self.risingHeight |= self.parent.spritedata[4] >> 4
@@ -3166,7 +2916,7 @@ class SpriteImage_Lava(SpriteImage_LiquidOrFog): # 139
         if self.parent.spritedata[2] > 7: # falling
             self.risingHeight = -self.risingHeight
 
-        super().realViewZone(painter, zoneRect)
+        super().dataChanged()
 
 
 class SpriteImage_SpikedStakeUp(SpriteImage_SpikedStake): # 140
@@ -4172,10 +3922,9 @@ class SpriteImage_Poison(SpriteImage_LiquidOrFog): # 216
         ImageCache['LiquidPoisonRise'] = SLib.GetImg('liquid_poison_rise.png')
         ImageCache['LiquidPoisonRiseCrest'] = SLib.GetImg('liquid_poison_rise_crest.png')
 
-    def realViewZone(self, painter, zoneRect):
-
+    def dataChanged(self):
         self.paintZone = self.parent.spritedata[5] == 0
-        self.top = self.parent.objy
+        self.topAtSpritePos = True
         self.drawCrest = self.parent.spritedata[4] & 15 == 0
         self.risingHeight = (self.parent.spritedata[3] & 0xF) << 4
         self.risingHeight |= self.parent.spritedata[4] >> 4
@@ -4183,7 +3932,7 @@ class SpriteImage_Poison(SpriteImage_LiquidOrFog): # 216
         if self.parent.spritedata[2] > 7: # falling
             self.risingHeight = -self.risingHeight
 
-        super().realViewZone(painter, zoneRect)
+        super().dataChanged()
 
 
 class SpriteImage_LineBlock(SLib.SpriteImage): # 219
@@ -5519,20 +5268,36 @@ class SpriteImage_BubbleGen(SLib.SpriteImage): # 314
     def loadImages():
         SLib.loadIfNotInImageCache('BubbleGenEffect', 'bubble_gen.png')
 
+    # Constants (change these if you want)
+    bubbleFrequency = .01
+    bubbleEccentricityX = 16
+    bubbleEccentricityY = 48
+
     def dataChanged(self):
         super().dataChanged()
-        self.parent.scene().update()
+        SLib.invalidateSprite(self)
 
     def positionChanged(self):
         super().positionChanged()
-        self.parent.scene().update()
+        SLib.invalidateSprite(self)
+
+    def realViewRect(self):
+        z = SLib.getNearestZoneTo(self.parent.objx, self.parent.objy)
+        if z is None or 'BubbleGenEffect' not in ImageCache: return None
+
+        # The bubbles rise from the sprite to the top of the zone,
+        # wobbling a bit horizontally and vertically
+        Image = ImageCache['BubbleGenEffect']
+        centerX = (self.parent.objx * 1.5) + 12
+        halfWidth = self.bubbleEccentricityX + (Image.width() / 2.0)
+        bottom = (self.parent.objy * 1.5) + self.bubbleEccentricityY + Image.height()
+        return QtCore.QRectF(centerX - halfWidth, z.y(), halfWidth * 2, bottom - z.y())
 
     def realViewZone(self, painter, zoneRect):
 
-        # Constants (change these if you want)
-        bubbleFrequency = .01
-        bubbleEccentricityX = 16
-        bubbleEccentricityY = 48
+        bubbleFrequency = self.bubbleFrequency
+        bubbleEccentricityX = self.bubbleEccentricityX
+        bubbleEccentricityY = self.bubbleEccentricityY
 
         size = self.parent.spritedata[5] & 0xF
         if size > 3: return
@@ -6263,8 +6028,7 @@ class SpriteImage_LavaParticles(SpriteImage_LiquidOrFog): # 358
         ImageCache['LavaParticlesB'] = SLib.GetImg('lava_particles_b.png')
         ImageCache['LavaParticlesC'] = SLib.GetImg('lava_particles_c.png')
 
-    def realViewZone(self, painter, zoneRect):
-
+    def dataChanged(self):
         type = (self.parent.spritedata[5] & 0xF) % 3
         self.mid = (
             ImageCache['LavaParticlesA'],
@@ -6272,7 +6036,7 @@ class SpriteImage_LavaParticles(SpriteImage_LiquidOrFog): # 358
             ImageCache['LavaParticlesC'],
             )[type]
 
-        super().realViewZone(painter, zoneRect)
+        super().dataChanged()
 
 
 class SpriteImage_WallLantern(SLib.SpriteImage): # 359
@@ -6455,12 +6219,11 @@ class SpriteImage_SnowWind(SpriteImage_LiquidOrFog): # 374
     def loadImages():
         SLib.loadIfNotInImageCache('SnowEffect', 'snow.png')
 
-    def realViewZone(self, painter, zoneRect):
-
+    def dataChanged(self):
         # For now, we only paint snow
         self.paintZone = self.parent.spritedata[5] == 0
 
-        super().realViewZone(painter, zoneRect)
+        super().dataChanged()
 
 
 class SpriteImage_MovingFence(SLib.SpriteImage_StaticMultiple): # 376
@@ -7104,12 +6867,11 @@ class SpriteImage_GhostFog(SpriteImage_LiquidOrFog): # 435
     def loadImages():
         SLib.loadIfNotInImageCache('GhostFog', 'fog_ghost.png')
 
-    def realViewZone(self, painter, zoneRect):
-
+    def dataChanged(self):
         self.paintZone = self.parent.spritedata[5] == 0
-        self.top = self.parent.objy
+        self.topAtSpritePos = True
 
-        super().realViewZone(painter, zoneRect)
+        super().dataChanged()
 
 
 class SpriteImage_PurplePole(SLib.SpriteImage): # 437
@@ -6,6 +6,9 @@ from PyQt5 import QtWidgets, QtGui, QtCore
 
 import rn_api
 import parentModule
+from lib import compression, objectlayout, tpl
+from lib.records import RecordFormat
+from lib.u8 import U8_MAGIC, U8Archive, U8Error, U8Writer
 
 
 
@@ -24,8 +27,44 @@ class Level_NSMBW(parentModule.Level_NSMB_Abstract):
         LevelTemplate_NSMBW_Blank(),
         )
     FILE_EXTENSION = 'arc'
+    MAGIC = U8_MAGIC
 
+    BLOCK_ENTRANCES = 6
     BLOCK_SPRITES = 7
+    BLOCK_ZONES = 9
+    BLOCK_LOCATIONS = 10
+    BLOCK_PATHS = 12
+    BLOCK_PATH_NODES = 13
+    MAX_AREAS = 4
+    LAYER_COUNT = 3
+
+    TILESET_TEXTURE_FOLDER = 'BG_tex'
+    TILESET_TEXTURE_SIZE = (1024, 256)
+    TILESET_OBJECT_FOLDER = 'BG_unt'
+
+    COURSE_PATH = 'course/course%d.bin'
+    LAYER_PATH = 'course/course%d_bgdatL%d.bin'
+
+    BLOCK_FORMATS = {
+        BLOCK_ENTRANCES: RecordFormat('Entrance', '>HHxxxxBBBBxBBBHxB', (
+            'x', 'y', 'id', 'destArea', 'destEntrance', 'type', 'zone',
+            'layer', 'path', 'settings', 'pathDirection')),
+        BLOCK_SPRITES: RecordFormat('Sprite', '>HHH8s2x', (
+            'type', 'x', 'y', 'data'), terminated=True, terminatorSize=4),
+        BLOCK_ZONES: RecordFormat('Zone', '>HHHHHHBBBBxBBBBxBB', (
+            'x', 'y', 'width', 'height', 'modelShading', 'terrainShading',
+            'id', 'boundsID', 'cameraMode', 'cameraZoom', 'visibility',
+            'bgAID', 'bgBID', 'unknown', 'music', 'audioModifier')),
+        BLOCK_LOCATIONS: RecordFormat('Location', '>HHHHBxxx', (
+            'x', 'y', 'width', 'height', 'id')),
+        BLOCK_PATHS: RecordFormat('Path', '>BxHHH', (
+            'id', 'nodeStart', 'nodeCount', 'loops')),
+        BLOCK_PATH_NODES: RecordFormat('PathNode', '>HHffhxx', (
+            'x', 'y', 'speed', 'accel', 'delay')),
+        }
+    # The top 4 bits of "type" are the tileset number
+    OBJECT_FORMAT = RecordFormat('Object', '>HHHHH', (
+        'type', 'x', 'y', 'width', 'height'), terminated=True, terminatorSize=2)
 
 
     @classmethod
@@ -42,6 +81,7 @@ class Level_NSMBW(parentModule.Level_NSMB_Abstract):
         Initialize the NSMBW Level
         """
         super().__init__()
+        self.archive = None
 
 
     @staticmethod
@@ -49,19 +89,110 @@ class Level_NSMBW(parentModule.Level_NSMB_Abstract):
         """
         Return True if the data appears to encode a NSMBW level; False otherwise
         """
-        return data.startswith(b'U\xAA8-') # not robust at all, but works for now
+        return U8Archive.looksValid(data)
+
+
+    @classmethod
+    def summarize(cls, header):
+        """
+        Count the level's areas, from the archive's file list
+        """
+        try:
+            files = U8Archive(header, checkBounds=False).files
+        except (U8Error, struct.error):
+            return {}  # the node table doesn't fit in the header
+        return {'areas': sum(1 for area in range(1, cls.MAX_AREAS + 1) if cls.COURSE_PATH % area in files)}
+
+
+    @classmethod
+    def loadTilesetImage(cls, data):
+        """
+        Decode the texture in a tileset archive. Retail tilesets are
+        RGB5A3; some custom ones are RGBA8, which is twice the size.
+        """
+        arc = U8Archive(data)
+        texture = None
+        for name in arc.listdir(cls.TILESET_TEXTURE_FOLDER):
+            if name.endswith(('_tex.bin', '_tex.bin.LZ')):
+                texture = compression.decompress(arc[cls.TILESET_TEXTURE_FOLDER + '/' + name])
+                break
+        if texture is None: return None
+
+        width, height = cls.TILESET_TEXTURE_SIZE
+        format = tpl.FORMAT_RGBA8 if len(texture) >= width * height * 4 else tpl.FORMAT_RGB5A3
+        pixels = tpl.decodeTexture(texture, width, height, format)
+
+        # copy() so the image doesn't depend on the pixels buffer
+        return QtGui.QImage(pixels, width, height, QtGui.QImage.Format_ARGB32).copy()
+
+
+    @classmethod
+    def loadTilesetObjects(cls, data):
+        """
+        Decode the object definitions in a tileset archive: an index
+        (<name>_hd.bin) and the definitions it points into (<name>.bin)
+        """
+        arc = U8Archive(data)
+        folder = cls.TILESET_OBJECT_FOLDER
+        for name in arc.listdir(folder):
+            if name.endswith('_hd.bin'):
+                defsPath = folder + '/' + name[:-len('_hd.bin')] + '.bin'
+                if defsPath in arc:
+                    return objectlayout.parseObjectDefs(arc[folder + '/' + name], arc[defsPath])
+        return None
 
 
     @classmethod
     def loadFromBytes(cls, data):
         """
-        Return a new Level_NSMBW representing the archive data
+        Return a new Level_NSMBW representing the archive data.
+        data can be any buffer, including an mmap; it isn't copied.
         """
         level = cls()
+        level.archive = U8Archive(data)
+
+        for area in range(1, cls.MAX_AREAS + 1):
+            course = level.archive.get(cls.COURSE_PATH % area)
+            if course is None: continue
+
+            layers = []
+            for layer in range(cls.LAYER_COUNT):
+                layers.append(level.archive.get(cls.LAYER_PATH % (area, layer)))
+
+            level.areas.append(parentModule.Area_NSMB_Abstract(level, area, course, layers))
 
         return level
 
 
+    def saveTo(self, f):
+        """
+        Stream the level out to f as a U8 archive. Unedited blocks and
+        files are copied straight from the original archive.
+        """
+        areaFiles = {}
+        for area in self.areas:
+            area.syncColumns()
+            areaFiles[self.COURSE_PATH % area.number] = area.courseChunks()
+            for layer in range(self.LAYER_COUNT):
+                # Missing or emptied layers map to None, and are left out
+                data = area.layerBytes(layer)
+                areaFiles[self.LAYER_PATH % (area.number, layer)] = None if data is None else (data,)
+
+        writer = U8Writer()
+        if self.archive is not None:
+            # Keep the original file order, and anything we don't edit
+            for path in self.archive.files:
+                if path not in areaFiles:
+                    writer.addFile(path, (self.archive[path],))
+                else:
+                    chunks = areaFiles.pop(path)
+                    if chunks is not None: writer.addFile(path, chunks)
+        for path, chunks in areaFiles.items():
+            if chunks is not None: writer.addFile(path, chunks)
+
+        writer.write(f)
+
+
 
 class SpriteItem_NSMBW(parentModule.SpriteItem_NSMB_Abstract):
     """
@@ -0,0 +1,280 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# compression.py
+# Decompressors for the Nintendo LZ77 (LZ10/LZ11) and Yaz0 formats, with a
+# process pool batch mode for decompressing whole folders
+
+
+################################################################
+################################################################
+
+# Imports
+import concurrent.futures
+import os
+import struct
+
+
+YAZ0_MAGIC = b'Yaz0'
+LZ77_MAGIC = b'LZ77'  # optional prefix some games put before LZ10/LZ11 data
+LZ10 = 0x10
+LZ11 = 0x11
+
+# The most LZ10/LZ11 data can expand: a flag byte followed by eight
+# back-references of the longest kind. Files claiming to expand more
+# than this are uncompressed files that happen to start with 0x10/0x11.
+MAX_EXPANSION = {LZ10: 9, LZ11: 16000}
+
+# Don't bother starting worker processes for fewer files than this
+MIN_POOL_BATCH = 4
+
+
+
+class CompressionError(Exception):
+    """
+    Raised when compressed data is malformed
+    """
+    pass
+
+
+
+def detectCompression(data, totalSize=None):
+    """
+    Return 'yaz0', 'lz10' or 'lz11' depending on how data is
+    compressed, or None if it doesn't look compressed. data may be just
+    the start of the file, if totalSize gives the size of all of it.
+    LZ data is only recognized if the size it claims to decompress to
+    is possible for its compressed size.
+    """
+    head = bytes(data[:12])
+    if head[:4] == YAZ0_MAGIC:
+        return 'yaz0'
+    if head[:4] == LZ77_MAGIC:
+        head = head[4:]
+    if len(head) < 4 or head[0] not in (LZ10, LZ11):
+        return None
+
+    size = head[1] | head[2] << 8 | head[3] << 16
+    if size == 0 and head[0] == LZ11 and len(head) >= 8:
+        size = struct.unpack_from('<I', head, 4)[0]
+    if totalSize is None:
+        totalSize = len(data)
+    if not 0 < size <= totalSize * MAX_EXPANSION[head[0]]:
+        return None
+    return 'lz10' if head[0] == LZ10 else 'lz11'
+
+
+def decompress(data):
+    """
+    Decompress data, whichever supported format it's in. Data that
+    isn't compressed is returned unchanged.
+    """
+    kind = detectCompression(data)
+    if kind == 'yaz0':
+        return decompressYaz0(data)
+    elif kind is not None:
+        return decompressLZ77(data)
+    return data
+
+
+def copyBackReference(out, dst, disp, length):
+    """
+    Copy length bytes from disp bytes back in out to position dst.
+    Uses slice assignment rather than copying one byte at a time; when
+    the source overlaps the destination, the repeating pattern is
+    built up front instead.
+    """
+    start = dst - disp
+    if start < 0:
+        raise CompressionError('Back-reference before the start of the data')
+    if disp >= length:
+        out[dst:dst + length] = out[start:start + length]
+    else:
+        pattern = out[start:dst]
+        out[dst:dst + length] = (pattern * (length // disp + 1))[:length]
+
+
+def decompressLZ77(data):
+    """
+    Decompress Nintendo LZ77 data (LZ10 or LZ11, optionally with an
+    "LZ77" prefix) and return a bytearray
+    """
+    src = memoryview(data).cast('B')
+    if bytes(src[:4]) == LZ77_MAGIC:
+        src = src[4:]
+    if len(src) < 4:
+        raise CompressionError('Data is too short')
+
+    kind = src[0]
+    size = src[1] | src[2] << 8 | src[3] << 16
+    pos = 4
+    if size == 0 and kind == LZ11:
+        # Sizes that don't fit in 24 bits are stored separately
+        size = struct.unpack_from('<I', src, 4)[0]
+        pos = 8
+    if kind not in (LZ10, LZ11):
+        raise CompressionError('Unknown LZ77 variant 0x%02X' % kind)
+
+    out = bytearray(size)
+    dst = 0
+    try:
+        while dst < size:
+            flags = src[pos]
+            pos += 1
+            for bit in range(8):
+                if dst >= size: break
+
+                if not flags & (0x80 >> bit):
+                    out[dst] = src[pos]
+                    pos += 1
+                    dst += 1
+                    continue
+
+                b0 = src[pos]
+                if kind == LZ10:
+                    b1 = src[pos + 1]
+                    length = (b0 >> 4) + 3
+                    disp = ((b0 & 0xF) << 8 | b1) + 1
+                    pos += 2
+                else:
+                    indicator = b0 >> 4
+                    if indicator == 0:
+                        b1, b2 = src[pos + 1], src[pos + 2]
+                        length = ((b0 & 0xF) << 4 | b1 >> 4) + 0x11
+                        disp = ((b1 & 0xF) << 8 | b2) + 1
+                        pos += 3
+                    elif indicator == 1:
+                        b1, b2, b3 = src[pos + 1], src[pos + 2], src[pos + 3]
+                        length = ((b0 & 0xF) << 12 | b1 << 4 | b2 >> 4) + 0x111
+                        disp = ((b2 & 0xF) << 8 | b3) + 1
+                        pos += 4
+                    else:
+                        b1 = src[pos + 1]
+                        length = indicator + 1
+                        disp = ((b0 & 0xF) << 8 | b1) + 1
+                        pos += 2
+
+                length = min(length, size - dst)
+                copyBackReference(out, dst, disp, length)
+                dst += length
+    except IndexError:
+        raise CompressionError('Compressed data ends too early')
+
+    return out
+
+
+def decompressYaz0(data):
+    """
+    Decompress Yaz0 data and return a bytearray
+    """
+    src = memoryview(data).cast('B')
+    if len(src) < 16 or bytes(src[:4]) != YAZ0_MAGIC:
+        raise CompressionError('Not Yaz0 data')
+
+    size = struct.unpack_from('>I', src, 4)[0]
+    out = bytearray(size)
+    dst = 0
+    pos = 16
+    try:
+        while dst < size:
+            flags = src[pos]
+            pos += 1
+            for bit in range(8):
+                if dst >= size: break
+
+                if flags & (0x80 >> bit):
+                    out[dst] = src[pos]
+                    pos += 1
+                    dst += 1
+                    continue
+
+                b0, b1 = src[pos], src[pos + 1]
+                pos += 2
+                disp = ((b0 & 0xF) << 8 | b1) + 1
+                if b0 >> 4:
+                    length = (b0 >> 4) + 2
+                else:
+                    length = src[pos] + 0x12
+                    pos += 1
+
+                length = min(length, size - dst)
+                copyBackReference(out, dst, disp, length)
+                dst += length
+    except IndexError:
+        raise CompressionError('Compressed data ends too early')
+
+    return out
+
+
+def decompressFile(path):
+    """
+    Read and decompress the file at path. Returns (path, data); files
+    that aren't compressed are returned as they are.
+    """
+    with open(path, 'rb') as f:
+        return path, bytes(decompress(f.read()))
+
+
+def tryDecompressFile(path):
+    """
+    Like decompressFile(), but returns (path, data, error): if the file
+    can't be read or decompressed, data is None and error says why
+    """
+    try:
+        return decompressFile(path) + (None,)
+    except (OSError, CompressionError) as e:
+        return path, None, str(e) or e.__class__.__name__
+
+
+def decompressFiles(paths, processes=None):
+    """
+    Generator that decompresses many files in a pool of worker
+    processes, and yields (path, data, error) for each, in order (see
+    tryDecompressFile()); one bad file doesn't stop the others. Each
+    worker reads its files itself, so only the results cross process
+    boundaries. processes defaults to the number of CPUs.
+    """
+    paths = list(paths)
+    if len(paths) < MIN_POOL_BATCH:
+        for path in paths:
+            yield tryDecompressFile(path)
+        return
+
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (processes * 4))
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        yield from pool.map(tryDecompressFile, paths, chunksize=chunksize)
+
+
+def decompressFolder(folder, processes=None):
+    """
+    Decompress every file in folder and its subfolders with
+    decompressFiles(), yielding (path, data, error) for each
+    """
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(folder):
+        dirnames.sort()
+        for fn in sorted(filenames):
+            paths.append(os.path.join(dirpath, fn))
+    return decompressFiles(paths, processes)
@@ -0,0 +1,112 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# detect.py
+# Registry that identifies which level type a file holds from its first
+# few KB
+
+
+################################################################
+################################################################
+
+# Imports
+import collections
+
+
+# How much of a file is read to identify it. Magic numbers and probes
+# must fit in this many bytes.
+HEADER_SIZE = 0x1000
+
+
+
+class FormatDetector:
+    """
+    Maps file headers to level types. Each level type may declare a
+    magic number (MAGIC, at MAGIC_OFFSET); those are indexed into a
+    prefix table, so identifying a file costs one dict lookup per
+    distinct (offset, length) pair rather than one validate() call per
+    level type. The level type's validate() then runs on the header as
+    a deeper probe, but only for the candidates that matched.
+    """
+    def __init__(self):
+        """
+        Initialize an empty registry
+        """
+        # (offset, length) -> {magic: [level types]}
+        self.prefixTable = collections.OrderedDict()
+        # Level types without a magic number; these are probed last
+        self.fallbacks = []
+        # Games that inherit from others share their level types, so
+        # the same one can be registered many times; only the first
+        # counts
+        self.registered = set()
+
+
+    def register(self, levelType):
+        """
+        Add a level type to the registry, if it isn't already there
+        """
+        if levelType in self.registered: return
+        self.registered.add(levelType)
+
+        magic = levelType.MAGIC
+        if not magic:
+            self.fallbacks.append(levelType)
+            return
+
+        if levelType.MAGIC_OFFSET + len(magic) > HEADER_SIZE:
+            raise ValueError('%s: magic number is outside of the header' % levelType.__name__)
+
+        key = (levelType.MAGIC_OFFSET, len(magic))
+        self.prefixTable.setdefault(key, {}).setdefault(bytes(magic), []).append(levelType)
+
+
+    def candidates(self, header):
+        """
+        Generator that yields the level types whose magic number
+        matches header, followed by those with no magic number
+        """
+        for (offset, length), magics in self.prefixTable.items():
+            types = magics.get(bytes(header[offset:offset + length]))
+            if types: yield from types
+        yield from self.fallbacks
+
+
+    def detect(self, header):
+        """
+        Return the level type that header (the first HEADER_SIZE bytes
+        of a file, or all of it if it's shorter) belongs to, or None
+        """
+        for levelType in self.candidates(header):
+            if levelType.validate(header):
+                return levelType
+        return None
+
+
+    def detectFile(self, path):
+        """
+        Like detect(), but reads the header from the file at path
+        """
+        with open(path, 'rb') as f:
+            return self.detect(f.read(HEADER_SIZE))
@@ -0,0 +1,239 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# itemcolumns.py
+# Compact, column-oriented storage for level items
+
+
+################################################################
+################################################################
+
+# Imports
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Column name -> array type code
+COLUMNS = (
+    ('type', 'H'),
+    ('x', 'i'),
+    ('y', 'i'),
+    ('width', 'H'),
+    ('height', 'H'),
+    ('layer', 'B'),
+    )
+
+
+
+class ItemColumns:
+    """
+    Stores many level items (objects, sprites...) as one array per
+    field instead of one Python object each, which brings the cost of
+    an item down to a few dozen bytes. Items are addressed by index;
+    ItemRef gives an object-like view of one.
+
+    Positions and sizes are in the level format's own units;
+    unitsPerTile converts them to tiles (scene units). Each item can
+    also carry dataSize bytes of extra data (sprite settings, say).
+    """
+    def __init__(self, dataSize=0, unitsPerTile=1):
+        """
+        Initialize empty columns
+        """
+        for name, code in COLUMNS:
+            setattr(self, name, array.array(code))
+        self.data = bytearray()
+        self.dataSize = dataSize
+        self.unitsPerTile = unitsPerTile
+
+        # Bumped on every change, so observers can tell when to refresh
+        self.version = 0
+
+
+    def __len__(self):
+        return len(self.type)
+
+
+    def __getitem__(self, idx):
+        """
+        Return an ItemRef for item idx
+        """
+        if not 0 <= idx < len(self.type):
+            raise IndexError('item index out of range')
+        return ItemRef(self, idx)
+
+
+    def __iter__(self):
+        for idx in range(len(self.type)):
+            yield ItemRef(self, idx)
+
+
+    def append(self, type, x, y, width, height, layer=0, data=b''):
+        """
+        Add an item, and return its index
+        """
+        if len(data) != self.dataSize:
+            raise ValueError('item data must be %d bytes long' % self.dataSize)
+
+        self.type.append(type)
+        self.x.append(x)
+        self.y.append(y)
+        self.width.append(width)
+        self.height.append(height)
+        self.layer.append(layer)
+        self.data += data
+        self.version += 1
+        return len(self.type) - 1
+
+
+    def extend(self, types, xs, ys, widths, heights, layers, data=b''):
+        """
+        Add many items at once, given one sequence per column (data is
+        all of the items' data, concatenated)
+        """
+        count = len(types)
+        if len(data) != count * self.dataSize:
+            raise ValueError('expected %d bytes of item data' % (count * self.dataSize))
+
+        for (name, code), values in zip(COLUMNS, (types, xs, ys, widths, heights, layers)):
+            column = getattr(self, name)
+            if numpy is not None and isinstance(values, numpy.ndarray):
+                # Straight from a decoded record table, without a
+                # round trip through Python ints
+                column.frombytes(values.astype(column.typecode).tobytes())
+            else:
+                column.extend(values)
+        self.data += data
+        self.version += 1
+
+
+    def remove(self, idx):
+        """
+        Remove item idx. Later items move down by one index.
+        """
+        for name, code in COLUMNS:
+            del getattr(self, name)[idx]
+        del self.data[idx * self.dataSize:(idx + 1) * self.dataSize]
+        self.version += 1
+
+
+    def itemData(self, idx):
+        """
+        Return the extra data for item idx
+        """
+        return bytes(self.data[idx * self.dataSize:(idx + 1) * self.dataSize])
+
+
+    def indicesIn(self, x, y, width, height):
+        """
+        Return the indices of the items that overlap the given
+        rectangle, which is in tiles
+        """
+        scale = self.unitsPerTile
+        left, top = x * scale, y * scale
+        right, bottom = (x + width) * scale, (y + height) * scale
+
+        if numpy is not None and len(self.type):
+            xs = numpy.frombuffer(self.x, numpy.int32)
+            ys = numpy.frombuffer(self.y, numpy.int32)
+            ws = numpy.frombuffer(self.width, numpy.uint16)
+            hs = numpy.frombuffer(self.height, numpy.uint16)
+            hits = (xs < right) & (xs + ws > left) & (ys < bottom) & (ys + hs > top)
+            return numpy.flatnonzero(hits).tolist()
+
+        return [i for i, (ix, iy, iw, ih) in enumerate(zip(self.x, self.y, self.width, self.height))
+                if ix < right and ix + iw > left and iy < bottom and iy + ih > top]
+
+
+    def bounds(self):
+        """
+        Return (x, y, width, height) of the rectangle containing all
+        items, in tiles, or None if there are none
+        """
+        if not len(self.type): return None
+
+        scale = self.unitsPerTile
+        left = min(self.x)
+        top = min(self.y)
+        right = max(x + w for x, w in zip(self.x, self.width))
+        bottom = max(y + h for y, h in zip(self.y, self.height))
+        return left / scale, top / scale, (right - left) / scale, (bottom - top) / scale
+
+
+
+class ItemRef:
+    """
+    A lightweight view of one item in an ItemColumns. It holds no data
+    of its own, so it's only valid until an earlier item is removed.
+    """
+    __slots__ = ('columns', 'index')
+
+    def __init__(self, columns, index):
+        self.columns = columns
+        self.index = index
+
+
+    def _column(name):
+        """
+        Make a property that reads and writes one column
+        """
+        def get(self):
+            return getattr(self.columns, name)[self.index]
+        def set(self, value):
+            getattr(self.columns, name)[self.index] = value
+            self.columns.version += 1
+        return property(get, set)
+
+    type = _column('type')
+    x = _column('x')
+    y = _column('y')
+    width = _column('width')
+    height = _column('height')
+    layer = _column('layer')
+    del _column
+
+
+    @property
+    def data(self):
+        """
+        The item's extra data
+        """
+        return self.columns.itemData(self.index)
+
+
+    @data.setter
+    def data(self, value):
+        size = self.columns.dataSize
+        if len(value) != size:
+            raise ValueError('item data must be %d bytes long' % size)
+        self.columns.data[self.index * size:(self.index + 1) * size] = value
+        self.columns.version += 1
+
+
+    def __repr__(self):
+        return '<ItemRef %d: type %d at (%d, %d)>' % (self.index, self.type, self.x, self.y)
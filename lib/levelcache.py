@@ -0,0 +1,207 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# levelcache.py
+# On-disk cache of parsed level data, keyed by file identity
+
+
+################################################################
+################################################################
+
+# Imports
+import collections
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+
+
+CACHE_VERSION = 2  # bump when the format of cached data changes
+ENTRY_SUFFIX = '.cache'
+
+
+
+class LevelCache:
+    """
+    Stores whatever a level returns from cacheState() so that the
+    level can skip parsing next time the same file is opened. Entries
+    are keyed by the file's path, size and modification time, so an
+    entry can never be used for a file that has changed since.
+
+    The newest entries are also kept in memory, still pickled so that
+    every get() returns a fresh copy that the caller may modify. On
+    disk, the least recently used entries are deleted once the cache
+    grows past maxSize bytes. Safe to use from several threads.
+    """
+    MEMORY_ENTRIES = 4
+
+    def __init__(self, folder, maxSize=256 * 1024 * 1024):
+        """
+        Initialize the cache, stored in folder
+        """
+        self.folder = folder
+        self.maxSize = maxSize
+        self.memory = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+
+    @staticmethod
+    def keyForFile(path):
+        """
+        Return the cache key for the file at path as it is right now
+        """
+        st = os.stat(path)
+        ident = '%d|%s|%d|%d' % (CACHE_VERSION, os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+
+    @staticmethod
+    def keyForData(data):
+        """
+        Return a cache key based on the contents of a file instead of
+        its identity. Slower, but survives copies and renames.
+        """
+        h = hashlib.sha1(b'%d|' % CACHE_VERSION)
+        h.update(data)
+        return h.hexdigest()
+
+
+    def entryPath(self, key):
+        """
+        Return the path of the file for the entry key
+        """
+        return os.path.join(self.folder, key + ENTRY_SUFFIX)
+
+
+    def get(self, key):
+        """
+        Return the state cached under key, or None
+        """
+        with self.lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+
+        path = self.entryPath(key)
+        if data is None:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                return None
+            self.remember(key, data)
+
+        try:
+            os.utime(path)  # mark it as recently used
+        except OSError:
+            pass
+
+        try:
+            return pickle.loads(data)
+        except Exception:
+            # Truncated or from an incompatible version; drop it
+            self.discard(key)
+            return None
+
+
+    def put(self, key, state):
+        """
+        Cache state under key
+        """
+        if state is None: return
+        data = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+        self.remember(key, data)
+
+        os.makedirs(self.folder, exist_ok=True)
+        fd, tempPath = tempfile.mkstemp(suffix='.tmp', dir=self.folder)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tempPath, self.entryPath(key))
+        except BaseException:
+            os.unlink(tempPath)
+            raise
+
+        self.evict()
+
+
+    def remember(self, key, data):
+        """
+        Keep pickled data in memory, forgetting the oldest entries
+        there
+        """
+        with self.lock:
+            self.memory[key] = data
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.MEMORY_ENTRIES:
+                self.memory.popitem(last=False)
+
+
+    def discard(self, key):
+        """
+        Remove the entry for key, if there is one
+        """
+        with self.lock:
+            self.memory.pop(key, None)
+        try:
+            os.remove(self.entryPath(key))
+        except OSError:
+            pass
+
+
+    def evict(self):
+        """
+        Delete the least recently used entries on disk until the cache
+        fits in maxSize
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if not entry.name.endswith(ENTRY_SUFFIX): continue
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.maxSize: break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+
+    def clear(self):
+        """
+        Delete every entry
+        """
+        with self.lock:
+            self.memory.clear()
+        if not os.path.isdir(self.folder): return
+        for name in os.listdir(self.folder):
+            if name.endswith(ENTRY_SUFFIX):
+                os.remove(os.path.join(self.folder, name))
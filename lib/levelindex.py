@@ -0,0 +1,184 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# levelindex.py
+# An index of a game's levels: the names from levelnames.xml joined with
+# the files actually in the game's level folder
+
+
+################################################################
+################################################################
+
+# Imports
+import collections
+import os
+import pickle
+import tempfile
+
+from . import detect
+
+
+INDEX_VERSION = 1  # bump when the cached format changes
+
+# What's remembered about each level file
+FileInfo = collections.namedtuple('FileInfo', 'size mtime summary')
+
+# One row of a level browser. info is None if the file is missing.
+LevelEntry = collections.namedtuple('LevelEntry', 'categories name file path info')
+
+
+
+class LevelIndex:
+    """
+    Keeps track of the level files in one folder. The first scan reads
+    the start of every file and summarizes it; the results are saved to
+    a cache file, and later scans only look at files whose size or
+    modification time changed. A scan is skipped entirely while the
+    folder's own modification time (which changes whenever a file is
+    added, removed or replaced) stays the same.
+    """
+    def __init__(self, folder, extension, cachePath, summarize):
+        """
+        Initialize the index. summarize(header) returns a picklable
+        summary of a file, given its first lib.detect.HEADER_SIZE bytes.
+        """
+        self.folder = folder
+        self.extension = extension.lower()
+        self.cachePath = cachePath
+        self.summarize = summarize
+
+        self.folderMtime = None
+        self.files = {}  # file name -> FileInfo
+        self.loadCache()
+
+
+    def loadCache(self):
+        """
+        Load the results of the last scan, if they're for this folder
+        """
+        try:
+            with open(self.cachePath, 'rb') as f:
+                state = pickle.load(f)
+            if state['version'] == INDEX_VERSION and state['folder'] == os.path.abspath(self.folder):
+                self.folderMtime = state['folderMtime']
+                self.files = state['files']
+        except Exception:
+            pass  # missing or corrupt; the next scan starts from scratch
+
+
+    def saveCache(self):
+        """
+        Save the results of the last scan
+        """
+        state = {
+            'version': INDEX_VERSION,
+            'folder': os.path.abspath(self.folder),
+            'folderMtime': self.folderMtime,
+            'files': self.files,
+            }
+
+        folder = os.path.dirname(self.cachePath)
+        os.makedirs(folder, exist_ok=True)
+        fd, tempPath = tempfile.mkstemp(suffix='.tmp', dir=folder)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tempPath, self.cachePath)
+        except BaseException:
+            os.unlink(tempPath)
+            raise
+
+
+    def scan(self, force=False):
+        """
+        Bring the index up to date with the folder. Returns True if
+        anything was looked at again.
+        """
+        try:
+            folderMtime = os.stat(self.folder).st_mtime_ns
+        except OSError:
+            folderMtime = None
+        if folderMtime == self.folderMtime and not force:
+            return False
+
+        files = {}
+        if folderMtime is not None:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if not entry.name.lower().endswith(self.extension) or not entry.is_file():
+                        continue
+
+                    st = entry.stat()
+                    info = self.files.get(entry.name)
+                    if info is None or info.size != st.st_size or info.mtime != st.st_mtime_ns:
+                        info = FileInfo(st.st_size, st.st_mtime_ns, self.summarizeFile(entry.path))
+                    files[entry.name] = info
+
+        self.files = files
+        self.folderMtime = folderMtime
+        try:
+            self.saveCache()
+        except OSError:
+            pass  # the cache is only an optimization
+        return True
+
+
+    def summarizeFile(self, path):
+        """
+        Return the summary of the file at path, or None if it can't be
+        read or isn't recognized
+        """
+        try:
+            with open(path, 'rb') as f:
+                return self.summarize(f.read(detect.HEADER_SIZE))
+        except Exception:
+            return None
+
+
+    def levels(self, levelNames=()):
+        """
+        Return a LevelEntry for every level in levelNames (an iterable
+        of lib.xmlstream.LevelNameRecords, such as a game's resolved
+        levelnames.xml table), in order, followed by any other level
+        files in the folder
+        """
+        # Names in levelnames.xml don't always match the case on disk
+        diskNames = {fileName.lower(): fileName for fileName in self.files}
+        entries = []
+
+        for record in levelNames:
+            fileName = diskNames.pop((record.file + self.extension).lower(), record.file + self.extension)
+            entries.append(self.entry(record.categories, record.name, fileName))
+
+        for fileName in sorted(diskNames.values()):
+            entries.append(self.entry((), fileName[:-len(self.extension)], fileName))
+
+        return entries
+
+
+    def entry(self, categories, name, fileName):
+        """
+        Make the LevelEntry for a file name
+        """
+        return LevelEntry(categories, name, fileName, os.path.join(self.folder, fileName), self.files.get(fileName))
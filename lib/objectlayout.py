@@ -0,0 +1,225 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# objectlayout.py
+# Decodes tileset object definitions and lays objects out as grids of
+# tile numbers, following their repeat and slope rules
+
+
+################################################################
+################################################################
+
+# Imports
+import struct
+
+
+# Object index entries: offset into the definitions, width, height
+INDEX_STRUCT = struct.Struct('>HBB')
+
+# Control bytes in object definitions
+ROW_END = 0xFE
+OBJECT_END = 0xFF
+SLOPE_FLAG = 0x80  # starts a slope section; the low bits give its direction
+REPEAT_X = 0x01
+REPEAT_Y = 0x02
+SLOPE_LEFT = 0x01  # slope rises towards the left
+SLOPE_DOWN = 0x02  # slope hangs from the top (a ceiling)
+
+EMPTY = -1  # tile number for cells an object leaves blank
+
+
+
+class ObjectDef:
+    """
+    One object from a tileset: rows of (flags, tile number) pairs and
+    slope control bytes. Tile numbers are slot * 256 + tile.
+    """
+    __slots__ = ('width', 'height', 'rows')
+
+    def __init__(self, width, height, rows):
+        self.width = width
+        self.height = height
+        self.rows = rows
+
+
+    @property
+    def isSlope(self):
+        """
+        True if the object is drawn diagonally
+        """
+        return bool(self.rows and self.rows[0] and isinstance(self.rows[0][0], int))
+
+
+
+def parseObjectDefs(index, data):
+    """
+    Parse a tileset's object index (*_hd.bin) and definitions (*.bin)
+    into a list of ObjectDefs
+    """
+    objects = []
+    for offset, width, height in INDEX_STRUCT.iter_unpack(index[:len(index) - len(index) % INDEX_STRUCT.size]):
+        objects.append(ObjectDef(width, height, parseRows(data, offset)))
+    return objects
+
+
+def parseRows(data, offset):
+    """
+    Parse the rows of one object definition, starting at offset. Slope
+    control bytes are kept as plain ints; tiles are (flags, number).
+    """
+    rows = []
+    row = []
+    i = offset
+    while i < len(data):
+        control = data[i]
+        if control == OBJECT_END:
+            break
+        elif control == ROW_END:
+            rows.append(row)
+            row = []
+            i += 1
+        elif control & SLOPE_FLAG:
+            row.append(control)
+            i += 1
+        else:
+            if i + 2 >= len(data): break
+            extra = data[i + 2]
+            row.append((control, data[i + 1] | ((extra & 3) << 8)))
+            i += 3
+    if row:
+        rows.append(row)
+    return rows
+
+
+def layoutObject(obj, width, height):
+    """
+    Return the tile numbers of obj at the given size, as a list of rows
+    (EMPTY where nothing is drawn)
+    """
+    grid = [[EMPTY] * width for y in range(height)]
+    if not obj.rows or width <= 0 or height <= 0:
+        return grid
+    if obj.isSlope:
+        layoutSlope(grid, obj, width, height)
+    else:
+        layoutStandard(grid, obj, width, height)
+    return grid
+
+
+def splitRepeat(parts, isRepeated, size):
+    """
+    Return which of parts (tiles of a row, or rows) to use for each of
+    size positions. Parts before the repeated run are used once at the
+    start, parts after it once at the end, and the run fills the
+    middle; with no repeated run, all of them repeat from the start.
+    """
+    before, repeat, after = [], [], []
+    for part in parts:
+        if isRepeated(part):
+            repeat.append(part)
+        elif repeat:
+            after.append(part)
+        else:
+            before.append(part)
+
+    if not repeat:
+        return [before[i % len(before)] for i in range(size)]
+
+    result = []
+    for i in range(size):
+        if i < len(before):
+            result.append(before[i])
+        elif i >= size - len(after):
+            result.append(after[i - size + len(after)])
+        else:
+            result.append(repeat[(i - len(before)) % len(repeat)])
+    return result
+
+
+def layoutStandard(grid, obj, width, height):
+    """
+    Lay out an object made of repeating rows
+    """
+    rows = [row for row in obj.rows if row]
+    rowFlags = lambda row: any(tile[0] & REPEAT_Y for tile in row)
+    for y, row in enumerate(splitRepeat(rows, rowFlags, height)):
+        tiles = splitRepeat(row, lambda tile: tile[0] & REPEAT_X, width)
+        grid[y] = [tile[1] for tile in tiles]
+
+
+def slopeSections(obj):
+    """
+    Return the blocks (grids of tile numbers) of a slope object: the
+    main block, which is stepped along the slope, and the optional sub
+    block, which fills the space under (or above) each step
+    """
+    sections = []
+    for row in obj.rows:
+        if row and isinstance(row[0], int):
+            sections.append([])
+        if sections:
+            sections[-1].append([tile[1] for tile in row if not isinstance(tile, int)])
+
+    blocks = []
+    for rows in sections[:2]:
+        blockWidth = max((len(row) for row in rows), default=0)
+        blocks.append([row + [EMPTY] * (blockWidth - len(row)) for row in rows])
+    return blocks[0], (blocks[1] if len(blocks) > 1 else None)
+
+
+def layoutSlope(grid, obj, width, height):
+    """
+    Lay out a slope: the main block is repeated diagonally from one
+    bottom (or top) corner, with the sub block next to each step
+    """
+    main, sub = slopeSections(obj)
+    if not main or not main[0]: return
+    control = obj.rows[0][0]
+    goLeft, goDown = control & SLOPE_LEFT, control & SLOPE_DOWN
+
+    stepWidth, stepHeight = len(main[0]), len(main)
+    subHeight = len(sub) if sub else 0
+
+    x = width - stepWidth if goLeft else 0
+    y = subHeight if goDown else height - stepHeight - subHeight
+    while -stepWidth < x < width and -stepHeight - subHeight < y < height + subHeight:
+        putBlock(grid, x, y, main)
+        if sub:
+            putBlock(grid, x, y - subHeight if goDown else y + stepHeight, sub)
+        x += -stepWidth if goLeft else stepWidth
+        y += stepHeight if goDown else -stepHeight
+
+
+def putBlock(grid, x, y, block):
+    """
+    Copy the non-empty tiles of block into grid at (x, y), clipped
+    """
+    height, width = len(grid), len(grid[0])
+    for by, row in enumerate(block):
+        gy = y + by
+        if not 0 <= gy < height: continue
+        for bx, tile in enumerate(row):
+            gx = x + bx
+            if tile != EMPTY and 0 <= gx < width:
+                grid[gy][gx] = tile
@@ -0,0 +1,243 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# overlay.py
+# Keyed gameinfo tables (backgrounds, music, tile descriptions, tilesets,
+# level names...) that mods store as differences from their parent game's
+
+
+################################################################
+################################################################
+
+# Imports
+import collections.abc
+import os
+
+from . import xmlstream
+
+
+# Marks a line (or, in XML files, a file name) that removes an entry
+# from the parent's table
+REMOVED_PREFIX = '-'
+
+# (path, parser) -> (stamp, (entries, removed))
+layerCache = {}
+
+# (paths, parser) -> (stamps, OverlayTable)
+resolvedCache = {}
+
+
+
+class OverlayTable(collections.abc.Mapping):
+    """
+    A read-only table laid over its parent's. It holds only the entries
+    that were added or changed and the keys that were removed; anything
+    else is looked up in the parent, which is shared by every mod built
+    on the same game. Memory use therefore grows with the size of the
+    differences rather than with the size of the table.
+    """
+    __slots__ = ('parent', 'changes', 'removed', 'length')
+
+    def __init__(self, changes, removed=frozenset(), parent=None):
+        """
+        Initialize the table
+        """
+        self.parent = parent
+        self.changes = changes
+        self.removed = frozenset(removed)
+        self.length = None
+
+
+    @classmethod
+    def fromLayer(cls, entries, removed, parent):
+        """
+        Make a table from one layer's entries, dropping the ones that
+        are the same as in parent: a mod that ships a complete copy of
+        its parent's file only keeps what it actually changed
+        """
+        if parent is None:
+            return cls(dict(entries), (), None)
+
+        missing = object()
+        changes = {key: value for key, value in entries.items() if parent.get(key, missing) != value}
+        removed = {key for key in removed if key in parent}
+        return cls(changes, removed, parent)
+
+
+    def __getitem__(self, key):
+        if key in self.changes:
+            return self.changes[key]
+        if key in self.removed or self.parent is None:
+            raise KeyError(key)
+        return self.parent[key]
+
+
+    def __contains__(self, key):
+        if key in self.changes: return True
+        if key in self.removed or self.parent is None: return False
+        return key in self.parent
+
+
+    def __iter__(self):
+        """
+        Iterate over the keys: the parent's, in its order, followed by
+        the ones this table adds
+        """
+        parent, removed = self.parent, self.removed
+        if parent is not None:
+            for key in parent:
+                if key not in removed:
+                    yield key
+        for key in self.changes:
+            if parent is None or key in removed or key not in parent:
+                yield key
+
+
+    def __len__(self):
+        if self.length is None:
+            self.length = sum(1 for key in self)
+        return self.length
+
+
+    def diff(self):
+        """
+        Return (changes, removed): what this table changes relative to
+        its parent
+        """
+        return dict(self.changes), set(self.removed)
+
+
+
+def fileStamp(path):
+    """
+    Return what identifies the current contents of the file at path
+    """
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def loadLayer(path, parser):
+    """
+    Return (entries, removed) for one file, parsed with parser (which
+    takes a path and returns the same). Each file is only parsed again
+    if it changes.
+    """
+    stamp = fileStamp(path)
+    cached = layerCache.get((path, parser))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    layer = parser(path)
+    layerCache[path, parser] = (stamp, layer)
+    return layer
+
+
+def resolve(paths, parser):
+    """
+    Return the OverlayTable for a stack of files, least-to-most
+    specific (as returned by _GameObj.getFiles()). The table for every
+    prefix of the stack is cached too, so games sharing a parent share
+    its table.
+    """
+    paths = tuple(paths)
+    if not paths:
+        return OverlayTable({})
+
+    parent = resolve(paths[:-1], parser) if len(paths) > 1 else None
+    stamp = fileStamp(paths[-1])
+    cached = resolvedCache.get((paths, parser))
+    if cached is not None and cached[0] == stamp and cached[1].parent is parent:
+        return cached[1]
+
+    entries, removed = loadLayer(paths[-1], parser)
+    table = OverlayTable.fromLayer(entries, removed, parent)
+    resolvedCache[paths, parser] = (stamp, table)
+    return table
+
+
+def parseTextTable(path, separator):
+    """
+    Parse a table of "key<separator>value" lines. A line consisting of
+    REMOVED_PREFIX and a key removes that entry from the parent's table.
+    """
+    entries = {}
+    removed = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+
+            key, sep, value = line.partition(separator)
+            if not sep and line.startswith(REMOVED_PREFIX):
+                removed.add(line[len(REMOVED_PREFIX):].strip())
+            elif sep:
+                entries[key.strip()] = value.strip()
+    return entries, removed
+
+
+def parseEqualsTable(path):
+    """
+    Parse a "key=value" table, like bga.txt
+    """
+    return parseTextTable(path, '=')
+
+
+def parseColonTable(path):
+    """
+    Parse a "key:value" table, like music.txt
+    """
+    return parseTextTable(path, ':')
+
+
+
+def parseTilesets(path):
+    """
+    Parse a tilesets.xml into entries keyed by (slot, filename), whose
+    values are lib.xmlstream.TilesetRecords. A <tileset> whose filename
+    starts with REMOVED_PREFIX removes that tileset from the slot.
+    """
+    entries = {}
+    removed = set()
+    for record in xmlstream.iterTilesets(path):
+        if record.filename.startswith(REMOVED_PREFIX):
+            removed.add((record.slot, record.filename[len(REMOVED_PREFIX):]))
+        else:
+            entries[record.slot, record.filename] = record
+    return entries, removed
+
+
+def parseLevelNames(path):
+    """
+    Parse a levelnames.xml into entries keyed by level file, whose
+    values are lib.xmlstream.LevelNameRecords. A <level> whose file
+    starts with REMOVED_PREFIX removes that level.
+    """
+    entries = {}
+    removed = set()
+    for record in xmlstream.iterLevelNames(path):
+        if record.file.startswith(REMOVED_PREFIX):
+            removed.add(record.file[len(REMOVED_PREFIX):])
+        else:
+            entries[record.file] = record
+    return entries, removed
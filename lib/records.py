@@ -0,0 +1,213 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# records.py
+# Fast decoding of binary blocks made of fixed-size records, using
+# precompiled structs (or NumPy structured arrays, if NumPy is installed)
+
+
+################################################################
+################################################################
+
+# Imports
+import collections
+import itertools
+import operator
+import re
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# struct format characters -> NumPy type codes (without byte order)
+NUMPY_TYPES = {
+    'b': 'i1', 'B': 'u1', '?': 'b1',
+    'h': 'i2', 'H': 'u2',
+    'i': 'i4', 'I': 'u4', 'l': 'i4', 'L': 'u4',
+    'q': 'i8', 'Q': 'u8',
+    'f': 'f4', 'd': 'f8',
+    }
+NUMPY_BYTE_ORDERS = {'>': '>', '!': '>', '<': '<', '=': '=', '@': '='}
+
+
+
+class RecordFormat:
+    """
+    Describes one kind of fixed-size record: its struct format and
+    field names. Everything is compiled once, up front.
+    """
+    def __init__(self, name, fmt, fields, terminated=False, terminatorSize=None):
+        """
+        fmt is a struct format with an explicit byte order. If
+        terminated is True, the list of records ends at the first
+        record whose first field is all 0xFF bytes. terminatorSize is
+        how many 0xFF bytes encode() writes there (a whole record if
+        None); files often only have enough to cover the first field.
+        """
+        self.name = name
+        self.struct = struct.Struct(fmt)
+        self.size = self.struct.size
+        self.fields = tuple(fields)
+        self.record = collections.namedtuple(name, self.fields)
+        self.terminated = terminated
+        self.terminatorSize = self.size if terminatorSize is None else terminatorSize
+
+        self.dtype = self.makeDtype(fmt) if numpy is not None else None
+
+
+    def makeDtype(self, fmt):
+        """
+        Build a NumPy structured dtype with the same layout as fmt
+        """
+        byteOrder = NUMPY_BYTE_ORDERS[fmt[0]]
+        names, formats, offsets = [], [], []
+        offset = 0
+        fieldIter = iter(self.fields)
+
+        for count, code in re.findall(r'(\d*)([a-zA-Z?])', fmt[1:]):
+            count = int(count) if count else 1
+            if code == 'x':
+                offset += count
+            elif code == 's':
+                # 'S' would strip trailing NULs; 'V' keeps every byte
+                names.append(next(fieldIter))
+                formats.append('V%d' % count)
+                offsets.append(offset)
+                offset += count
+            else:
+                typ = NUMPY_TYPES[code]
+                for i in range(count):
+                    names.append(next(fieldIter))
+                    formats.append(byteOrder + typ)
+                    offsets.append(offset)
+                    offset += int(typ[1:])
+
+        return numpy.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': self.size})
+
+
+    def decode(self, buffer, useNumpy=True):
+        """
+        Decode all records in buffer (any bytes-like object) and return
+        a RecordTable
+        """
+        buffer = memoryview(buffer).cast('B')
+        count = len(buffer) // self.size
+
+        if useNumpy and self.dtype is not None:
+            # numpy.frombuffer doesn't copy anything
+            records = numpy.frombuffer(buffer, self.dtype, count)
+            if self.terminated:
+                ends = numpy.flatnonzero(records[self.fields[0]] == self.terminatorValue())
+                if len(ends):
+                    records = records[:ends[0]]
+            return RecordTable(self, records)
+
+        records = map(self.record._make, self.struct.iter_unpack(buffer[:count * self.size]))
+        if self.terminated:
+            terminator = self.terminatorValue()
+            records = itertools.takewhile(lambda r: r[0] != terminator, records)
+        return RecordTable(self, list(records))
+
+
+    def terminatorValue(self):
+        """
+        Return the value the first field has in a terminator record
+        """
+        return self.struct.unpack(b'\xFF' * self.size)[0]
+
+
+    def encode(self, records):
+        """
+        Encode an iterable of records (tuples in field order) to bytes,
+        adding a terminator if needed
+        """
+        pack = self.struct.pack
+        data = b''.join(pack(*r) for r in records)
+        if self.terminated:
+            data += b'\xFF' * self.terminatorSize
+        return data
+
+
+
+class RecordTable:
+    """
+    A decoded list of records. Backed by either a NumPy structured
+    array or a list of namedtuples; either way, iterating and indexing
+    give namedtuples of plain Python values, and column() gives fast
+    access to one field of every record.
+    """
+    __slots__ = ('format', 'records')
+
+    def __init__(self, format, records):
+        self.format = format
+        self.records = records
+
+
+    def __len__(self):
+        return len(self.records)
+
+
+    def __iter__(self):
+        if self.isNumpy:
+            return map(self.format.record._make, self.records.tolist())
+        return iter(self.records)
+
+
+    def __getitem__(self, idx):
+        if self.isNumpy:
+            values = self.records[idx].tolist()
+            if isinstance(idx, slice):
+                return list(map(self.format.record._make, values))
+            return self.format.record._make(values)
+        return self.records[idx]
+
+
+    @property
+    def isNumpy(self):
+        """
+        True if this table is backed by a NumPy array
+        """
+        return numpy is not None and isinstance(self.records, numpy.ndarray)
+
+
+    def column(self, name):
+        """
+        Return the values of field name for all records: a NumPy array
+        if this table is backed by one, or a list otherwise
+        """
+        if self.isNumpy:
+            return self.records[name]
+        return list(map(operator.itemgetter(self.format.fields.index(name)), self.records))
+
+
+    def tuples(self):
+        """
+        Return the records as a list of plain tuples
+        """
+        if self.isNumpy:
+            return self.records.tolist()
+        return [tuple(r) for r in self.records]
@@ -0,0 +1,165 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# resourcetables.py
+# Typed, immutable lookup tables for small gameinfo resources such as
+# bga.txt, music.txt and ts1_descriptions.txt
+
+
+################################################################
+################################################################
+
+# Imports
+import bisect
+
+from . import overlay
+
+
+
+class TableFormat:
+    """
+    How one kind of resource table is written: "key<separator>name"
+    lines whose keys are integers in the given base. Instances are
+    used as lib.overlay parsers.
+    """
+    def __init__(self, separator, keyBase=10):
+        self.separator = separator
+        self.keyBase = keyBase
+
+
+    def __call__(self, path):
+        """
+        Parse the file at path into (entries, removed), with int keys.
+        Lines with malformed keys are skipped.
+        """
+        entries, removed = overlay.parseTextTable(path, self.separator)
+        return self.convertKeys(entries.items()), set(self.convertKeys((key, None) for key in removed))
+
+
+    def convertKeys(self, pairs):
+        """
+        Return {int key: value} for (text key, value) pairs
+        """
+        converted = {}
+        for key, value in pairs:
+            try:
+                converted[int(key, self.keyBase)] = value
+            except ValueError:
+                pass
+        return converted
+
+
+    def formatKey(self, key):
+        """
+        Return key the way it's written in the file (for display)
+        """
+        return '%04X' % key if self.keyBase == 16 else str(key)
+
+
+# File name -> TableFormat
+FORMATS = {
+    'bga.txt': TableFormat('=', 16),
+    'bgb.txt': TableFormat('=', 16),
+    'music.txt': TableFormat(':'),
+    'entrancetypes.txt': TableFormat(':'),
+    'ts1_descriptions.txt': TableFormat('='),
+    }
+
+# (paths, format) -> ResourceTable
+tableCache = {}
+
+
+
+class ResourceTable:
+    """
+    An immutable table of (key, name) pairs, sorted by key. Lookups are
+    binary searches, and the order is the one combo boxes should use.
+    """
+    __slots__ = ('format', 'keys', 'names', 'source')
+
+    def __init__(self, format, items, source=None):
+        """
+        Initialize the table from (key, name) pairs. source is the
+        overlay table it was made from, if any.
+        """
+        items = sorted(items)
+        self.format = format
+        self.keys = tuple(key for key, name in items)
+        self.names = tuple(name for key, name in items)
+        self.source = source
+
+
+    def __len__(self):
+        return len(self.keys)
+
+
+    def __iter__(self):
+        return zip(self.keys, self.names)
+
+
+    def __contains__(self, key):
+        return self.indexOf(key) is not None
+
+
+    def indexOf(self, key):
+        """
+        Return the position of key (a combo box index), or None
+        """
+        idx = bisect.bisect_left(self.keys, key)
+        if idx < len(self.keys) and self.keys[idx] == key:
+            return idx
+        return None
+
+
+    def name(self, key, default=None):
+        """
+        Return the name for key
+        """
+        idx = self.indexOf(key)
+        return default if idx is None else self.names[idx]
+
+
+    def label(self, idx):
+        """
+        Return the text to show for the entry at position idx, like
+        "0102: Overworld Hills"
+        """
+        return '%s: %s' % (self.format.formatKey(self.keys[idx]), self.names[idx])
+
+
+
+def loadTable(paths, format):
+    """
+    Return the ResourceTable for a stack of files (least-to-most
+    specific), each one laid over the previous. Tables are memoized by
+    their files, so games that resolve to the same files share one.
+    """
+    paths = tuple(paths)
+    source = overlay.resolve(paths, format)
+
+    table = tableCache.get((paths, format))
+    if table is None or table.source is not source:
+        table = ResourceTable(format, source.items(), source)
+        tableCache[paths, format] = table
+    return table
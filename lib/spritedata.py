@@ -0,0 +1,447 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# spritedata.py
+# Compiler and binary cache for spritedata.xml sprite definitions
+
+
+################################################################
+################################################################
+
+# Imports
+import io
+import os
+import pickle
+import tempfile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from . import xmlstream
+
+
+CACHE_VERSION = 2  # bump when the compiled format changes
+SETTINGS_NYBBLES = 16  # nybbles are numbered 1-16 in spritedata.xml
+SETTINGS_BITS = SETTINGS_NYBBLES * 4
+
+
+
+class SpriteField:
+    """
+    One setting of a sprite (a checkbox, list, value or bitfield), with
+    its bit position worked out ahead of time. Long text (the comment)
+    is kept out of line; see SpriteDataCatalog.text().
+    """
+    __slots__ = ('kind', 'title', 'shift', 'mask', 'checkMask', 'entries', 'commentID')
+
+    def __init__(self, kind, title, shift, mask, checkMask=None, entries=(), commentID=None):
+        self.kind = kind
+        self.title = title
+        self.shift = shift  # of the field's lowest bit, within the settings
+        self.mask = mask  # of the whole field, after shifting
+        self.checkMask = checkMask  # bits a checkbox sets, within the field
+        self.entries = entries  # (value, name) pairs, for lists
+        self.commentID = commentID
+
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+    def get(self, settings):
+        """
+        Return the field's value from settings (an int; see
+        settingsToInt()). Checkboxes return True or False.
+        """
+        value = (settings >> self.shift) & self.mask
+        if self.kind == 'checkbox':
+            return value & self.checkMask == self.checkMask
+        return value
+
+
+    def set(self, settings, value):
+        """
+        Return settings with the field set to value
+        """
+        if self.kind == 'checkbox':
+            current = (settings >> self.shift) & self.mask
+            value = current | self.checkMask if value else current & ~self.checkMask
+        value &= self.mask
+        return (settings & ~(self.mask << self.shift)) | (value << self.shift)
+
+
+
+class SpriteDef:
+    """
+    A sprite's name and settings fields
+    """
+    __slots__ = ('id', 'name', 'fields', 'notesID')
+
+    def __init__(self, id, name, fields, notesID=None):
+        self.id = id
+        self.name = name
+        self.fields = fields
+        self.notesID = notesID
+
+
+    def __getstate__(self):
+        return (self.id, self.name, self.fields, self.notesID)
+
+
+    def __setstate__(self, state):
+        self.id, self.name, self.fields, self.notesID = state
+
+
+
+def settingsToInt(data):
+    """
+    Convert sprite settings bytes to the int that SpriteField works on
+    """
+    return int.from_bytes(bytes(data[:SETTINGS_BITS // 8]), 'big')
+
+
+def intToSettings(settings):
+    """
+    The opposite of settingsToInt()
+    """
+    return settings.to_bytes(SETTINGS_BITS // 8, 'big')
+
+
+def nybbleRange(text):
+    """
+    Return (shift, mask) for a nybble attribute like "5" or "5-6"
+    """
+    first, _, last = text.partition('-')
+    first = int(first)
+    last = int(last) if last else first
+    return (SETTINGS_NYBBLES - last) * 4, (1 << ((last - first + 1) * 4)) - 1
+
+
+def compileField(node, texts):
+    """
+    Compile one field node of a <sprite>, adding its comment to texts
+    """
+    kind = node.tag.lower()
+    attrib = node.attrib
+
+    comment = attrib.get('comment') or attrib.get('note')
+    commentID = None
+    if comment:
+        commentID = len(texts)
+        texts.append(comment)
+
+    if kind == 'bitfield':
+        startBit, bitCount = int(attrib['startbit']), int(attrib['bitnum'])
+        shift, mask = SETTINGS_BITS - startBit - bitCount, (1 << bitCount) - 1
+    else:
+        shift, mask = nybbleRange(attrib['nybble'])
+
+    checkMask = None
+    entries = ()
+    if kind == 'checkbox':
+        checkMask = int(attrib.get('mask', 1))
+    elif kind == 'list':
+        entries = tuple((int(e.attrib['value']), e.text or '') for e in node if e.tag.lower() == 'entry')
+
+    return SpriteField(kind, attrib.get('title', ''), shift, mask, checkMask, entries, commentID)
+
+
+def fieldBytes(field):
+    """
+    Return (first, last, shift) for field: the settings bytes it spans,
+    and how far right their big-endian value must be shifted to bring
+    the field down to bit 0
+    """
+    end = SETTINGS_BITS - field.shift  # one past the field's last bit
+    first = (end - field.mask.bit_length()) // 8
+    last = (end - 1) // 8
+    return first, last, (last + 1) * 8 - end
+
+
+def fieldExpression(field, var='data'):
+    """
+    Return Python source for an expression that reads field straight
+    from the settings bytes in var, like the hand-written
+    "(data[4] & 0x30) >> 4" in sprite classes
+    """
+    first, last, shift = fieldBytes(field)
+    expr = ' | '.join('%s[%d] << %d' % (var, i, (last - i) * 8) if i != last else '%s[%d]' % (var, i)
+                      for i in range(first, last + 1))
+    if first != last:
+        expr = '(%s)' % expr
+    if shift:
+        expr = '%s >> %d' % (expr, shift)
+    if field.mask != (1 << ((last - first + 1) * 8 - shift)) - 1:
+        expr = '(%s) & 0x%X' % (expr, field.mask) if shift else '%s & 0x%X' % (expr, field.mask)
+    if field.kind == 'checkbox':
+        expr = '(%s) & %d == %d' % (expr, field.checkMask, field.checkMask)
+    return expr
+
+
+# Generated getters, shared by every field with the same layout
+fieldGetters = {}
+
+def fieldGetter(field):
+    """
+    Return a function that takes sprite settings bytes (or a
+    memoryview) and returns field's value, as SpriteField.get() would
+    """
+    key = (field.kind == 'checkbox', field.shift, field.mask, field.checkMask)
+    getter = fieldGetters.get(key)
+    if getter is None:
+        getter = fieldGetters[key] = eval('lambda data: ' + fieldExpression(field))
+    return getter
+
+
+def compileDecoder(sprite):
+    """
+    Return a function that takes sprite settings bytes and returns the
+    values of all of sprite's fields as a tuple, in one step
+    """
+    exprs = [fieldExpression(field) for field in sprite.fields]
+    return eval('lambda data: (%s)' % ''.join(e + ', ' for e in exprs))
+
+
+def fieldValues(field, columns, spriteType=None):
+    """
+    Decode field for every item in columns (an ItemColumns whose item
+    data is sprite settings), or only the ones of type spriteType.
+    Returns (indices, values), as NumPy arrays if NumPy is installed.
+    """
+    stride = columns.dataSize
+    if numpy is None:
+        getter = fieldGetter(field)
+        data = memoryview(columns.data)
+        indices = [i for i, t in enumerate(columns.type) if spriteType is None or t == spriteType]
+        return indices, [getter(data[i * stride:(i + 1) * stride]) for i in indices]
+
+    if spriteType is None:
+        indices = numpy.arange(len(columns))
+    else:
+        indices = numpy.flatnonzero(numpy.frombuffer(columns.type, numpy.uint16) == spriteType)
+    rows = numpy.frombuffer(bytes(columns.data), numpy.uint8).reshape(-1, stride)[indices]
+
+    first, last, shift = fieldBytes(field)
+    values = numpy.zeros(len(rows), numpy.uint64)
+    for i in range(first, last + 1):
+        values |= rows[:, i].astype(numpy.uint64) << numpy.uint64((last - i) * 8)
+    values = (values >> numpy.uint64(shift)) & numpy.uint64(field.mask)
+    if field.kind == 'checkbox':
+        return indices, values & numpy.uint64(field.checkMask) == field.checkMask
+    return indices, values
+
+
+def setFieldValues(field, columns, indices, value):
+    """
+    Set field to value for the items at indices in columns, all at
+    once (for bulk edits)
+    """
+    stride = columns.dataSize
+    if numpy is None:
+        for i in indices:
+            settings = field.set(settingsToInt(columns.data[i * stride:(i + 1) * stride]), value)
+            columns.data[i * stride:i * stride + SETTINGS_BITS // 8] = intToSettings(settings)
+        columns.version += 1
+        return
+
+    indices = numpy.asarray(indices, numpy.intp)
+    rows = numpy.frombuffer(bytes(columns.data), numpy.uint8).reshape(-1, stride).copy()
+    first, last, shift = fieldBytes(field)
+    current = numpy.zeros(len(indices), numpy.uint64)
+    for i in range(first, last + 1):
+        current |= rows[indices, i].astype(numpy.uint64) << numpy.uint64((last - i) * 8)
+
+    fieldMask = numpy.uint64(field.mask << shift)
+    if field.kind == 'checkbox':
+        checkBits = numpy.uint64(field.checkMask << shift)
+        current = current | checkBits if value else current & ~checkBits
+    else:
+        current = (current & ~fieldMask) | (numpy.uint64(value << shift) & fieldMask)
+
+    for i in range(first, last + 1):
+        rows[indices, i] = (current >> numpy.uint64((last - i) * 8)) & numpy.uint64(0xFF)
+    columns.data[:] = rows.tobytes()
+    columns.version += 1
+
+
+def compileFiles(paths):
+    """
+    Parse spritedata.xml files, least-to-most specific: a sprite defined
+    in a later file replaces the same sprite from earlier ones. Returns
+    ({id: SpriteDef}, [long texts]).
+    """
+    sprites = {}
+    texts = []
+    for path in paths:
+        # ElementTree picks up the UTF-16 BOM by itself
+        for node, ancestors in xmlstream.iterElements(path, ('sprite',)):
+            notesID = None
+            if node.attrib.get('notes'):
+                notesID = len(texts)
+                texts.append(node.attrib['notes'])
+
+            fields = tuple(compileField(child, texts) for child in node if child.tag.lower() in ('checkbox', 'list', 'value', 'bitfield'))
+            spriteID = int(node.attrib['id'])
+            sprites[spriteID] = SpriteDef(spriteID, node.attrib.get('name', ''), fields, notesID)
+
+    return sprites, texts
+
+
+
+class SpriteDataCatalog:
+    """
+    The compiled sprite definitions for a game. Loaded from a cache
+    file when it's newer than every source XML file; otherwise the XML
+    is compiled and the cache rewritten. Notes and comments stay on
+    disk until text() asks for one.
+    """
+    def __init__(self, sprites, texts=None, cachePath=None, textStart=0, textOffsets=None):
+        """
+        Initialize the catalog. Long texts come either from memory
+        (texts) or from the cache file (cachePath; they start at
+        textStart, and textOffsets gives (offset, size) for each).
+        """
+        self.sprites = sprites
+        self.texts = texts
+        self.cachePath = cachePath
+        self.textStart = textStart
+        self.textOffsets = textOffsets
+        self.decoders = {}
+
+
+    @staticmethod
+    def sourceStamps(paths):
+        """
+        Return what identifies the current contents of paths
+        """
+        stamps = []
+        for path in paths:
+            st = os.stat(path)
+            stamps.append((os.path.abspath(path), st.st_size, st.st_mtime_ns))
+        return stamps
+
+
+    @classmethod
+    def load(cls, paths, cachePath):
+        """
+        Return the catalog for the spritedata.xml files at paths,
+        using (and maintaining) the cache file at cachePath
+        """
+        stamps = cls.sourceStamps(paths)
+
+        try:
+            with open(cachePath, 'rb') as f:
+                header = pickle.load(f)
+                textStart = f.tell()
+            if header['version'] == CACHE_VERSION and header['sources'] == stamps:
+                return cls(header['sprites'], cachePath=cachePath, textStart=textStart, textOffsets=header['textOffsets'])
+        except Exception:
+            pass  # missing, stale or corrupt; recompile below
+
+        sprites, texts = compileFiles(paths)
+        try:
+            cls.writeCache(cachePath, stamps, sprites, texts)
+        except OSError:
+            pass  # the cache is only an optimization
+        return cls(sprites, texts=texts)
+
+
+    @staticmethod
+    def writeCache(cachePath, stamps, sprites, texts):
+        """
+        Write the cache file: a pickled header with the sprite
+        definitions, followed by all of the long texts
+        """
+        blob = io.BytesIO()
+        textOffsets = []
+        for text in texts:
+            data = text.encode('utf-8')
+            textOffsets.append((blob.tell(), len(data)))
+            blob.write(data)
+
+        header = {
+            'version': CACHE_VERSION,
+            'sources': stamps,
+            'sprites': sprites,
+            'textOffsets': textOffsets,
+            }
+
+        folder = os.path.dirname(cachePath)
+        os.makedirs(folder, exist_ok=True)
+        fd, tempPath = tempfile.mkstemp(suffix='.tmp', dir=folder)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(header, f, pickle.HIGHEST_PROTOCOL)
+                f.write(blob.getvalue())
+            os.replace(tempPath, cachePath)
+        except BaseException:
+            os.unlink(tempPath)
+            raise
+
+
+    def text(self, textID):
+        """
+        Return the notes or comment with the given ID ('' for None)
+        """
+        if textID is None: return ''
+        if self.texts is not None:
+            return self.texts[textID]
+
+        offset, size = self.textOffsets[textID]
+        with open(self.cachePath, 'rb') as f:
+            f.seek(self.textStart + offset)
+            return f.read(size).decode('utf-8')
+
+
+    def __getitem__(self, spriteID):
+        return self.sprites[spriteID]
+
+
+    def __contains__(self, spriteID):
+        return spriteID in self.sprites
+
+
+    def decoder(self, spriteID):
+        """
+        Return the generated decoder for a sprite's fields (see
+        compileDecoder()), compiling it the first time it's needed
+        """
+        decoder = self.decoders.get(spriteID)
+        if decoder is None:
+            decoder = self.decoders[spriteID] = compileDecoder(self.sprites[spriteID])
+        return decoder
+
+
+    def names(self):
+        """
+        Return {id: name} for every sprite, for sprite lists
+        """
+        return {spriteID: sprite.name for spriteID, sprite in self.sprites.items()}
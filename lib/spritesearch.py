@@ -0,0 +1,255 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# spritesearch.py
+# An inverted index over sprite names, IDs, notes, field titles and
+# categories, for searching as you type
+
+
+################################################################
+################################################################
+
+# Imports
+import bisect
+import os
+import pickle
+import re
+import tempfile
+
+from . import spritedata, xmlstream
+
+
+INDEX_VERSION = 1  # bump when the index format changes
+
+# How much a match in each part of a sprite's definition counts for
+WEIGHT_ID = 10
+WEIGHT_NAME = 8
+WEIGHT_CATEGORY = 3
+WEIGHT_FIELD = 2
+WEIGHT_NOTES = 1
+
+# How much each kind of match is worth, relative to an exact one
+FACTOR_EXACT = 1.0
+FACTOR_PREFIX = 0.75
+FACTOR_FUZZY = 0.5
+
+FUZZY_MIN_LENGTH = 4  # shorter words are only matched by prefix
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+
+def tokenize(text):
+    """
+    Split text into lowercase words
+    """
+    return TOKEN_RE.findall(text.lower())
+
+
+def trigrams(token):
+    """
+    Return the set of three-letter pieces of token (padded at both
+    ends, so short tokens have some too)
+    """
+    padded = '$' + token + '$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def editDistance(a, b, limit):
+    """
+    Return the Levenshtein distance between a and b, or limit + 1 if
+    it's more than limit
+    """
+    if abs(len(a) - len(b)) > limit: return limit + 1
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit: return limit + 1
+        previous = current
+    return previous[-1]
+
+
+
+class SpriteSearchIndex:
+    """
+    Maps every word in the sprite definitions to the sprites it
+    appears in. Words are kept sorted, so a prefix is found with a
+    binary search, and a trigram table narrows fuzzy matches down to
+    a handful of words before any edit distances are computed. Nothing
+    is scanned sprite by sprite when searching.
+    """
+    def __init__(self, tokens, postings):
+        """
+        Initialize the index. tokens is the sorted list of words, and
+        postings[i] is a tuple of (spriteID, weight) for tokens[i].
+        """
+        self.tokens = tokens
+        self.postings = postings
+
+        self.trigramTable = {}
+        for idx, token in enumerate(tokens):
+            if len(token) < FUZZY_MIN_LENGTH - 1: continue
+            for trigram in trigrams(token):
+                self.trigramTable.setdefault(trigram, []).append(idx)
+
+
+    @classmethod
+    def build(cls, catalog, categories=()):
+        """
+        Build the index for a SpriteDataCatalog. categories is an
+        iterable of xmlstream.SpriteCategoryRecord.
+        """
+        weights = {}  # token -> {spriteID: weight}
+
+        def add(text, spriteID, weight):
+            for token in tokenize(text):
+                sprites = weights.setdefault(token, {})
+                if sprites.get(spriteID, 0) < weight:
+                    sprites[spriteID] = weight
+
+        for spriteID, sprite in catalog.sprites.items():
+            add(str(spriteID), spriteID, WEIGHT_ID)
+            add(sprite.name, spriteID, WEIGHT_NAME)
+            add(catalog.text(sprite.notesID), spriteID, WEIGHT_NOTES)
+            for field in sprite.fields:
+                add(field.title, spriteID, WEIGHT_FIELD)
+
+        for record in categories:
+            for spriteID in record.sprites:
+                if spriteID in catalog:
+                    add(record.view + ' ' + record.category, spriteID, WEIGHT_CATEGORY)
+
+        tokens = sorted(weights)
+        return cls(tokens, [tuple(weights[token].items()) for token in tokens])
+
+
+    @classmethod
+    def load(cls, catalog, dataPaths, categoryPaths, cachePath):
+        """
+        Return the index for catalog, which was compiled from the
+        spritedata.xml files at dataPaths, with the categories from
+        categoryPaths. The index is read from cachePath if it's up to
+        date, and built and saved there otherwise.
+        """
+        stamps = spritedata.SpriteDataCatalog.sourceStamps(list(dataPaths) + list(categoryPaths))
+
+        try:
+            with open(cachePath, 'rb') as f:
+                state = pickle.load(f)
+            if state['version'] == INDEX_VERSION and state['sources'] == stamps:
+                return cls(state['tokens'], state['postings'])
+        except Exception:
+            pass  # missing, stale or corrupt; rebuild below
+
+        categories = []
+        for path in categoryPaths:
+            categories.extend(xmlstream.iterSpriteCategories(path))
+        index = cls.build(catalog, categories)
+
+        try:
+            index.save(cachePath, stamps)
+        except OSError:
+            pass  # the cache is only an optimization
+        return index
+
+
+    def save(self, cachePath, stamps):
+        """
+        Write the index to cachePath, tagged with the source stamps
+        """
+        state = {
+            'version': INDEX_VERSION,
+            'sources': stamps,
+            'tokens': self.tokens,
+            'postings': self.postings,
+            }
+
+        folder = os.path.dirname(cachePath)
+        os.makedirs(folder, exist_ok=True)
+        fd, tempPath = tempfile.mkstemp(suffix='.tmp', dir=folder)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tempPath, cachePath)
+        except BaseException:
+            os.unlink(tempPath)
+            raise
+
+
+    def matchTokens(self, word):
+        """
+        Return {token index: factor} for the words in the index that
+        match word exactly, by prefix or (for longer words) fuzzily
+        """
+        matches = {}
+
+        start = bisect.bisect_left(self.tokens, word)
+        end = bisect.bisect_left(self.tokens, word + '\uffff', start)
+        for idx in range(start, end):
+            matches[idx] = FACTOR_EXACT if self.tokens[idx] == word else FACTOR_PREFIX
+
+        if len(word) >= FUZZY_MIN_LENGTH and not word.isdigit():
+            limit = 1 if len(word) < 7 else 2
+            wordTrigrams = trigrams(word)
+
+            # Each edit changes at most three trigrams
+            counts = {}
+            for trigram in wordTrigrams:
+                for idx in self.trigramTable.get(trigram, ()):
+                    counts[idx] = counts.get(idx, 0) + 1
+            needed = len(wordTrigrams) - 3 * limit
+
+            for idx, count in counts.items():
+                if count < needed or idx in matches: continue
+                if editDistance(word, self.tokens[idx], limit) <= limit:
+                    matches[idx] = FACTOR_FUZZY
+
+        return matches
+
+
+    def search(self, query, limit=None):
+        """
+        Return the IDs of the sprites matching every word of query,
+        best matches first
+        """
+        scores = None
+        for word in tokenize(query):
+            wordScores = {}
+            for idx, factor in self.matchTokens(word).items():
+                for spriteID, weight in self.postings[idx]:
+                    score = weight * factor
+                    if wordScores.get(spriteID, 0) < score:
+                        wordScores[spriteID] = score
+
+            if scores is None:
+                scores = wordScores
+            else:
+                scores = {spriteID: score + wordScores[spriteID] for spriteID, score in scores.items() if spriteID in wordScores}
+            if not scores: return []
+
+        if scores is None: return []
+        return sorted(scores, key=lambda spriteID: (-scores[spriteID], spriteID))[:limit]
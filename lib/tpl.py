@@ -0,0 +1,221 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# tpl.py
+# Decoders for Wii (GX) textures and TPL files. Textures are stored in
+# 4x4-pixel blocks; with NumPy, whole textures are unswizzled and
+# converted at once.
+
+
+################################################################
+################################################################
+
+# Imports
+import array
+import struct
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# GX texture formats
+FORMAT_RGB5A3 = 5
+FORMAT_RGBA8 = 6
+
+# Bytes per pixel
+PIXEL_SIZES = {FORMAT_RGB5A3: 2, FORMAT_RGBA8: 4}
+
+BLOCK_SIZE = 4  # pixels per side of a block
+
+TPL_MAGIC = b'\x00\x20\xAF\x30'
+TPL_IMAGE_HEADER = struct.Struct('>HHIIII')  # height, width, format, data offset, ...
+
+
+
+class TPLError(Exception):
+    """
+    Raised for textures that can't be decoded
+    """
+    pass
+
+
+
+def paddedSize(width, height):
+    """
+    Return the size of a texture once it's padded to whole blocks
+    """
+    return -(-width // BLOCK_SIZE) * BLOCK_SIZE, -(-height // BLOCK_SIZE) * BLOCK_SIZE
+
+
+def decodeTexture(data, width, height, format):
+    """
+    Decode a texture to ARGB32 pixels (in native byte order, the way
+    QImage.Format_ARGB32 stores them), returned as bytes
+    """
+    if format not in PIXEL_SIZES:
+        raise TPLError('Unsupported texture format %d' % format)
+
+    paddedWidth, paddedHeight = paddedSize(width, height)
+    size = paddedWidth * paddedHeight * PIXEL_SIZES[format]
+    if len(data) < size:
+        raise TPLError('Texture data is too short')
+    data = memoryview(data)[:size]
+
+    if numpy is not None:
+        if format == FORMAT_RGB5A3:
+            pixels = decodeRGB5A3_numpy(data, paddedWidth, paddedHeight)
+        else:
+            pixels = decodeRGBA8_numpy(data, paddedWidth, paddedHeight)
+        return numpy.ascontiguousarray(pixels[:height, :width]).tobytes()
+
+    if format == FORMAT_RGB5A3:
+        values = array.array('H')
+        values.frombytes(data)
+        if sys.byteorder == 'little': values.byteswap()
+        values = array.array('I', map(rgb5a3Table().__getitem__, values))
+    else:
+        values = rgba8Values(data)
+    return unswizzle(values, width, height, paddedWidth).tobytes()
+
+
+def unblock(blocks, paddedWidth, paddedHeight):
+    """
+    Rearrange a NumPy array of shape (pixels, ...) in block order into
+    one of shape (paddedHeight, paddedWidth, ...) in row order
+    """
+    rest = blocks.shape[1:]
+    blocks = blocks.reshape((paddedHeight // BLOCK_SIZE, paddedWidth // BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE) + rest)
+    return blocks.swapaxes(1, 2).reshape((paddedHeight, paddedWidth) + rest)
+
+
+def decodeRGB5A3_numpy(data, paddedWidth, paddedHeight):
+    """
+    Decode an RGB5A3 texture to a (height, width, 4) BGRA array
+    """
+    values = unblock(numpy.frombuffer(data, '>u2').astype(numpy.uint32), paddedWidth, paddedHeight)
+    opaque = (values & 0x8000) != 0
+
+    # RGB555 when the top bit is set; ARGB3444 otherwise
+    r5, g5, b5 = (values >> 10) & 0x1F, (values >> 5) & 0x1F, values & 0x1F
+    a3, r4, g4, b4 = (values >> 12) & 7, (values >> 8) & 0xF, (values >> 4) & 0xF, values & 0xF
+
+    pixels = numpy.empty((paddedHeight, paddedWidth, 4), numpy.uint8)
+    pixels[..., 0] = numpy.where(opaque, (b5 << 3) | (b5 >> 2), b4 * 0x11)
+    pixels[..., 1] = numpy.where(opaque, (g5 << 3) | (g5 >> 2), g4 * 0x11)
+    pixels[..., 2] = numpy.where(opaque, (r5 << 3) | (r5 >> 2), r4 * 0x11)
+    pixels[..., 3] = numpy.where(opaque, 0xFF, (a3 << 5) | (a3 << 2) | (a3 >> 1))
+    return pixels
+
+
+def decodeRGBA8_numpy(data, paddedWidth, paddedHeight):
+    """
+    Decode an RGBA8 texture to a (height, width, 4) BGRA array. Each
+    block holds 16 AR pairs followed by 16 GB pairs.
+    """
+    raw = numpy.frombuffer(data, numpy.uint8).reshape(-1, 2, 16, 2)
+    ar, gb = raw[:, 0], raw[:, 1]
+
+    blocks = numpy.empty((raw.shape[0], 16, 4), numpy.uint8)
+    blocks[..., 0] = gb[..., 1]
+    blocks[..., 1] = gb[..., 0]
+    blocks[..., 2] = ar[..., 1]
+    blocks[..., 3] = ar[..., 0]
+    return unblock(blocks.reshape(-1, 4), paddedWidth, paddedHeight)
+
+
+# RGB5A3 value -> ARGB32 value, for when NumPy isn't available
+_rgb5a3Table = None
+
+def rgb5a3Table():
+    """
+    Return the RGB5A3 conversion table, building it the first time
+    """
+    global _rgb5a3Table
+    if _rgb5a3Table is None:
+        table = array.array('I', bytes(4 * 0x10000))
+        for v in range(0x10000):
+            if v & 0x8000:
+                r, g, b = (v >> 10) & 0x1F, (v >> 5) & 0x1F, v & 0x1F
+                table[v] = 0xFF000000 | ((r << 3 | r >> 2) << 16) | ((g << 3 | g >> 2) << 8) | (b << 3 | b >> 2)
+            else:
+                a = (v >> 12) & 7
+                table[v] = (((a << 5) | (a << 2) | (a >> 1)) << 24) | (((v >> 8) & 0xF) * 0x110000) | (((v >> 4) & 0xF) * 0x1100) | ((v & 0xF) * 0x11)
+        _rgb5a3Table = table
+    return _rgb5a3Table
+
+
+def rgba8Values(data):
+    """
+    Return the ARGB32 values of an RGBA8 texture, in block order
+    """
+    values = array.array('I')
+    for block in range(0, len(data), 64):
+        ar, gb = data[block:block + 32], data[block + 32:block + 64]
+        values.extend((ar[i] << 24) | (ar[i + 1] << 16) | (gb[i] << 8) | gb[i + 1] for i in range(0, 32, 2))
+    return values
+
+
+def unswizzle(values, width, height, paddedWidth):
+    """
+    Rearrange an array of pixel values in block order into row order,
+    cropped to width x height
+    """
+    pixels = array.array('I', bytes(4 * width * height))
+    blocksPerRow = paddedWidth // BLOCK_SIZE
+    for y in range(height):
+        src = ((y // BLOCK_SIZE) * blocksPerRow * BLOCK_SIZE + (y % BLOCK_SIZE)) * BLOCK_SIZE
+        for x in range(0, width, BLOCK_SIZE):
+            count = min(BLOCK_SIZE, width - x)
+            start = src + x * BLOCK_SIZE
+            pixels[y * width + x:y * width + x + count] = values[start:start + count]
+    return pixels
+
+
+def parseTPL(data):
+    """
+    Return a list of (format, width, height, data offset) for the
+    images in a TPL file
+    """
+    if bytes(data[:4]) != TPL_MAGIC:
+        raise TPLError('Not a TPL file')
+
+    count, tableOffset = struct.unpack_from('>II', data, 4)
+    images = []
+    for i in range(count):
+        headerOffset, paletteOffset = struct.unpack_from('>II', data, tableOffset + i * 8)
+        height, width, format, dataOffset = TPL_IMAGE_HEADER.unpack_from(data, headerOffset)[:4]
+        images.append((format, width, height, dataOffset))
+    return images
+
+
+def decodeTPL(data, index=0):
+    """
+    Decode one image of a TPL file. Returns (width, height, ARGB32
+    pixels as bytes).
+    """
+    format, width, height, dataOffset = parseTPL(data)[index]
+    return width, height, decodeTexture(memoryview(data)[dataOffset:], width, height, format)
@@ -0,0 +1,332 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# u8.py
+# Zero-copy reader and streaming writer for U8 archives (.arc), which
+# NSMBW uses for levels and tilesets
+
+
+################################################################
+################################################################
+
+# Imports
+import mmap
+import struct
+
+
+U8_MAGIC = b'U\xAA8-'
+
+HEADER_STRUCT = struct.Struct('>4sIII')
+NODE_STRUCT = struct.Struct('>III')
+
+ROOT_OFFSET = 0x20
+DATA_ALIGNMENT = 0x20
+
+
+
+class U8Error(Exception):
+    """
+    Raised when an archive is malformed
+    """
+    pass
+
+
+
+class U8Archive:
+    """
+    A read-only U8 archive backed by any buffer (bytes, bytearray,
+    memoryview, mmap). The node table and string pool are parsed once
+    into an index; file contents are handed out as memoryview slices
+    of the original buffer, so nothing is copied until it's decoded.
+    """
+    def __init__(self, buffer, checkBounds=True):
+        """
+        Index the archive in buffer. If checkBounds is False, buffer
+        may be just the start of an archive (enough to hold its node
+        table); the file list can then be read, but not the files.
+        """
+        self.data = memoryview(buffer).cast('B')
+        self.checkBounds = checkBounds
+        self.mmap = None
+        self.fileObj = None
+
+        self.files = {}  # path -> (offset, size)
+        self.dirs = {'': []}  # path -> [child names]
+
+        self.parseIndex()
+
+
+    @classmethod
+    def fromFile(cls, path):
+        """
+        Open the archive at path by memory-mapping it
+        """
+        f = open(path, 'rb')
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file; mmap can't map those
+            f.close()
+            raise U8Error('File is empty')
+
+        try:
+            arc = cls(mm)
+        except Exception:
+            mm.close()
+            f.close()
+            raise
+
+        arc.mmap = mm
+        arc.fileObj = f
+        return arc
+
+
+    @staticmethod
+    def looksValid(data):
+        """
+        Return True if data (at least 8 bytes of it) starts with a U8
+        header
+        """
+        if len(data) < 8: return False
+        return bytes(data[:4]) == U8_MAGIC and struct.unpack_from('>I', data, 4)[0] == 0x20
+
+
+    def parseIndex(self):
+        """
+        Parse the node table and string pool into self.files and
+        self.dirs
+        """
+        data = self.data
+        if len(data) < HEADER_STRUCT.size:
+            raise U8Error('File is too small to be a U8 archive')
+
+        magic, rootOffset, headerSize, dataOffset = HEADER_STRUCT.unpack_from(data, 0)
+        if magic != U8_MAGIC:
+            raise U8Error('Not a U8 archive')
+
+        if rootOffset + NODE_STRUCT.size > len(data):
+            raise U8Error('Node table starts past the end of the archive')
+
+        # The root node's size field is the total number of nodes
+        rootType, rootName, nodeCount = NODE_STRUCT.unpack_from(data, rootOffset)
+        tableEnd = rootOffset + nodeCount * NODE_STRUCT.size
+        if rootType >> 24 != 1 or nodeCount < 1 or tableEnd > len(data) or tableEnd > rootOffset + headerSize:
+            raise U8Error('Malformed node table')
+
+        # The string pool is tiny, so one copy of it is fine
+        strings = bytes(data[tableEnd:rootOffset + headerSize])
+
+        nodes = NODE_STRUCT.iter_unpack(data[rootOffset:tableEnd])
+        next(nodes)  # root
+
+        # Stack of (index of first node after this dir, dir path)
+        stack = [(nodeCount, '')]
+        for i, (typeAndName, offsetOrParent, sizeOrNext) in enumerate(nodes, 1):
+            while i >= stack[-1][0]:
+                stack.pop()
+            parentPath = stack[-1][1]
+
+            nameOffset = typeAndName & 0xFFFFFF
+            nameEnd = strings.find(b'\0', nameOffset)
+            if nameEnd == -1:
+                raise U8Error('Unterminated name in string pool')
+            name = strings[nameOffset:nameEnd].decode('latin-1')
+
+            if typeAndName >> 24 == 1:
+                if name in ('', '.'):
+                    # Some archives put everything in a "." folder
+                    path = parentPath
+                else:
+                    path = parentPath + '/' + name if parentPath else name
+                    self.dirs[parentPath].append(name)
+                    self.dirs.setdefault(path, [])
+                stack.append((sizeOrNext, path))
+
+            else:
+                if self.checkBounds and offsetOrParent + sizeOrNext > len(data):
+                    raise U8Error('File "%s" extends past the end of the archive' % name)
+                path = parentPath + '/' + name if parentPath else name
+                self.files[path] = (offsetOrParent, sizeOrNext)
+                self.dirs[parentPath].append(name)
+
+
+    def __contains__(self, path):
+        return path.strip('/') in self.files
+
+
+    def __getitem__(self, path):
+        """
+        Return the contents of the file at path as a memoryview
+        """
+        offset, size = self.files[path.strip('/')]
+        return self.data[offset:offset + size]
+
+
+    def get(self, path, default=None):
+        """
+        Like dict.get()
+        """
+        if path not in self: return default
+        return self[path]
+
+
+    def listdir(self, path=''):
+        """
+        Return the names of the files and folders in the folder at path
+        """
+        return list(self.dirs[path.strip('/')])
+
+
+    def close(self):
+        """
+        Release the underlying buffer. Any memoryviews handed out
+        must have been released first if the archive was mmapped.
+        """
+        self.data.release()
+        if self.mmap is not None:
+            self.mmap.close()
+            self.fileObj.close()
+            self.mmap = self.fileObj = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+class U8Writer:
+    """
+    Writes a U8 archive to a seekable file in a single pass. Each
+    file's contents are given as an iterable of bytes-like chunks
+    (typically a generator), so the archive is never assembled in
+    memory: the data is streamed out first, and the node table, whose
+    offsets and sizes are only known afterwards, is written last by
+    seeking back to the start.
+    """
+    def __init__(self):
+        """
+        Initialize an empty archive
+        """
+        self.root = {}  # name -> dict (folder) or iterable (file)
+
+
+    def addFile(self, path, chunks):
+        """
+        Add a file at path, with contents given by chunks. Folders are
+        created as needed. Files are written in the order they're
+        added.
+        """
+        *folders, name = path.strip('/').split('/')
+        folder = self.root
+        for f in folders:
+            folder = folder.setdefault(f, {})
+            if not isinstance(folder, dict):
+                raise U8Error('"%s" is a file, not a folder' % f)
+        folder[name] = chunks
+
+
+    def flattenNodes(self):
+        """
+        Return the archive's nodes in U8 (depth-first) order, as a
+        list of [name, contents, parent index, next index] lists. The
+        last two are only meaningful for folders.
+        """
+        nodes = [['', self.root, 0, 0]]
+
+        def addFolder(folder, folderIdx):
+            for name, contents in folder.items():
+                idx = len(nodes)
+                nodes.append([name, contents, folderIdx, 0])
+                if isinstance(contents, dict):
+                    addFolder(contents, idx)
+                    nodes[idx][3] = len(nodes)
+
+        addFolder(self.root, 0)
+        nodes[0][3] = len(nodes)
+        return nodes
+
+
+    def write(self, f):
+        """
+        Write the archive to f, which must be seekable. Return the
+        total number of bytes written.
+        """
+        nodes = self.flattenNodes()
+
+        # The string pool can be laid out right away; names are known
+        strings = bytearray()
+        nameOffsets = []
+        for name, *_ in nodes:
+            nameOffsets.append(len(strings))
+            strings += name.encode('latin-1') + b'\0'
+
+        headerSize = len(nodes) * NODE_STRUCT.size + len(strings)
+        dataOffset = align(ROOT_OFFSET + headerSize, DATA_ALIGNMENT)
+
+        # Stream the file data, remembering where everything went
+        start = f.tell()
+        f.write(bytes(dataOffset))
+        pos = dataOffset
+        fileInfo = {}
+        for i, (name, contents, *_) in enumerate(nodes):
+            if isinstance(contents, dict): continue
+
+            padding = align(pos, DATA_ALIGNMENT) - pos
+            f.write(bytes(padding))
+            pos += padding
+
+            offset = pos
+            for chunk in contents:
+                pos += f.write(chunk)
+            fileInfo[i] = (offset, pos - offset)
+        end = f.tell()
+
+        # Go back and fill in the header and node table
+        table = bytearray()
+        for i, (name, contents, parent, nextIdx) in enumerate(nodes):
+            if isinstance(contents, dict):
+                table += NODE_STRUCT.pack(0x01000000 | nameOffsets[i], parent, nextIdx)
+            else:
+                table += NODE_STRUCT.pack(nameOffsets[i], *fileInfo[i])
+
+        f.seek(start)
+        f.write(HEADER_STRUCT.pack(U8_MAGIC, ROOT_OFFSET, headerSize, dataOffset))
+        f.write(b'\xCC' * (ROOT_OFFSET - HEADER_STRUCT.size))
+        f.write(table)
+        f.write(strings)
+        f.seek(end)
+
+        return end - start
+
+
+
+def align(value, alignment):
+    """
+    Round value up to a multiple of alignment
+    """
+    return (value + alignment - 1) // alignment * alignment
@@ -0,0 +1,136 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# xmlstream.py
+# Streaming loaders for gameinfo XML files, which yield typed records
+# without ever holding the whole document in memory
+
+
+################################################################
+################################################################
+
+# Imports
+import collections
+from xml.etree import ElementTree as etree
+
+
+TilesetRecord = collections.namedtuple('TilesetRecord', 'slot categories filename name')
+LevelNameRecord = collections.namedtuple('LevelNameRecord', 'categories file name')
+SpriteCategoryRecord = collections.namedtuple('SpriteCategoryRecord', 'view category sprites')
+
+
+
+def iterElements(source, tags):
+    """
+    Generator that parses the XML file source (a path or file object)
+    incrementally, yielding (element, ancestors) for each element whose
+    tag is in tags (matched case-insensitively), once its end tag has
+    been read. ancestors is a tuple of the elements it's nested in;
+    only their attributes are meaningful. Elements are thrown away as
+    soon as they've been handled (or once it's clear they won't be), so
+    memory use doesn't grow with the size of the file.
+    """
+    tags = frozenset(t.lower() for t in tags)
+    stack = []
+    handledDepth = 0  # how many elements on the stack will be yielded
+
+    for event, elem in etree.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            if elem.tag.lower() in tags: handledDepth += 1
+            continue
+
+        stack.pop()
+        if elem.tag.lower() in tags:
+            handledDepth -= 1
+            yield elem, tuple(stack)
+        elif handledDepth:
+            # Part of an element that hasn't been yielded yet
+            continue
+
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+
+
+def attr(elem, name, default=''):
+    """
+    Return an attribute of elem, ignoring the case of its name
+    """
+    value = elem.get(name)
+    if value is None:
+        for key, value in elem.attrib.items():
+            if key.lower() == name: return value
+        return default
+    return value
+
+
+def parseIDRange(text):
+    """
+    Return the IDs in text, which is like "20" or "20-21"
+    """
+    first, _, last = text.partition('-')
+    return range(int(first), int(last or first) + 1)
+
+
+def iterTilesets(source):
+    """
+    Generator over the <tileset>s in a tilesets.xml
+    """
+    for elem, ancestors in iterElements(source, ('tileset',)):
+        slot = None
+        categories = []
+        for a in ancestors:
+            tag = a.tag.lower()
+            if tag == 'slot':
+                slot = int(attr(a, 'num'))
+            elif tag == 'category':
+                categories.append(attr(a, 'name'))
+        yield TilesetRecord(slot, tuple(categories), attr(elem, 'filename'), attr(elem, 'name'))
+
+
+def iterLevelNames(source):
+    """
+    Generator over the <level>s in a levelnames.xml
+    """
+    for elem, ancestors in iterElements(source, ('level',)):
+        categories = tuple(attr(a, 'name') for a in ancestors if a.tag.lower() == 'category')
+        yield LevelNameRecord(categories, attr(elem, 'file'), attr(elem, 'name'))
+
+
+def iterSpriteCategories(source):
+    """
+    Generator over the <category>s in a spritecategories.xml, with
+    the sprite IDs attached to each
+    """
+    for elem, ancestors in iterElements(source, ('category',)):
+        view = ''
+        for a in ancestors:
+            if a.tag.lower() == 'view': view = attr(a, 'name')
+
+        sprites = []
+        for child in elem:
+            if child.tag.lower() == 'attach':
+                sprites.extend(parseIDRange(attr(child, 'sprite')))
+        yield SpriteCategoryRecord(view, attr(elem, 'name'), tuple(sprites))
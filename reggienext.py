@@ -28,11 +28,15 @@ This is the main executable for Reggie Next.
 
 
 # Standard-library imports
+import collections
+import hashlib
 import importlib
 import importlib.machinery
+import mmap
 import os
 import sys
-from xml.etree import ElementTree as etree
+import threading
+import time
 
 
 # Third-party imports:
@@ -46,6 +50,7 @@ from OpenGL import GL, GLU
 
 # Local imports
 import rn_api
+from lib import compression, detect, levelcache, levelindex, overlay, spritedata, spritesearch, xmlstream
 
 
 # Constants
@@ -67,6 +72,15 @@ abstractGameModules = {}
 gameModules = {}
 iconCache = {}
 gameHierarchy = []
+openGLInfo = None
+frameScheduler = None
+formatDetector = None
+levelCache = None
+spriteDataCatalogs = {}
+spriteSearchIndexes = {}
+levelIndexes = {}
+tilesetCatalogs = {}
+objectPixmapCache = None
 
 
 # This enables itemChange being called on QGraphicsItem
@@ -150,81 +164,1262 @@ def getIcon(name):
 
 
 
+def getOpenGLInfo():
+    """
+    Check (once) whether we can create an OpenGL context for a
+    hardware-accelerated level view viewport. Returns None if we can't,
+    or a (renderer name, is software renderer) tuple if we can.
+    """
+    global openGLInfo
+
+    if openGLInfo is not None:
+        return openGLInfo or None
+
+    openGLInfo = False
+    if not hasattr(QtWidgets, 'QOpenGLWidget'):
+        # PyQt 5.3 or older
+        return None
+
+    context = QtGui.QOpenGLContext()
+    if not context.create():
+        return None
+
+    surface = QtGui.QOffscreenSurface()
+    surface.setFormat(context.format())
+    surface.create()
+    if not surface.isValid() or not context.makeCurrent(surface):
+        return None
+
+    try:
+        renderer = GL.glGetString(GL.GL_RENDERER) or b''
+    except Exception:
+        renderer = b''
+    finally:
+        context.doneCurrent()
+    renderer = renderer.decode('latin-1')
+
+    # Mesa's llvmpipe and softpipe, and Microsoft's GDI generic renderer,
+    # rasterize on the CPU. They work fine, but need different settings.
+    isSoftware = any(name in renderer.lower() for name in ('llvmpipe', 'softpipe', 'software', 'gdi generic'))
+
+    openGLInfo = (renderer, isSoftware)
+    return openGLInfo
+
+
+
+def createOpenGLViewport():
+    """
+    Create and return a QOpenGLWidget suitable for use as a level
+    view viewport, or None if OpenGL isn't usable on this system
+    """
+    info = getOpenGLInfo()
+    if info is None:
+        return None
+    renderer, isSoftware = info
+
+    fmt = QtGui.QSurfaceFormat()
+    fmt.setDepthBufferSize(0)
+    fmt.setStencilBufferSize(8)
+    if isSoftware:
+        # Multisampling is extremely expensive on software rasterizers,
+        # and so is waiting on a vsync that isn't really there
+        fmt.setSamples(0)
+        fmt.setSwapInterval(0)
+    else:
+        fmt.setSamples(4)
+
+    viewport = QtWidgets.QOpenGLWidget()
+    viewport.setFormat(fmt)
+    return viewport
+
+
+
+def getFrameScheduler():
+    """
+    Return the global FrameScheduler, creating it if needed
+    """
+    global frameScheduler
+
+    if frameScheduler is None:
+        frameScheduler = FrameScheduler()
+
+    return frameScheduler
+
+
+
+def getCachePath(*parts):
+    """
+    Return a path inside Reggie Next's cache folder
+    """
+    folder = QtCore.QStandardPaths.writableLocation(QtCore.QStandardPaths.CacheLocation)
+    return os.path.join(folder, *parts)
+
+
+
+def getLevelCache():
+    """
+    Return the global LevelCache, creating it if needed
+    """
+    global levelCache
+
+    if levelCache is None:
+        levelCache = levelcache.LevelCache(getCachePath('levels'))
+
+    return levelCache
+
+
+
+def getSpriteData(gameObj):
+    """
+    Return the sprite definitions (a lib.spritedata.SpriteDataCatalog)
+    for the game, merged from its spritedata.xml and those of its
+    parents, or None if there aren't any. They're compiled once and
+    cached until one of the XML files changes.
+    """
+    if gameObj.moduleID not in spriteDataCatalogs:
+        paths = gameObj.getFiles('spritedata.xml')
+        catalog = None
+        if paths:
+            catalog = spritedata.SpriteDataCatalog.load(paths, getCachePath('spritedata', gameObj.moduleID + '.bin'))
+        spriteDataCatalogs[gameObj.moduleID] = catalog
+
+    return spriteDataCatalogs[gameObj.moduleID]
+
+
+
+def getSpriteSearchIndex(gameObj):
+    """
+    Return the sprite search index (a lib.spritesearch.SpriteSearchIndex)
+    for the game, or None if it has no sprite definitions. Like the
+    definitions themselves, it's cached per game (and mod) on disk.
+    """
+    if gameObj.moduleID not in spriteSearchIndexes:
+        catalog = getSpriteData(gameObj)
+        index = None
+        if catalog is not None:
+            index = spritesearch.SpriteSearchIndex.load(
+                catalog,
+                gameObj.getFiles('spritedata.xml'),
+                gameObj.getFiles('spritecategories.xml'),
+                getCachePath('spritesearch', gameObj.moduleID + '.bin'),
+                )
+        spriteSearchIndexes[gameObj.moduleID] = index
+
+    return spriteSearchIndexes[gameObj.moduleID]
+
+
+
+def getLevelIndex(gameObj, gamePath):
+    """
+    Return the lib.levelindex.LevelIndex for the game's level folder
+    (levelFolder in its main.xml) inside gamePath, or None if the game
+    doesn't say where its levels are. Call scan() on it before use.
+    """
+    info = gameObj.getMainInfo()
+    if 'levelFolder' not in info: return None
+
+    folder = os.path.join(gamePath, info['levelFolder'])
+    key = (gameObj.moduleID, os.path.abspath(folder))
+    if key not in levelIndexes:
+        levelIndexes[key] = levelindex.LevelIndex(
+            folder,
+            info.get('fileExt', '.' + gameObj.levelTypes[0].FILE_EXTENSION),
+            getCachePath('levelindex', gameObj.moduleID + '.bin'),
+            summarizeLevelHeader,
+            )
+
+    return levelIndexes[key]
+
+
+
+def getTilesetCatalog(gameObj, gamePath):
+    """
+    Return the TilesetCatalog for the game's tileset folder
+    (tilesetFolder in its main.xml) inside gamePath, or None if the
+    game's files can't be found or it doesn't use tilesets
+    """
+    info = gameObj.getMainInfo()
+    if not gamePath or 'tilesetFolder' not in info or not gameObj.getFiles('tilesets.xml'):
+        return None
+
+    folder = os.path.join(gamePath, info['tilesetFolder'])
+    key = (gameObj.moduleID, os.path.abspath(folder))
+    if key not in tilesetCatalogs:
+        tilesetCatalogs[key] = TilesetCatalog(gameObj, folder)
+
+    return tilesetCatalogs[key]
+
+
+
+def getObjectPixmapCache():
+    """
+    Return the global ObjectPixmapCache, creating it if needed
+    """
+    global objectPixmapCache
+
+    if objectPixmapCache is None:
+        objectPixmapCache = ObjectPixmapCache()
+
+    return objectPixmapCache
+
+
+
+def findGameObj(levelType):
+    """
+    Return the game that levelType belongs to, or None
+    """
+    for gameObj in gameModules.values():
+        if levelType in gameObj.levelTypes:
+            return gameObj
+    return None
+
+
+
+def summarizeLevelHeader(header):
+    """
+    Return the summary of a level file for level browsers, given its
+    first lib.detect.HEADER_SIZE bytes, or None if it isn't a level
+    """
+    levelType = formatDetector.detect(header)
+    if levelType is None: return None
+    return levelType.summarize(header)
+
+
+
 def loadGameModules():
     """
-    Load all game modules for Reggie Next
+    Load all game modules for Reggie Next
+    """
+    global gameHierarchy, formatDetector
+
+    class gameCategory:
+        def __iter__(self):
+            return self.iterator.__iter__()
+
+    # Nodes arrive in document order, each one after everything inside
+    # it, so the contents of every open category are collected here
+    # (keyed by category node) until the category itself arrives
+    contents = {}
+    topLevel = []
+
+    for node, ancestors in xmlstream.iterElements(os.path.join('gameinfo', 'games.xml'), ('category', 'game', 'abstractgame')):
+        items = contents.setdefault(ancestors[-1], []) if len(ancestors) > 1 else topLevel
+        tag = node.tag.lower()
+
+        if tag == 'category':
+            cat = gameCategory()
+            cat.iterator = tuple(contents.pop(node, ()))
+            cat.id = node.attrib['id']
+            items.append(cat)
+        elif tag == 'game':
+            # This is a concrete game
+            thisID = node.attrib['id']
+            parentID = node.attrib.get('parentid', False)
+            items.append(thisID)
+
+            if not parentID:
+                gameModules[thisID] = loadModule(thisID)
+            elif parentID in abstractGameModules:
+                gameModules[thisID] = loadModule(thisID, abstractGameModules[parentID])
+            elif parentID in gameModules:
+                gameModules[thisID] = loadModule(thisID, gameModules[parentID])
+        else:
+            # This is an abstract game; load it, but
+            # don't add it to the hierarchy.
+            thisID = node.attrib['id']
+            abstractGameModules[thisID] = loadModule(thisID)
+
+    gameHierarchy = tuple(topLevel)
+
+    # Index the level types so files can be identified quickly
+    formatDetector = detect.FormatDetector()
+    for gameObj in gameModules.values():
+        for levelType in gameObj.levelTypes:
+            formatDetector.register(levelType)
+
+
+
+def loadModule(moduleID, parentObj=None):
+    """
+    Create and return the game obj for the module
+    """
+    # Create a new game obj to store info about the game
+    rn_api._newGameObj(moduleID, parentObj)
+
+    # Allow the module to "import parentModule"
+    if parentObj is not None:
+        sys.modules['parentModule'] = parentObj.module
+
+    # Import the module from the gameinfo folder
+    loader = importlib.machinery.SourceFileLoader(moduleID, os.path.join('gameinfo', moduleID, moduleID + '.py'))
+    module = loader.load_module()
+    module.main()
+
+    # Clean up by removing "import parentModule"
+    if parentObj is not None:
+        del sys.modules['parentModule']
+
+    # Get the gameObj, and add a couple of attrubites
+    gameObj = rn_api._getGameObj()
+    gameObj.module = module
+
+    return gameObj
+
+
+
+def readLevelFile(path, writable=True):
+    """
+    Identify the level file at path by inspecting its data (rather
+    than blindly relying on its file extension), decompressing it if
+    needed. Returns (level class, data to pass to its loadFromBytes()),
+    or (None, None) if the file isn't recognized. Doesn't touch the
+    GUI, so it's safe to call from any thread.
+
+    Uncompressed files are mapped rather than read, except on Windows
+    if writable is True: Windows can't replace a file that's mapped,
+    so levels that may be saved back over their files are read there.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(detect.HEADER_SIZE)
+        levelClass = formatDetector.detect(header)
+
+        if levelClass is None and compression.detectCompression(header, os.fstat(f.fileno()).st_size) is not None:
+            f.seek(0)
+            data = compression.decompress(f.read())
+            levelClass = formatDetector.detect(data[:detect.HEADER_SIZE])
+        elif levelClass is not None and writable and os.name == 'nt':
+            f.seek(0)
+            data = f.read()
+        elif levelClass is not None:
+            # Map the file rather than reading it; the level only pages
+            # in what it actually parses. The mapping outlives f.
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if levelClass is None:
+        return None, None
+    return levelClass, data
+
+
+
+class FrameScheduler(QtCore.QObject):
+    """
+    Collects notifications of frames rendered by level views, and
+    delivers them to subscribed listeners asynchronously: at most once
+    per view per event loop iteration, and never from inside a paint
+    event. Also keeps track of recent frame times.
+    """
+    HISTORY_LENGTH = 120
+
+    def __init__(self, parent=None):
+        """
+        Initialize the scheduler
+        """
+        super().__init__(parent)
+
+        self.listeners = {}  # view (or None for all views) -> [callbacks]
+        self.pendingViews = []
+        self.dispatchQueued = False
+
+        self.frameTimes = collections.deque(maxlen=self.HISTORY_LENGTH)
+        self.frameTimestamps = collections.deque(maxlen=self.HISTORY_LENGTH)
+
+
+    def subscribe(self, callback, view=None):
+        """
+        Call callback(view) after frames rendered by view, or by any
+        view if view is None
+        """
+        self.listeners.setdefault(view, []).append(callback)
+
+
+    def unsubscribe(self, callback, view=None):
+        """
+        Stop calling callback for view
+        """
+        callbacks = self.listeners.get(view, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            self.listeners.pop(view, None)
+
+
+    def frameRendered(self, view, frameTime):
+        """
+        Called by a view after it finishes painting. frameTime is the
+        time the paint took, in milliseconds.
+        """
+        self.frameTimes.append(frameTime)
+        self.frameTimestamps.append(time.perf_counter())
+
+        if not self.listeners: return
+
+        if view not in self.pendingViews:
+            self.pendingViews.append(view)
+
+        if not self.dispatchQueued:
+            self.dispatchQueued = True
+            QtCore.QTimer.singleShot(0, self.dispatch)
+
+
+    def dispatch(self):
+        """
+        Deliver all notifications collected since the last dispatch
+        """
+        self.dispatchQueued = False
+        views, self.pendingViews = self.pendingViews, []
+
+        for view in views:
+            # Copy the lists, since callbacks may unsubscribe themselves
+            for callback in list(self.listeners.get(view, ())) + list(self.listeners.get(None, ())):
+                callback(view)
+
+
+    def averageFrameTime(self):
+        """
+        Return the average time spent painting a frame recently, in
+        milliseconds
+        """
+        if not self.frameTimes: return 0
+        return sum(self.frameTimes) / len(self.frameTimes)
+
+
+    def framesPerSecond(self):
+        """
+        Return the number of frames rendered per second recently
+        """
+        if len(self.frameTimestamps) < 2: return 0
+        span = self.frameTimestamps[-1] - self.frameTimestamps[0]
+        if span <= 0: return 0
+        return (len(self.frameTimestamps) - 1) / span
+
+
+
+class XmlRecordLoader(QtCore.QThread):
+    """
+    Runs one of the xmlstream record generators in a worker thread,
+    handing the records over to the main thread in batches so that
+    models can be filled in while the file is still being read
+    """
+    recordsLoaded = QtCore.pyqtSignal(list)
+    loadFinished = QtCore.pyqtSignal()
+    loadFailed = QtCore.pyqtSignal(str)
+
+    BATCH_SIZE = 64
+
+    def __init__(self, recordIter, source, parent=None):
+        """
+        Initialize the loader. recordIter is a generator function such
+        as xmlstream.iterTilesets (or anything else that returns an
+        iterable of records), and source is what to call it with.
+        """
+        super().__init__(parent)
+        self.recordIter = recordIter
+        self.source = source
+
+
+    def run(self):
+        """
+        Read the file (in the worker thread)
+        """
+        batch = []
+        try:
+            for record in self.recordIter(self.source):
+                if self.isInterruptionRequested(): return
+                batch.append(record)
+                if len(batch) >= self.BATCH_SIZE:
+                    self.recordsLoaded.emit(batch)
+                    batch = []
+        except Exception as e:
+            self.loadFailed.emit(str(e))
+            return
+
+        if batch:
+            self.recordsLoaded.emit(batch)
+        self.loadFinished.emit()
+
+
+
+class LevelLoader(QtCore.QThread):
+    """
+    Reads, identifies, decompresses and parses a level file in a
+    worker thread, reporting progress as it goes
+    """
+    progressChanged = QtCore.pyqtSignal(int, str)  # percent, message
+    levelLoaded = QtCore.pyqtSignal(object)
+    loadFailed = QtCore.pyqtSignal(str)
+
+    # Percentages at which each stage starts; the rest of the progress
+    # bar is for building the level's tab on the main thread
+    PROGRESS_PARSE = 10
+    PROGRESS_DONE = 90
+
+    def __init__(self, path, parent=None):
+        """
+        Initialize the loader for the file at path
+        """
+        super().__init__(parent)
+        self.path = path
+
+
+    def cancel(self):
+        """
+        Ask the loader to stop as soon as possible. Nothing more will
+        be emitted once it notices.
+        """
+        self.requestInterruption()
+
+
+    def run(self):
+        """
+        Load the level (in the worker thread)
+        """
+        try:
+            levelObj = self.load()
+        except Exception as e:
+            # The file is probably corrupt; let the user know instead
+            # of letting the thread die silently
+            self.loadFailed.emit(_('The file could not be opened: [err]', '[err]', str(e)))
+            return
+
+        if levelObj is not None and not self.isInterruptionRequested():
+            self.levelLoaded.emit(levelObj)
+
+
+    def load(self):
+        """
+        Return the loaded level, or None if it couldn't be recognized
+        or loading was cancelled
+        """
+        self.progressChanged.emit(0, _('Reading file...'))
+        levelClass, data = readLevelFile(self.path)
+
+        if levelClass is None:
+            self.loadFailed.emit(_('The file could not be recognized.'))
+            return None
+        if self.isInterruptionRequested(): return None
+
+        self.progressChanged.emit(self.PROGRESS_PARSE, _('Parsing level...'))
+        levelObj = levelClass.loadFromBytes(data)
+
+        # If this exact file was opened (or saved) recently, the parsed
+        # data is probably cached
+        cache = getLevelCache()
+        key = cache.keyForFile(self.path)
+        state = cache.get(key)
+        if state is not None:
+            levelObj.restoreCacheState(state)
+            return levelObj
+
+        span = self.PROGRESS_DONE - self.PROGRESS_PARSE
+        for fraction in levelObj.preload():
+            if self.isInterruptionRequested(): return None
+            self.progressChanged.emit(self.PROGRESS_PARSE + int(fraction * span), _('Parsing level...'))
+
+        try:
+            cache.put(key, levelObj.cacheState())
+        except OSError:
+            pass  # the cache is only an optimization
+
+        return levelObj
+
+
+
+class TimeSlicedTask(QtCore.QObject):
+    """
+    Runs a generator on the main thread a slice at a time, returning to
+    the event loop between slices so the GUI stays responsive. The
+    generator may yield its progress (0 to 1). If it raises an
+    exception, failed is emitted instead of finished.
+    """
+    progressChanged = QtCore.pyqtSignal(float)
+    finished = QtCore.pyqtSignal()
+    failed = QtCore.pyqtSignal(str)  # error message
+
+    SLICE_TIME = 0.008  # seconds; about half a frame at 60 fps
+
+    def __init__(self, generator, parent=None):
+        """
+        Initialize the task
+        """
+        super().__init__(parent)
+        self.generator = generator
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.runSlice)
+
+
+    def start(self):
+        """
+        Start running the generator
+        """
+        self.timer.start()
+
+
+    def cancel(self):
+        """
+        Stop running the generator, and close it
+        """
+        self.timer.stop()
+        self.generator.close()
+
+
+    def runSlice(self):
+        """
+        Run the generator for up to SLICE_TIME seconds
+        """
+        deadline = time.perf_counter() + self.SLICE_TIME
+        progress = None
+        try:
+            while time.perf_counter() < deadline:
+                progress = next(self.generator)
+        except StopIteration:
+            self.timer.stop()
+            self.finished.emit()
+            return
+        except Exception as e:
+            self.timer.stop()
+            self.failed.emit(str(e) or e.__class__.__name__)
+            return
+
+        if progress is not None:
+            self.progressChanged.emit(progress)
+
+
+
+class LevelOpener(QtCore.QObject):
+    """
+    Opens a level file in the background: a LevelLoader parses it,
+    then a TimeSlicedTask builds its tab. Shows a progress dialog the
+    user can cancel from.
+    """
+    opened = QtCore.pyqtSignal(QtWidgets.QWidget)
+
+    def __init__(self, path, parent):
+        """
+        Initialize the opener for the file at path. parent is the
+        main window.
+        """
+        super().__init__(parent)
+        self.path = path
+        self.mainWindow = parent
+        self.tab = None
+        self.task = None
+
+        self.progress = QtWidgets.QProgressDialog(
+            _('Opening [file]...', '[file]', os.path.basename(path)), _('Cancel'), 0, 100, parent)
+        self.progress.setWindowModality(Qt.WindowModal)
+        self.progress.setMinimumDuration(300)
+        self.progress.setAutoReset(False)
+        self.progress.canceled.connect(self.cancel)
+
+        self.loader = LevelLoader(path, self)
+        self.loader.progressChanged.connect(self.handleProgress)
+        self.loader.levelLoaded.connect(self.handleLevelLoaded)
+        self.loader.loadFailed.connect(self.handleLoadFailed)
+
+
+    def start(self):
+        """
+        Start opening the level
+        """
+        self.progress.setValue(0)
+        self.loader.start()
+
+
+    def cancel(self):
+        """
+        Stop opening the level, wherever we are
+        """
+        self.loader.cancel()
+        if self.task is not None:
+            self.task.cancel()
+            self.tab.deleteLater()
+        self.finish()
+
+
+    def finish(self):
+        """
+        Clean up. The worker thread may still be winding down after a
+        cancel; the opener is only deleted once it has.
+        """
+        # Closing the dialog would otherwise count as cancelling it,
+        # and the loader may still have signals queued for us
+        self.progress.canceled.disconnect(self.cancel)
+        self.loader.progressChanged.disconnect(self.handleProgress)
+        self.loader.levelLoaded.disconnect(self.handleLevelLoaded)
+        self.loader.loadFailed.disconnect(self.handleLoadFailed)
+        self.progress.close()
+        self.progress.deleteLater()
+        if self.loader.isRunning():
+            self.loader.finished.connect(self.deleteLater)
+        else:
+            self.deleteLater()
+
+
+    def handleProgress(self, value, text):
+        """
+        Handle the loader reporting progress
+        """
+        self.progress.setLabelText(text)
+        self.progress.setValue(value)
+
+
+    def handleLoadFailed(self, message):
+        """
+        Handle the loader failing to load the level
+        """
+        self.finish()
+        QtWidgets.QMessageBox.warning(self.mainWindow, _('Reggie Next'), message)
+
+
+    def handleLevelLoaded(self, levelObj):
+        """
+        Handle the loader finishing: build the tab, a slice at a time
+        """
+        if self.loader.isInterruptionRequested(): return
+
+        self.progress.setLabelText(_('Building level...'))
+        self.tab = TabView_2DLevel(self.mainWindow, levelObj, False)
+        self.tab.setFilePath(self.path)
+
+        self.task = TimeSlicedTask(self.tab.populate(), self)
+        self.task.progressChanged.connect(self.handleBuildProgress)
+        self.task.finished.connect(self.handleBuildFinished)
+        self.task.failed.connect(self.handleBuildFailed)
+        self.task.start()
+
+
+    def handleBuildProgress(self, fraction):
+        """
+        Handle the tab reporting progress while it's built
+        """
+        done = LevelLoader.PROGRESS_DONE
+        self.progress.setValue(done + int(fraction * (100 - done)))
+
+
+    def handleBuildFinished(self):
+        """
+        Handle the tab being completely built
+        """
+        self.opened.emit(self.tab)
+        self.finish()
+
+
+    def handleBuildFailed(self, message):
+        """
+        Handle an error while building the tab: throw the half-built
+        tab away
+        """
+        self.tab.deleteLater()
+        self.finish()
+        QtWidgets.QMessageBox.warning(self.mainWindow, _('Reggie Next'), _('The file could not be opened: [err]', '[err]', message))
+
+
+
+class TilesetCatalog(QtCore.QObject):
+    """
+    The tilesets of one game, from its tilesets.xml, resolved to files
+    in its tileset folder. Nothing is decoded until it's asked for:
+    thumbnails (for tileset pickers) are made by a thread pool and
+    saved to the cache folder, so each file is only decoded for a
+    thumbnail once; full-size images are only decoded for tilesets
+    that an open level uses, and their object definitions are read
+    along with them.
+    """
+    thumbnailReady = QtCore.pyqtSignal(str, QtGui.QImage)  # filename, thumbnail
+    imageReady = QtCore.pyqtSignal(str, QtGui.QImage)  # filename, full image
+    entriesAdded = QtCore.pyqtSignal(list)  # lib.xmlstream.TilesetRecords
+
+    # Emitted from worker threads; handled on the main thread
+    decoded = QtCore.pyqtSignal(str, bool, QtGui.QImage, object, int)  # filename, is thumbnail, image, objects, generation
+
+    THUMBNAIL_WIDTH = 128
+
+    def __init__(self, gameObj, folder):
+        """
+        Initialize the catalog
+        """
+        super().__init__()
+        self.gameObj = gameObj
+        self.folder = folder
+        self.extension = gameObj.getMainInfo().get('fileExt', '.arc')
+        self.levelType = next(t for t in gameObj.levelTypes if issubclass(t, rn_api.RLevel_2D))
+        self.thumbnailFolder = getCachePath('tilesetthumbs', gameObj.moduleID)
+
+        self.entries = []  # filled in by loadEntries()
+        self.entriesLoader = None
+        self.thumbnails = {}  # filename -> QImage
+        self.images = {}  # filename -> QImage
+        self.imageStamps = {}  # filename -> stamp of the file it came from
+        self.objectDefs = {}  # filename -> object definitions, or None
+        self.pending = {}  # (filename, is thumbnail) -> TilesetDecodeTask
+        self.generation = 0  # bumped by clear(), so older results are dropped
+
+        self.pool = QtCore.QThreadPool(self)
+        self.decoded.connect(self.handleDecoded)
+
+        self.loadEntries()
+
+
+    @staticmethod
+    def iterEntries(gameObj):
+        """
+        Return the game's tilesets.xml records, laid over its parents'.
+        Run by an XmlRecordLoader.
+        """
+        return gameObj.getTable('tilesets.xml', overlay.parseTilesets).values()
+
+
+    def loadEntries(self):
+        """
+        Start reading the list of tilesets in the background. The
+        entries are added as they're read, and entriesAdded is emitted
+        for each batch.
+        """
+        if self.entriesLoader is not None:
+            self.entriesLoader.requestInterruption()
+            self.entriesLoader.wait()
+            self.entriesLoader.deleteLater()
+        self.entries = []
+
+        loader = XmlRecordLoader(self.iterEntries, self.gameObj, self)
+        loader.recordsLoaded.connect(lambda batch: self.handleEntriesLoaded(loader, batch))
+        self.entriesLoader = loader
+        loader.start()
+
+
+    def handleEntriesLoaded(self, loader, batch):
+        """
+        Handle a batch of tilesets being read
+        """
+        if loader is not self.entriesLoader: return  # from before a reload
+        self.entries.extend(batch)
+        self.entriesAdded.emit(batch)
+
+
+    def slotEntries(self, slot):
+        """
+        Return the lib.xmlstream.TilesetRecords for a slot (0 for Pa0...)
+        """
+        return [entry for entry in self.entries if entry.slot == slot]
+
+
+    def path(self, filename):
+        """
+        Return the path to a tileset's file
+        """
+        return os.path.join(self.folder, filename + self.extension)
+
+
+    def fileStamp(self, filename):
+        """
+        Return (size, modification time) of a tileset's file, or None
+        if it doesn't exist
+        """
+        try:
+            st = os.stat(self.path(filename))
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+
+    def thumbnailPath(self, filename):
+        """
+        Return where the thumbnail of a tileset is cached, or None if
+        its file doesn't exist. The name depends on the file's size and
+        modification time, so edited tilesets get new ones.
+        """
+        stamp = self.fileStamp(filename)
+        if stamp is None: return None
+        key = '%s|%d|%d' % ((os.path.abspath(self.path(filename)),) + stamp)
+        return os.path.join(self.thumbnailFolder, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.png')
+
+
+    def thumbnail(self, filename):
+        """
+        Return the thumbnail for a tileset if it's ready. If not, None
+        is returned and thumbnailReady is emitted once it is.
+        """
+        if filename in self.thumbnails:
+            return self.thumbnails[filename]
+        self.request(filename, True)
+        return None
+
+
+    def image(self, filename):
+        """
+        Return the full-size image of a tileset, decoding it right away
+        if needed (None if it can't be loaded). If it's already queued
+        for decoding, that task is run here or waited for instead.
+        Decoded images are kept until their files change.
+        """
+        stamp = self.fileStamp(filename)
+        if filename not in self.images or self.imageStamps.get(filename) != stamp:
+            task = self.pending.get((filename, False))
+            if task is None:
+                image, objects = self.decodeTileset(self.path(filename))
+            else:
+                # Take it off the queue if it hasn't started yet
+                if self.pool.tryTake(task):
+                    task.run()
+                task.done.wait()
+                image, objects = task.result
+            self.images[filename] = image if image is not None and not image.isNull() else None
+            self.imageStamps[filename] = stamp
+            self.objectDefs[filename] = objects
+        return self.images[filename]
+
+
+    def readyImage(self, filename):
+        """
+        Return the full-size image of a tileset if it has been decoded.
+        If not, None is returned, the tileset is queued for decoding,
+        and imageReady is emitted once it's done.
+        """
+        if filename in self.images:
+            return self.images[filename]
+        self.request(filename, False)
+        return None
+
+
+    def objects(self, filename):
+        """
+        Return the object definitions in a tileset (see
+        rn_api.RLevel_2D.loadTilesetObjects) if it has been decoded.
+        If not, None is returned, the tileset is queued for decoding,
+        and imageReady is emitted once it's done. None is also returned
+        for tilesets without any.
+        """
+        if filename in self.objectDefs:
+            return self.objectDefs[filename]
+        self.request(filename, False)
+        return None
+
+
+    def objectPixmap(self, key, render):
+        """
+        Return the prerendered pixmap of an object from this catalog's
+        tilesets. key identifies the object and its size; render() is
+        called to draw it if it isn't in the ObjectPixmapCache yet, and
+        may return None if it can't be drawn yet.
+        """
+        return getObjectPixmapCache().get((self.folder,) + tuple(key), render)
+
+
+    def preload(self, filenames):
+        """
+        Start decoding the full-size images of tilesets in the
+        background (for a level that's being opened, say)
+        """
+        for filename in filenames:
+            if filename not in self.images:
+                self.request(filename, False)
+
+
+    def request(self, filename, thumbnail):
+        """
+        Queue a tileset to be decoded in the background
+        """
+        if (filename, thumbnail) in self.pending: return
+        task = TilesetDecodeTask(self, filename, thumbnail, self.generation)
+        self.pending[filename, thumbnail] = task
+        self.pool.start(task)
+
+
+    def decodeFile(self, path):
+        """
+        Return the full-size QImage for the tileset file at path, or
+        None. Safe to call from any thread.
+        """
+        try:
+            data = compression.decompressFile(path)[1]
+            return self.levelType.loadTilesetImage(data)
+        except Exception:
+            return None
+
+
+    def decodeTileset(self, path):
+        """
+        Return the full-size QImage and the object definitions of the
+        tileset file at path (either may be None), decompressing it only
+        once. Safe to call from any thread.
+        """
+        try:
+            data = compression.decompressFile(path)[1]
+        except Exception:
+            return None, None
+
+        try:
+            image = self.levelType.loadTilesetImage(data)
+        except Exception:
+            image = None
+        try:
+            objects = self.levelType.loadTilesetObjects(data)
+        except Exception:
+            objects = None
+        return image, objects
+
+
+    def makeThumbnail(self, filename):
+        """
+        Return the thumbnail of a tileset, from the cache folder or by
+        decoding the file (saving the result for next time). Safe to
+        call from any thread.
+        """
+        cachePath = self.thumbnailPath(filename)
+        if cachePath is None: return None
+
+        thumb = QtGui.QImage(cachePath)
+        if not thumb.isNull(): return thumb
+
+        image = self.decodeFile(self.path(filename))
+        if image is None or image.isNull(): return None
+
+        thumb = image.scaledToWidth(min(self.THUMBNAIL_WIDTH, image.width()), Qt.SmoothTransformation)
+        os.makedirs(self.thumbnailFolder, exist_ok=True)
+        thumb.save(cachePath, 'PNG')
+        return thumb
+
+
+    def handleDecoded(self, filename, thumbnail, image, objects, generation):
+        """
+        Handle a worker thread finishing with a tileset
+        """
+        # Decoded before the last clear(); the file may have changed
+        if generation != self.generation: return
+
+        self.pending.pop((filename, thumbnail), None)
+        image = None if image.isNull() else image
+
+        if thumbnail:
+            self.thumbnails[filename] = image
+            if image is not None: self.thumbnailReady.emit(filename, image)
+        else:
+            self.images[filename] = image
+            self.imageStamps[filename] = self.fileStamp(filename)
+            self.objectDefs[filename] = objects
+            if image is not None: self.imageReady.emit(filename, image)
+
+
+    def clear(self):
+        """
+        Forget every decoded image, so tilesets are read again (the
+        thumbnails on disk are still used if the files haven't changed)
+        """
+        self.generation += 1
+        self.pool.clear()
+        self.pool.waitForDone()
+        self.thumbnails.clear()
+        self.images.clear()
+        self.imageStamps.clear()
+        self.objectDefs.clear()
+        self.pending.clear()
+        self.loadEntries()
+
+
+
+class TilesetDecodeTask(QtCore.QRunnable):
+    """
+    Decodes one tileset (or its thumbnail) for a TilesetCatalog, in a
+    worker thread. The catalog keeps queued tasks, so they aren't
+    deleted by the thread pool; done is set once result is ready. For
+    full-size images, result is (image, object definitions).
     """
-    global gameHierarchy
+    def __init__(self, catalog, filename, thumbnail, generation):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.catalog = catalog
+        self.filename = filename
+        self.thumbnail = thumbnail
+        self.generation = generation
+        self.result = None
+        self.done = threading.Event()
 
-    class gameCategory:
-        def __iter__(self):
-            return self.iterator.__iter__()
 
-    def parseCategory(cat):
+    def run(self):
         """
-        Parse a category node and return a list of the contents
+        Decode the tileset
         """
-        items = []
+        if self.thumbnail:
+            image, objects = self.catalog.makeThumbnail(self.filename), None
+            self.result = image
+        else:
+            image, objects = self.catalog.decodeTileset(self.catalog.path(self.filename))
+            self.result = image, objects
+        self.done.set()
+        self.catalog.decoded.emit(self.filename, self.thumbnail, image if image is not None else QtGui.QImage(), objects, self.generation)
 
-        # Go through all nodes in the category
-        for node in cat:
-            if node.tag.lower() == 'category':
-                # Recursively load this category
-                cat = gameCategory()
-                cat.iterator = parseCategory(node)
-                cat.id = node.attrib['id']
-                items.append(cat)
-            elif node.tag.lower() == 'game':
-                # This is a concrete game
-                thisID = node.attrib['id']
-                parentID = node.attrib.get('parentid', False)
-                items.append(thisID)
 
-                if not parentID:
-                    gameModules[thisID] = loadModule(thisID)
-                elif parentID in abstractGameModules:
-                    gameModules[thisID] = loadModule(thisID, abstractGameModules[parentID])
-                elif parentID in gameModules:
-                    gameModules[thisID] = loadModule(thisID, gameModules[parentID])
-            elif node.tag.lower() == 'abstractgame':
-                # This is an abstract game; load it, but
-                # don't add it to the hierarchy.
-                thisID = node.attrib['id']
-                abstractGameModules[thisID] = loadModule(thisID)
 
-        return tuple(items)
+class TilesetPickerDialog(QtWidgets.QDialog):
+    """
+    Dialog that lets the user choose the tilesets of an area, one per
+    slot, from thumbnails of the game's tilesets
+    """
+    def __init__(self, parent, catalog, names):
+        """
+        Initialize the dialog. names are the area's current tilesets,
+        one per slot.
+        """
+        super().__init__(parent)
+        self.catalog = catalog
+        self.setWindowTitle(_('Area Tilesets'))
+        self.setWindowIcon(getIcon('objects'))
+        self.setMinimumSize(512, 448)
+
+        # Create a list of thumbnails for each slot
+        self.tabs = QtWidgets.QTabWidget()
+        self.lists = []
+        self.items = {}  # filename -> [QListWidgetItem]
+        for slot, name in enumerate(names):
+            slotList = QtWidgets.QListWidget()
+            slotList.setViewMode(QtWidgets.QListView.IconMode)
+            slotList.setResizeMode(QtWidgets.QListView.Adjust)
+            slotList.setIconSize(QtCore.QSize(catalog.THUMBNAIL_WIDTH, catalog.THUMBNAIL_WIDTH))
+            slotList.setGridSize(QtCore.QSize(catalog.THUMBNAIL_WIDTH + 16, catalog.THUMBNAIL_WIDTH + 40))
+            slotList.setWordWrap(True)
+            slotList.setMovement(QtWidgets.QListView.Static)
+            slotList.itemActivated.connect(self.accept)
+            self.lists.append(slotList)
+            self.tabs.addTab(slotList, _('Pa[slot]', '[slot]', slot))
+
+            item = QtWidgets.QListWidgetItem(_('(None)'), slotList)
+            item.setData(Qt.UserRole, '')
+            slotList.setCurrentItem(item)
+            if name:
+                slotList.setCurrentItem(self.addItem(slot, name, name))
+
+        self.tabs.currentChanged.connect(self.requestThumbnails)
 
+        # Create the button box
+        self.buttonBox = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        self.buttonBox.accepted.connect(self.accept)
+        self.buttonBox.rejected.connect(self.reject)
 
-    root = etree.parse(os.path.join('gameinfo', 'games.xml')).getroot()
-    gameHierarchy = parseCategory(root)
+        # Create the main layout
+        L = QtWidgets.QVBoxLayout(self)
+        L.addWidget(self.tabs)
+        L.addWidget(self.buttonBox)
 
+        catalog.thumbnailReady.connect(self.handleThumbnailReady)
+        catalog.entriesAdded.connect(self.addEntries)
+        self.addEntries(catalog.entries)
 
 
-def loadModule(moduleID, parentObj=None):
+    def addItem(self, slot, filename, name):
+        """
+        Add a tileset to a slot's list, or rename it if it's already
+        there, and return its item
+        """
+        for item in self.items.get(filename, ()):
+            if item.listWidget() is self.lists[slot]:
+                item.setText(name)
+                return item
+
+        item = QtWidgets.QListWidgetItem(name, self.lists[slot])
+        item.setData(Qt.UserRole, filename)
+        item.setToolTip(filename)
+        self.items.setdefault(filename, []).append(item)
+        return item
+
+
+    def addEntries(self, entries):
+        """
+        Add tilesets from the catalog (lib.xmlstream.TilesetRecords)
+        """
+        for entry in entries:
+            if entry.slot is None or not 0 <= entry.slot < len(self.lists): continue
+            self.addItem(entry.slot, entry.filename, entry.name or entry.filename)
+        self.requestThumbnails()
+
+
+    def requestThumbnails(self):
+        """
+        Show the thumbnails of the tilesets in the current slot's list,
+        asking the catalog for the ones it doesn't have yet
+        """
+        slotList = self.tabs.currentWidget()
+        for i in range(1, slotList.count()):
+            item = slotList.item(i)
+            if not item.icon().isNull(): continue
+            thumb = self.catalog.thumbnail(item.data(Qt.UserRole))
+            if thumb is not None:
+                item.setIcon(QtGui.QIcon(QtGui.QPixmap.fromImage(thumb)))
+
+
+    def handleThumbnailReady(self, filename, thumb):
+        """
+        Show a thumbnail once the catalog has made it
+        """
+        icon = QtGui.QIcon(QtGui.QPixmap.fromImage(thumb))
+        for item in self.items.get(filename, ()):
+            item.setIcon(icon)
+
+
+    def names(self):
+        """
+        Return the chosen tilesets, one per slot
+        """
+        return [slotList.currentItem().data(Qt.UserRole) for slotList in self.lists]
+
+
+
+class ObjectPixmapCache:
     """
-    Create and return the game obj for the module
+    Prerendered pixmaps of tileset objects, shared by every open level.
+    Each combination of object and size is drawn once, and the least
+    recently used pixmaps are dropped once they take up more than
+    MAX_BYTES.
     """
-    # Create a new game obj to store info about the game
-    rn_api._newGameObj(moduleID, parentObj)
+    MAX_BYTES = 64 * 1024 * 1024
 
-    # Allow the module to "import parentModule"
-    if parentObj is not None:
-        sys.modules['parentModule'] = parentObj.module
+    def __init__(self):
+        """
+        Initialize the cache
+        """
+        self.pixmaps = collections.OrderedDict()  # key -> QPixmap
+        self.size = 0
 
-    # Import the module from the gameinfo folder
-    loader = importlib.machinery.SourceFileLoader(moduleID, os.path.join('gameinfo', moduleID, moduleID + '.py'))
-    module = loader.load_module()
-    module.main()
 
-    # Clean up by removing "import parentModule"
-    if parentObj is not None:
-        del sys.modules['parentModule']
+    @staticmethod
+    def pixmapBytes(pixmap):
+        """
+        Return roughly how much memory pixmap uses
+        """
+        return pixmap.width() * pixmap.height() * 4
 
-    # Get the gameObj, and add a couple of attrubites
-    gameObj = rn_api._getGameObj()
-    gameObj.module = module
 
-    return gameObj
+    def get(self, key, render):
+        """
+        Return the pixmap for key, calling render() to draw it if it
+        isn't cached. None results aren't cached, so render() is called
+        again next time.
+        """
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+            return pixmap
+
+        pixmap = render()
+        if pixmap is None: return None
+
+        size = self.pixmapBytes(pixmap)
+        if size > self.MAX_BYTES: return pixmap  # too big to keep
+        self.pixmaps[key] = pixmap
+        self.size += size
+        while self.size > self.MAX_BYTES:
+            oldKey, oldPixmap = self.pixmaps.popitem(last=False)
+            self.size -= self.pixmapBytes(oldPixmap)
+        return pixmap
+
+
+    def clear(self):
+        """
+        Drop every pixmap
+        """
+        self.pixmaps.clear()
+        self.size = 0
 
 
 
@@ -300,81 +1495,266 @@ class NewLevelDialog(QtWidgets.QDialog):
         chooseLevelWidget = QtWidgets.QGroupBox('Choose a Level Type:')
         chooseLevelWidget.setLayout(chooseLevelLayout)
 
-        # Create the template section
-        self.templateChooser = QtWidgets.QListWidget()
+        # Create the template section
+        self.templateChooser = QtWidgets.QListWidget()
+
+        chooseTemplateLayout = QtWidgets.QVBoxLayout()
+        chooseTemplateLayout.addWidget(self.templateChooser)
+        chooseTemplateWidget = QtWidgets.QGroupBox('Choose a Template:')
+        chooseTemplateWidget.setLayout(chooseTemplateLayout)
+
+        # Create the button box
+        self.buttonBox = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        self.buttonBox.accepted.connect(self.accept)
+        self.buttonBox.rejected.connect(self.reject)
+
+        # Create the main layout
+        L = QtWidgets.QGridLayout(self)
+        L.addWidget(chooseGameWidget, 0, 0)
+        L.addWidget(chooseLevelWidget, 0, 1)
+        L.addWidget(chooseTemplateWidget, 0, 2)
+        L.addWidget(self.buttonBox, 1, 0, 1, 3)
+
+
+    def handleGameChanged(self):
+        """
+        Handle the game being changed
+        """
+        selectedId = self.gameChooser.currentItem().data(0, Qt.UserRole)
+
+        self.levelChooser.clear()
+        if selectedId is None: return
+        levels = gameModules[selectedId].levelTypes
+
+        for level in levels:
+            item = QtWidgets.QListWidgetItem()
+            item.setText(level.TYPE_NAME)
+            item.setIcon(level.ICON)
+            item.setData(Qt.UserRole, levels.index(level))
+            self.levelChooser.addItem(item)
+
+        # Select the first item; save the user a click :)
+        self.levelChooser.setCurrentItem(self.levelChooser.item(0))
+
+
+    def handleLevelChanged(self):
+        """
+        Handle the level being changed
+        """
+        selectedId = self.gameChooser.currentItem().data(0, Qt.UserRole)
+        selectedIdIdx = self.levelChooser.currentItem().data(Qt.UserRole)
+
+        self.templateChooser.clear()
+        if selectedIdIdx is None: return
+        level = gameModules[selectedId].levelTypes[selectedIdIdx]
+
+        for template in level.TEMPLATES:
+            item = QtWidgets.QListWidgetItem()
+            item.setText(template.NAME)
+            item.setData(Qt.UserRole, level.TEMPLATES.index(template))
+            self.templateChooser.addItem(item)
+
+        # Select the first item; save the user a click :)
+        self.templateChooser.setCurrentItem(self.templateChooser.item(0))
+
+
+    def getSelectedInfo(self):
+        """
+        Returns the current template info
+        """
+        selectedId = self.gameChooser.currentItem().data(0, Qt.UserRole)
+        selectedIdIdx = self.levelChooser.currentItem().data(Qt.UserRole)
+        selectedTemplateIdx = self.templateChooser.currentItem().data(Qt.UserRole)
+
+        return (gameModules[selectedId],
+            gameModules[selectedId].levelTypes[selectedIdIdx],
+            gameModules[selectedId].levelTypes[selectedIdIdx].TEMPLATES[selectedTemplateIdx],
+            )
+
+
+class LevelPickerDialog(QtWidgets.QDialog):
+    """
+    Dialog that lets the user choose a level by its in-game name, from
+    the levels of a game that are actually on disk
+    """
+    def __init__(self, mainWindow):
+        """
+        Initialize the dialog
+        """
+        super().__init__(mainWindow)
+        self.mainWindow = mainWindow
+        self.setWindowTitle(_('Open Level by Name'))
+        self.setWindowIcon(getIcon('open'))
+        self.setMinimumSize(448, 448)
+
+        # Create the game chooser
+        self.gameChooser = QtWidgets.QComboBox()
+        for gameID, gameObj in gameModules.items():
+            if 'levelFolder' in gameObj.getMainInfo():
+                self.gameChooser.addItem(gameObj.gameName, gameID)
+        self.gameChooser.currentIndexChanged.connect(self.handleGameChanged)
+
+        self.folderButton = QtWidgets.QPushButton(_('Game Folder...'))
+        self.folderButton.clicked.connect(self.handleChooseFolder)
+
+        # Create the level tree
+        self.levelTree = QtWidgets.QTreeWidget()
+        self.levelTree.setHeaderLabels([_('Level'), _('File'), _('Areas')])
+        self.levelTree.setAnimated(True)
+        self.levelTree.itemSelectionChanged.connect(self.handleLevelChanged)
+        self.levelTree.itemActivated.connect(self.handleLevelActivated)
+
+        # Create the button box
+        self.buttonBox = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Open | QtWidgets.QDialogButtonBox.Cancel)
+        self.buttonBox.accepted.connect(self.accept)
+        self.buttonBox.rejected.connect(self.reject)
+
+        # Create the main layout
+        L = QtWidgets.QGridLayout(self)
+        L.addWidget(self.gameChooser, 0, 0)
+        L.addWidget(self.folderButton, 0, 1)
+        L.addWidget(self.levelTree, 1, 0, 1, 2)
+        L.addWidget(self.buttonBox, 2, 0, 1, 2)
+
+        self.loader = None
+        self.categoryItems = {}
+        self.handleGameChanged()
+
+
+    def gameObj(self):
+        """
+        Return the game currently chosen, or None
+        """
+        gameID = self.gameChooser.currentData()
+        return gameModules[gameID] if gameID is not None else None
+
+
+    @staticmethod
+    def iterLevels(source):
+        """
+        Generator over the lib.levelindex.LevelEntries of source, a
+        (LevelIndex, game) pair. Run by an XmlRecordLoader, since it
+        scans the level folder and reads levelnames.xml.
+        """
+        index, gameObj = source
+        index.scan()
+        yield from index.levels(gameObj.getTable('levelnames.xml', overlay.parseLevelNames).values())
+
+
+    def stopLoading(self):
+        """
+        Stop listing levels, if that's still going on
+        """
+        if self.loader is None: return
+        self.loader.requestInterruption()
+        self.loader.wait()
+        self.loader.deleteLater()
+        self.loader = None
+
+
+    def done(self, result):
+        """
+        Close the dialog, once the level list isn't being loaded
+        """
+        self.stopLoading()
+        super().done(result)
+
 
-        chooseTemplateLayout = QtWidgets.QVBoxLayout()
-        chooseTemplateLayout.addWidget(self.templateChooser)
-        chooseTemplateWidget = QtWidgets.QGroupBox('Choose a Template:')
-        chooseTemplateWidget.setLayout(chooseTemplateLayout)
+    def handleGameChanged(self):
+        """
+        Handle the game being changed, by listing its levels in the
+        background
+        """
+        self.stopLoading()
+        self.levelTree.clear()
+        self.categoryItems = {}
+        self.buttonBox.button(QtWidgets.QDialogButtonBox.Open).setEnabled(False)
 
-        # Create the button box
-        self.buttonBox = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
-        self.buttonBox.accepted.connect(self.accept)
-        self.buttonBox.rejected.connect(self.reject)
+        gameObj = self.gameObj()
+        if gameObj is None: return
+        gamePath = self.mainWindow.setting('GamePath_' + gameObj.moduleID)
+        if not gamePath: return
 
-        # Create the main layout
-        L = QtWidgets.QGridLayout(self)
-        L.addWidget(chooseGameWidget, 0, 0)
-        L.addWidget(chooseLevelWidget, 0, 1)
-        L.addWidget(chooseTemplateWidget, 0, 2)
-        L.addWidget(self.buttonBox, 1, 0, 1, 3)
+        loader = XmlRecordLoader(self.iterLevels, (getLevelIndex(gameObj, gamePath), gameObj), self)
+        loader.recordsLoaded.connect(lambda batch: self.handleLevelsLoaded(loader, batch))
+        loader.loadFinished.connect(lambda: self.levelTree.resizeColumnToContents(0))
+        self.loader = loader
+        loader.start()
 
 
-    def handleGameChanged(self):
+    def handleLevelsLoaded(self, loader, batch):
         """
-        Handle the game being changed
+        Add a batch of levels to the tree
         """
-        selectedId = self.gameChooser.currentItem().data(0, Qt.UserRole)
+        if loader is not self.loader: return  # for a game that's no longer chosen
+        categoryItems = self.categoryItems
+        for entry in batch:
+            item = QtWidgets.QTreeWidgetItem([entry.name, entry.file])
+            if entry.info is None:
+                item.setFlags(Qt.NoItemFlags)  # not on disk
+            else:
+                item.setData(0, Qt.UserRole, entry.path)
+                if entry.info.summary and 'areas' in entry.info.summary:
+                    item.setText(2, str(entry.info.summary['areas']))
+
+            # Find (or make) the item for the level's category
+            parent = None
+            for depth in range(1, len(entry.categories) + 1):
+                path = entry.categories[:depth]
+                if path not in categoryItems:
+                    categoryItem = QtWidgets.QTreeWidgetItem([path[-1]])
+                    categoryItem.setFlags(Qt.ItemIsEnabled)
+                    if parent is None:
+                        self.levelTree.addTopLevelItem(categoryItem)
+                    else:
+                        parent.addChild(categoryItem)
+                    categoryItems[path] = categoryItem
+                parent = categoryItems[path]
+
+            if parent is None:
+                self.levelTree.addTopLevelItem(item)
+            else:
+                parent.addChild(item)
 
-        self.levelChooser.clear()
-        if selectedId is None: return
-        levels = gameModules[selectedId].levelTypes
 
-        for level in levels:
-            item = QtWidgets.QListWidgetItem()
-            item.setText(level.TYPE_NAME)
-            item.setIcon(level.ICON)
-            item.setData(Qt.UserRole, levels.index(level))
-            self.levelChooser.addItem(item)
+    def handleChooseFolder(self):
+        """
+        Ask the user where the chosen game's files are
+        """
+        gameObj = self.gameObj()
+        if gameObj is None: return
 
-        # Select the first item; save the user a click :)
-        self.levelChooser.setCurrentItem(self.levelChooser.item(0))
+        folder = QtWidgets.QFileDialog.getExistingDirectory(
+            self, _('Choose the folder containing [game]', '[game]', gameObj.gameName),
+            self.mainWindow.setting('GamePath_' + gameObj.moduleID, ''))
+        if not folder: return
+
+        self.mainWindow.setSetting('GamePath_' + gameObj.moduleID, folder)
+        self.handleGameChanged()
 
 
     def handleLevelChanged(self):
         """
-        Handle the level being changed
+        Handle the selected level being changed
         """
-        selectedId = self.gameChooser.currentItem().data(0, Qt.UserRole)
-        selectedIdIdx = self.levelChooser.currentItem().data(Qt.UserRole)
-
-        self.templateChooser.clear()
-        if selectedIdIdx is None: return
-        level = gameModules[selectedId].levelTypes[selectedIdIdx]
+        self.buttonBox.button(QtWidgets.QDialogButtonBox.Open).setEnabled(self.selectedPath() is not None)
 
-        for template in level.TEMPLATES:
-            item = QtWidgets.QListWidgetItem()
-            item.setText(template.NAME)
-            item.setData(Qt.UserRole, level.TEMPLATES.index(template))
-            self.templateChooser.addItem(item)
 
-        # Select the first item; save the user a click :)
-        self.templateChooser.setCurrentItem(self.templateChooser.item(0))
+    def handleLevelActivated(self, item):
+        """
+        Handle a level being double-clicked
+        """
+        if item.data(0, Qt.UserRole) is not None:
+            self.accept()
 
 
-    def getSelectedInfo(self):
+    def selectedPath(self):
         """
-        Returns the current template info
+        Return the path to the selected level, or None
         """
-        selectedId = self.gameChooser.currentItem().data(0, Qt.UserRole)
-        selectedIdIdx = self.levelChooser.currentItem().data(Qt.UserRole)
-        selectedTemplateIdx = self.templateChooser.currentItem().data(Qt.UserRole)
+        item = self.levelTree.currentItem()
+        return item.data(0, Qt.UserRole) if item is not None else None
 
-        return (gameModules[selectedId],
-            gameModules[selectedId].levelTypes[selectedIdIdx],
-            gameModules[selectedId].levelTypes[selectedIdIdx].TEMPLATES[selectedTemplateIdx],
-            )
 
 
 class ScreenshotDialog(QtWidgets.QDialog):
@@ -631,6 +2011,9 @@ class TabStackWidget(QtWidgets.QWidget):
         A tab requested an update to the statusbar text.
         """
         cw = self.currentWidget()
+        if self.sender() is not cw:
+            # Background tabs can't be seen on the statusbar anyway
+            return
         self.updateStatusbarText.emit(cw.statusbarPosition, cw.statusbarSelection, cw.statusbarHover)
 
 
@@ -653,6 +2036,16 @@ class TabStackWidget(QtWidgets.QWidget):
             self.tabs.setCurrentIndex(currentIdx + 1)
 
 
+    def updateTabInfo(self, widget):
+        """
+        Refresh the tab text, icon and tooltip for widget
+        """
+        idx = self.viewStack.indexOf(widget)
+        self.tabs.setTabText(idx, widget.name)
+        self.tabs.setTabIcon(idx, widget.icon)
+        self.tabs.setTabToolTip(idx, widget.toolTip)
+
+
     def currentWidget(self):
         """
         Wrapper around self.viewStack.currentWidget
@@ -722,6 +2115,9 @@ class TabView(QtWidgets.QWidget):
     statusbarPosition = ''
     statusbarSelection = ''
     statusbarHover = ''
+    statusbarTimer = None
+
+    STATUSBAR_UPDATE_INTERVAL = 16  # ms; about one frame at 60 fps
 
 
     def __init__(self, mainWindow):
@@ -732,6 +2128,38 @@ class TabView(QtWidgets.QWidget):
         self.mainWindow = mainWindow
 
 
+    def requestStatusbarUpdate(self):
+        """
+        Request an update to the statusbar text. Requests are coalesced
+        so that the statusbar is updated at most once per frame, no
+        matter how often this is called (mouse moves, for example).
+        """
+        if self.statusbarTimer is None:
+            self.statusbarTimer = QtCore.QTimer(self)
+            self.statusbarTimer.setSingleShot(True)
+            self.statusbarTimer.setInterval(self.STATUSBAR_UPDATE_INTERVAL)
+            self.statusbarTimer.timeout.connect(self.flushStatusbarUpdate)
+
+        if not self.statusbarTimer.isActive():
+            self.statusbarTimer.start()
+
+
+    def flushStatusbarUpdate(self):
+        """
+        Bring the statusbar text up to date now
+        """
+        self.prepareStatusbarText()
+        self.updateStatusbar.emit()
+
+
+    def prepareStatusbarText(self):
+        """
+        Called right before the statusbar text is sent to the main
+        window. Override this to format expensive text lazily.
+        """
+        pass
+
+
     def getZoom(self):
         """
         Get the current zoom level
@@ -779,12 +2207,13 @@ class LevelViewWidget(QtWidgets.QGraphicsView):
     """
     relativeZoom = 1
     tileZoom = 1
+    hardwareAccelerated = False
+    lastHoverPos = None
 
     PositionHover = QtCore.pyqtSignal(int, int)
-    repaint = QtCore.pyqtSignal()
     dragstamp = False
 
-    def __init__(self, scene, parent):
+    def __init__(self, scene, parent, hardwareAccelerated=False):
         """
         Constructor
         """
@@ -795,6 +2224,9 @@ class LevelViewWidget(QtWidgets.QGraphicsView):
         self.setMouseTracking(True)
         self.setRenderHints(QtGui.QPainter.Antialiasing | QtGui.QPainter.SmoothPixmapTransform)
 
+        if hardwareAccelerated:
+            self.setHardwareAccelerated(True)
+
         self.YScrollBar = QtWidgets.QScrollBar(Qt.Vertical, parent)
         self.XScrollBar = QtWidgets.QScrollBar(Qt.Horizontal, parent)
         self.setVerticalScrollBar(self.YScrollBar)
@@ -807,6 +2239,42 @@ class LevelViewWidget(QtWidgets.QGraphicsView):
         self.gridColorDark = QtGui.QColor(255, 255, 255, 20)
 
 
+    def setHardwareAccelerated(self, enabled):
+        """
+        Switch between an OpenGL viewport and the default raster one.
+        Falls back to raster if OpenGL can't be used. Returns True if
+        the requested mode is now active.
+        """
+        if enabled == self.hardwareAccelerated:
+            return True
+
+        if enabled:
+            viewport = createOpenGLViewport()
+            if viewport is None:
+                return False
+
+            # QOpenGLWidget redraws the whole framebuffer every frame
+            # anyway, so partial updates only add bookkeeping overhead
+            self.setViewport(viewport)
+            self.setViewportUpdateMode(self.FullViewportUpdate)
+
+            # Antialiasing without multisampling takes a very slow path
+            # in the OpenGL paint engine on software rasterizers
+            renderer, isSoftware = getOpenGLInfo()
+            self.setRenderHint(QtGui.QPainter.Antialiasing, not isSoftware)
+
+        else:
+            self.setViewport(QtWidgets.QWidget())
+            self.setViewportUpdateMode(self.MinimalViewportUpdate)
+            self.setRenderHint(QtGui.QPainter.Antialiasing, True)
+
+        # setViewport() resets mouse tracking on the new viewport
+        self.setMouseTracking(True)
+
+        self.hardwareAccelerated = enabled
+        return True
+
+
     def zoomTiles(self, zoomLevel):
         """
         Zooms to a new tile size. 1 tile = (zoomLevel) pixels.
@@ -863,7 +2331,13 @@ class LevelViewWidget(QtWidgets.QGraphicsView):
             pos.setX(0)
         if pos.y() < 0:
             pos.setY(0)
-        self.PositionHover.emit(int(pos.x()), int(pos.y()))
+
+        # High-polling-rate mice send many events per tile; only
+        # report the position when it actually changes
+        hoverPos = (int(pos.x()), int(pos.y()))
+        if hoverPos != self.lastHoverPos:
+            self.lastHoverPos = hoverPos
+            self.PositionHover.emit(*hoverPos)
 
         if event.buttons() == Qt.RightButton and self.currentitem is not None and not self.dragstamp:
             # The user is dragging an item they just created.
@@ -890,10 +2364,12 @@ class LevelViewWidget(QtWidgets.QGraphicsView):
 
     def paintEvent(self, e):
         """
-        Handles paint events and fires a signal
+        Handles paint events, and reports the frame to the frame
+        scheduler so listeners (like the overview) can follow along
         """
-        self.repaint.emit()
+        start = time.perf_counter()
         super().paintEvent(e)
+        getFrameScheduler().frameRendered(self, (time.perf_counter() - start) * 1000)
 
 
     def drawForeground(self, painter, rect):
@@ -975,6 +2451,99 @@ class LevelViewWidget(QtWidgets.QGraphicsView):
                             painter.drawRect(x + 5, y + 4, 1, 1)
 
 
+class PresenterPool:
+    """
+    Keeps presenters (rn_api.RLevelItemPresenter_2D) bound to the items
+    of an ItemColumns that are visible in a view. Presenters whose
+    items scroll out of view are unbound and reused, so the number of
+    scene items depends on the size of the view rather than the level.
+    """
+    # Extra tiles around the viewport to bind presenters for, so small
+    # scrolls don't need any rebinding
+    MARGIN = 8
+
+    def __init__(self, view, columns, presenterClass, resources=None):
+        """
+        Initialize the pool, and bind presenters for what's visible.
+        resources is given to the presenters (see
+        rn_api.RLevelItemPresenter_2D.resources).
+        """
+        self.view = view
+        self.columns = columns
+        self.presenterClass = presenterClass
+        self.resources = resources
+
+        self.active = {}  # item index -> presenter
+        self.free = []
+        self.lastRect = None
+        self.lastVersion = None
+
+        # Let the view scroll to everything
+        bounds = columns.bounds()
+        if bounds is not None:
+            scene = view.scene()
+            scene.setSceneRect(scene.sceneRect() | QtCore.QRectF(*bounds))
+
+        getFrameScheduler().subscribe(self.update, view)
+        self.update()
+
+
+    def update(self, view=None):
+        """
+        Bind presenters to the items that are now visible, recycling
+        the ones whose items no longer are
+        """
+        m = self.MARGIN
+        rect = self.view.mapToScene(self.view.viewport().rect()).boundingRect().adjusted(-m, -m, m, m)
+
+        columns = self.columns
+        if rect == self.lastRect and columns.version == self.lastVersion: return
+
+        if columns.version != self.lastVersion:
+            # Items may have moved, or been renumbered; start over
+            for idx in list(self.active):
+                self.release(idx)
+        self.lastRect = rect
+        self.lastVersion = columns.version
+
+        visible = set(columns.indicesIn(rect.x(), rect.y(), rect.width(), rect.height()))
+        for idx in [i for i in self.active if i not in visible]:
+            self.release(idx)
+
+        scene = self.view.scene()
+        for idx in visible:
+            if idx in self.active: continue
+
+            if self.free:
+                presenter = self.free.pop()
+                presenter.show()
+            else:
+                presenter = self.presenterClass()
+                presenter.resources = self.resources
+                scene.addItem(presenter)
+            presenter.bind(columns, idx)
+            self.active[idx] = presenter
+
+
+    def release(self, idx):
+        """
+        Unbind the presenter for item idx, and keep it for reuse
+        """
+        presenter = self.active.pop(idx)
+        presenter.unbind()
+        presenter.hide()
+        self.free.append(presenter)
+
+
+    def close(self):
+        """
+        Stop following the view. The presenters are deleted along with
+        the scene.
+        """
+        getFrameScheduler().unsubscribe(self.update, self.view)
+
+
+
 class TabView_2DLevel(TabView):
     """
     TabView subclass for a 2D level view, complete with area tabs
@@ -982,18 +2551,38 @@ class TabView_2DLevel(TabView):
     scenes = []
     views = []
     gameObj = None
+    hoverPosition = None
+    filePath = None
+
+    # Areas whose scenes are kept around after switching away from them,
+    # counting the current one
+    MAX_MATERIALIZED_AREAS = 2
 
 
-    def __init__(self, mainWindow, levelObj):
+    def __init__(self, mainWindow, levelObj, populate=True):
         """
-        Initialize the 2D Level Tab View
+        Initialize the 2D Level Tab View. If populate is False, the
+        caller must run populate() itself.
         """
         super().__init__(mainWindow)
 
-        self.scenes = []
+        self.scenes = []  # None for areas that aren't materialized
         self.views = []
+        self.recentAreas = []  # materialized areas, least recently used first
+        self.fillTasks = {}
+        self.presenterPools = {}  # area -> [PresenterPool]
         self.levelObj = levelObj
 
+        # Start decoding the level's tilesets, if the game's files
+        # can be found
+        self.gameObj = findGameObj(type(levelObj))
+        self.tilesets = None
+        if self.gameObj is not None:
+            self.tilesets = getTilesetCatalog(self.gameObj, mainWindow.setting('GamePath_' + self.gameObj.moduleID))
+        if self.tilesets is not None:
+            self.tilesets.imageReady.connect(self.handleTilesetReady)
+            self.loadTilesets()
+
         self.icon = self.levelObj.ICON
         self.name = _('Untitled*')
         self.toolTip = _('(No file path)')
@@ -1015,43 +2604,176 @@ class TabView_2DLevel(TabView):
         self.mainLayout.addWidget(self.tabs)
         self.mainLayout.addLayout(self.stackLayout)
 
-        self.addTab()
+        if populate:
+            for progress in self.populate(): pass
+
+
+    def populate(self):
+        """
+        Generator that creates the area tabs and fills the first area's
+        scene, yielding progress (0 to 1) after every step so it can be
+        run a slice at a time. Other areas are only materialized when
+        their tabs are first opened.
+        """
+        # Don't let the first tab materialize itself right away
+        self.tabs.blockSignals(True)
+        for area in range(self.levelObj.areaCount()):
+            self.addTab()
+        self.tabs.blockSignals(False)
+
+        self.createAreaView(0)
+        self.stackLayout.setCurrentWidget(self.views[0])
+        for progress in self.fillArea(0):
+            yield 0
+
+        yield 1
 
 
     def addTab(self):
         """
-        Add an area tab to the level
+        Add an area tab to the level. Its scene and view are created
+        later, by materializeArea().
         """
+        self.scenes.append(None)
+        self.views.append(None)
+        self.tabs.addTab(_('Area [num]', '[num]', len(self.views)))
 
+
+    def createAreaView(self, area):
+        """
+        Create the (empty) scene and view for area
+        """
         # Create the new scene
-        self.scenes.append(LevelScene(0, 0, 64, 64, self))
+        scene = LevelScene(0, 0, 64, 64, self)
 
         # Create the new view
-        self.views.append(LevelViewWidget(self.scenes[-1], self))
-        self.views[-1].centerOn(0, 0)  # This scrolls to the top left
-        self.views[-1].zoomTiles(24)
-        self.views[-1].gridType = self.mainWindow.setting('GridType', 1)
-        self.views[-1].PositionHover.connect(self.handlePositionHoverInView)
+        view = LevelViewWidget(scene, self, self.mainWindow.setting('HardwareAcceleration', False))
+        view.centerOn(0, 0)  # This scrolls to the top left
+        view.zoomTiles(24)
+        view.gridType = self.mainWindow.setting('GridType', 1)
+        view.PositionHover.connect(self.handlePositionHoverInView)
 
         # Add the view to the stack layout
-        self.stackLayout.addWidget(self.views[-1])
+        self.stackLayout.addWidget(view)
 
-        self.tabs.addTab(_('Area [num]', '[num]', len(self.views)))
+        self.scenes[area] = scene
+        self.views[area] = view
+        self.touchArea(area)
+
+
+    def fillArea(self, area):
+        """
+        Generator that adds area's items to its scene, yielding after
+        each one
+        """
+        scene = self.scenes[area]
+        for item in self.levelObj.createItems(area):
+            scene.addItem(item)
+            yield
+
+        pools = self.presenterPools.setdefault(area, [])
+        for columns, presenterClass in self.levelObj.itemColumns(area):
+            pools.append(PresenterPool(self.views[area], columns, presenterClass, self.tilesets))
+            yield
+
+
+    def materializeArea(self, area):
+        """
+        Create the scene and view for area if they don't exist. The
+        scene is filled in the background.
+        """
+        if self.views[area] is not None: return
+
+        self.createAreaView(area)
+
+        task = TimeSlicedTask(self.fillArea(area), self)
+        task.finished.connect(lambda: self.fillTasks.pop(area).deleteLater())
+        task.failed.connect(lambda message: self.handleFillFailed(area, message))
+        self.fillTasks[area] = task
+        task.start()
+
+
+    def handleFillFailed(self, area, message):
+        """
+        Handle an error while filling area's scene; what was added so
+        far stays
+        """
+        self.fillTasks.pop(area).deleteLater()
+        QtWidgets.QMessageBox.warning(self, _('Reggie Next'), _('The area could not be loaded completely: [err]', '[err]', message))
+
+
+    def dematerializeArea(self, area):
+        """
+        Throw away the scene and view for area. The level keeps the
+        area's data, so it can be materialized again later.
+        """
+        task = self.fillTasks.pop(area, None)
+        if task is not None:
+            task.cancel()
+            task.deleteLater()
+
+        for pool in self.presenterPools.pop(area, ()):
+            pool.close()
+
+        self.stackLayout.removeWidget(self.views[area])
+        self.views[area].deleteLater()
+        self.scenes[area].deleteLater()
+        self.views[area] = self.scenes[area] = None
+        self.recentAreas.remove(area)
+
+        self.levelObj.releaseArea(area)
+
+
+    def touchArea(self, area):
+        """
+        Mark area as the most recently used one, and dematerialize the
+        least recently used areas if there are too many
+        """
+        if area in self.recentAreas:
+            self.recentAreas.remove(area)
+        self.recentAreas.append(area)
+
+        while len(self.recentAreas) > self.MAX_MATERIALIZED_AREAS:
+            self.dematerializeArea(self.recentAreas[0])
+
+
+    def setFilePath(self, path):
+        """
+        Set the path the level is saved to, and update the tab text
+        """
+        self.filePath = path
+        self.name = os.path.basename(path)
+        self.toolTip = path
 
 
     def handlePositionHoverInView(self, x, y):
         """
         Handle the user hovering over a position in the view
         """
+        self.hoverPosition = (x, y)
+        self.requestStatusbarUpdate()
+
+
+    def prepareStatusbarText(self):
+        """
+        Format the hover position for the statusbar
+        """
+        if self.hoverPosition is None: return
+        x, y = self.hoverPosition
         self.statusbarPosition = _('([posx], [posy])', '[posx]', int(x), '[posy]', int(y))
-        self.updateStatusbar.emit()
 
 
     def handleCurrentAreaChanged(self):
         """
         Handle the user clicking on a different area tab
         """
-        self.stackLayout.setCurrentIndex(self.tabs.currentIndex())
+        area = self.tabs.currentIndex()
+        if self.views[area] is None:
+            self.materializeArea(area)
+        else:
+            self.touchArea(area)
+
+        self.stackLayout.setCurrentWidget(self.views[area])
         self.updateZoom.emit(self.getCurrentView().relativeZoom)
 
 
@@ -1064,9 +2786,74 @@ class TabView_2DLevel(TabView):
 
     def allViewsIter(self):
         """
-        Iterates over all views in this tab
+        Iterates over all views in this tab (only the areas that are
+        materialized have one)
+        """
+        return [view for view in self.views if view is not None]
+
+
+    def handleTilesetReady(self, filename, image):
+        """
+        Redraw what's drawn from a tileset the level uses once it has
+        been decoded
+        """
+        if filename not in self.levelObj.tilesetNames(): return
+        self.levelObj.tilesetImageLoaded(filename, image)
+        self.invalidateTilesets({filename})
+
+
+    def invalidateTilesets(self, filenames):
+        """
+        Redraw the presenters that draw from any of these tilesets, in
+        the materialized areas that use them
+        """
+        for area, pools in self.presenterPools.items():
+            used = filenames.intersection(self.levelObj.areaTilesetNames(area))
+            if not used: continue
+            for pool in pools:
+                for presenter in pool.active.values():
+                    if any(presenter.usesTileset(filename) for filename in used):
+                        presenter.update()
+
+
+    def loadTilesets(self):
+        """
+        Start decoding the level's tilesets, and hand the ones that are
+        already decoded to the level
         """
-        return self.views
+        self.tilesets.preload(self.levelObj.tilesetNames())
+        for filename in self.levelObj.tilesetNames():
+            image = self.tilesets.images.get(filename)
+            if image is not None: self.levelObj.tilesetImageLoaded(filename, image)
+
+
+    def reloadTilesets(self):
+        """
+        Start decoding the level's tilesets again, after the catalog
+        has been cleared
+        """
+        if self.tilesets is None: return
+        names = self.levelObj.tilesetNames()
+        self.tilesets.preload(names)
+        self.invalidateTilesets(names)
+
+
+    def setAreaTilesets(self, area, names):
+        """
+        Change the tilesets area uses (one name per slot), and rebuild
+        its scene if it's materialized so its objects are redrawn
+        """
+        if names == self.levelObj.areaTilesetNames(area): return
+        self.levelObj.setAreaTilesetNames(area, names)
+        if self.tilesets is not None:
+            self.loadTilesets()
+
+        if self.views[area] is None: return
+        current = area == self.tabs.currentIndex()
+        self.dematerializeArea(area)
+        self.materializeArea(area)
+        if current:
+            self.stackLayout.setCurrentWidget(self.views[area])
 
 
     def getZoom(self):
@@ -1492,8 +3279,14 @@ class TabView_ReggieNextSettings(TabView):
             tileSizeLayout.addLayout(tileSizeLayout_Preset)
             tileSizeLayout.addLayout(tileSizeLayout_Custom)
 
+            # Hardware Acceleration
+            self.hardwareAccel_Check = QtWidgets.QCheckBox(_('Use OpenGL to draw level views (hardware acceleration)'))
+            self.hardwareAccel_Check.setChecked(bool(parent.mainWindow.setting('HardwareAcceleration', False)))
+            self.hardwareAccel_Check.toggled.connect(parent.mainWindow.handleHardwareAccelerationToggle)
+
             layout = QtWidgets.QVBoxLayout(self)
             layout.addLayout(tileSizeLayout)
+            layout.addWidget(self.hardwareAccel_Check)
             layout.addStretch()
 
 
@@ -1527,13 +3320,8 @@ class Theme:
         self.colors = {}
         self.qss = ''
 
-        with open(os.path.join('themes', 'light', 'theme.xml'), 'r', encoding='utf-8') as f:
-            themeXML = f.read()
-        root = etree.fromstring(themeXML)
-
-        for node in root:
-            if node.tag.lower() == 'color':
-                self.colors[node.attrib['name']] = node.attrib['value']
+        for node, ancestors in xmlstream.iterElements(os.path.join('themes', 'light', 'theme.xml'), ('color',)):
+            self.colors[node.attrib['name']] = node.attrib['value']
 
 
     def load(self):
@@ -1541,21 +3329,17 @@ class Theme:
         Load the theme.
         If the theme is malformed, the exception will propogate.
         """
-        with open(os.path.join('themes', self.name, 'theme.xml'), 'r', encoding='utf-8') as f:
-            themeXML = f.read()
-        root = etree.fromstring(themeXML)
-
-        # Parse the root node
-        self.displayName = root.attrib['name']
-        self.creator = root.attrib['creator']
-        self.description = root.attrib['description']
-
-        # Parse everything else
-        for node in root:
-            if node.tag.lower() == 'qss':
+        for node, ancestors in xmlstream.iterElements(os.path.join('themes', self.name, 'theme.xml'), ('theme', 'qss', 'color')):
+            tag = node.tag.lower()
+            if tag == 'theme':
+                # The root node comes last, once it's been closed
+                self.displayName = node.attrib['name']
+                self.creator = node.attrib['creator']
+                self.description = node.attrib['description']
+            elif tag == 'qss':
                 with open(os.path.join('themes', self.name, node.attrib['file']), 'r', encoding='utf-8') as f:
                     self.qss = f.read()
-            elif node.tag.lower() == 'color':
+            else:
                 self.colors[node.attrib['name']] = node.attrib['value']
 
 
@@ -1575,6 +3359,7 @@ class ReggieNextWindow(QtWidgets.QMainWindow):
     initializing = False
     actions = {}
     actionListIndices = {}
+    statusbarText = ''
 
     def __init__(self):
         """
@@ -1693,8 +3478,8 @@ class ReggieNextWindow(QtWidgets.QMainWindow):
         """
         Adds the initial tabs to the tab stack widget
         """
-        self.tabStack.addTab(TabView_2DLevel(self, gameModules['newsupermariobroswii'].levelTypes[0]))
-        self.tabStack.addTab(TabView_2DLevel(self, gameModules['newsupermariobroswii'].levelTypes[0]))
+        self.tabStack.addTab(TabView_2DLevel(self, gameModules['newsupermariobroswii'].levelTypes[0]()))
+        self.tabStack.addTab(TabView_2DLevel(self, gameModules['newsupermariobroswii'].levelTypes[0]()))
         self.tabStack.addTab(TabView_TextEditor(self))
         self.tabStack.addTab(TabView_3DLevel(self))
 
@@ -1875,6 +3660,11 @@ class ReggieNextWindow(QtWidgets.QMainWindow):
             _('Reload Graphics'),
             _('Reload level graphics, including any changes made since the level was loaded, and clear the graphics cache'),
             QtGui.QKeySequence('Ctrl+Shift+R'), 27)
+        self.createAction(
+            'areatilesets', self.handleAreaTilesets, getIcon('objects'),
+            _('Area Tilesets...'),
+            _('Choose the tilesets used by the current area'),
+            QtGui.QKeySequence('Ctrl+Alt+T'), 34)
 
         # Help
         self.createAction(
@@ -1972,6 +3762,8 @@ class ReggieNextWindow(QtWidgets.QMainWindow):
         smenu = menubar.addMenu(_('&Settings'))
         smenu.addSection(_('Reload'))
         smenu.addAction(self.actions['reloadgraphics'])
+        smenu.addSection(_('Area'))
+        smenu.addAction(self.actions['areatilesets'])
         smenu.addSection(_('Options'))
 
         # Help
@@ -2037,7 +3829,12 @@ class ReggieNextWindow(QtWidgets.QMainWindow):
         """
         Open a level using the level picker
         """
-        ...
+        dlg = LevelPickerDialog(self)
+        if dlg.exec_() != QtWidgets.QDialog.Accepted: return
+
+        fn = dlg.selectedPath()
+        if fn is not None:
+            self.openLevelFile(fn)
 
 
     def handleOpenByFileName(self):
@@ -2055,46 +3852,89 @@ class ReggieNextWindow(QtWidgets.QMainWindow):
         fn = QtWidgets.QFileDialog.getOpenFileName(self, _('Open File'), '', fileExts)[0]
         if fn == '': return
 
-        with open(fn, 'rb') as f:
-            data = f.read()
+        self.openLevelFile(fn)
 
-        # Choose the correct game to open the file with by inspecting
-        # the data (don't blindly rely on file extensions)
-        levelClass = None
-        for possibleGame in gameModules.values():
-            for possibleLevelClass in possibleGame.levelTypes:
-                if possibleLevelClass.validate(data):
-                    levelClass = possibleLevelClass
-                    break
-            if levelClass is not None: break
-        else:
-            QtWidgets.QMessageBox.warning(self, _('Reggie Next'), _('The file could not be recognized.'))
-            return
 
-        # So now we have the correct level class that matches the data.
-        # Let's parse it.
-        levelObj = levelClass.loadFromBytes(data)
+    def openLevelFile(self, fn):
+        """
+        Open the level at fn in a new tab. The game is chosen by
+        inspecting the data (not by blindly relying on file
+        extensions), and everything happens in the background.
+        """
+        opener = LevelOpener(fn, self)
+        opener.opened.connect(lambda tab: self.tabStack.addTab(tab, True))
+        opener.start()
 
 
     def handleSave(self):
         """
         Save the current level
         """
-        ...
+        tab = self.tabStack.currentWidget()
+        if not isinstance(tab, TabView_2DLevel): return
+
+        if tab.filePath is None:
+            self.handleSaveAs()
+        else:
+            self.saveLevelTo(tab, tab.filePath)
 
 
     def handleSaveAs(self):
         """
         Save the current level to a different file
         """
-        ...
+        tab = self.tabStack.currentWidget()
+        if not isinstance(tab, TabView_2DLevel): return
+
+        fn = self.askSaveFileName(tab)
+        if fn and self.saveLevelTo(tab, fn):
+            tab.setFilePath(fn)
+            self.tabStack.updateTabInfo(tab)
 
 
     def handleSaveCopyAs(self):
         """
         Save the current level to a different file, but do not keep track of this filename
         """
-        ...
+        tab = self.tabStack.currentWidget()
+        if not isinstance(tab, TabView_2DLevel): return
+
+        fn = self.askSaveFileName(tab)
+        if fn: self.saveLevelTo(tab, fn)
+
+
+    def askSaveFileName(self, tab):
+        """
+        Ask the user where to save the level in tab. Returns '' if they
+        cancel.
+        """
+        levelObj = tab.levelObj
+        fileExt = _('[name] (*.[ext])', '[name]', levelObj.TYPE_NAME, '[ext]', levelObj.FILE_EXTENSION)
+        return QtWidgets.QFileDialog.getSaveFileName(self, _('Choose a new filename'), tab.filePath or '', fileExt)[0]
+
+
+    def saveLevelTo(self, tab, fn):
+        """
+        Save the level in tab to fn. Returns True if that worked.
+        """
+        # Besides I/O errors, encoding the level can fail in ways only
+        # the game module knows about (values that don't fit, etc.);
+        # those leave the file untouched too
+        try:
+            tab.levelObj.saveToFile(fn)
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self, _('Reggie Next'), _('The level could not be saved: [err]', '[err]', str(e)))
+            return False
+
+        # The level now matches the file exactly, so reopening it can
+        # skip parsing
+        try:
+            cache = getLevelCache()
+            cache.put(cache.keyForFile(fn), tab.levelObj.cacheState())
+        except OSError:
+            pass
+
+        return True
 
 
     def handleScreenshot(self):
@@ -2242,6 +4082,26 @@ class ReggieNextWindow(QtWidgets.QMainWindow):
         self.tabStack.getCurrentView().scene().update()
 
 
+    def handleHardwareAccelerationToggle(self, checked):
+        """
+        Handle toggling of OpenGL level view viewports
+        """
+        views = list(self.tabStack.allViewsIter())
+        if checked and getOpenGLInfo() is None:
+            success = False
+        elif views:
+            success = all([view.setHardwareAccelerated(checked) for view in views])
+        else:
+            # Nothing to switch yet; going by getOpenGLInfo() alone
+            success = checked
+
+        if checked and not success:
+            QtWidgets.QMessageBox.warning(self, _('Reggie Next'),
+                _('OpenGL is not available on this system, so level views will continue to be drawn without hardware acceleration.'))
+
+        self.setSetting('HardwareAcceleration', checked and success)
+
+
     def handleZoomMax(self):
         """
         Handle zooming to the maximum size
@@ -2281,8 +4141,40 @@ class ReggieNextWindow(QtWidgets.QMainWindow):
         """
         Handle reloading graphics
         """
-        ...
         # Requested by Grop: reload spritedata before reload tileset data
+        spriteDataCatalogs.clear()
+        spriteSearchIndexes.clear()
+
+        for catalog in tilesetCatalogs.values():
+            catalog.clear()
+        getObjectPixmapCache().clear()
+
+        for i in range(self.tabStack.viewStack.count()):
+            tab = self.tabStack.viewStack.widget(i)
+            if isinstance(tab, TabView_2DLevel):
+                tab.reloadTilesets()
+
+
+    def handleAreaTilesets(self):
+        """
+        Let the user choose the tilesets of the current area
+        """
+        tab = self.tabStack.currentWidget()
+        if not isinstance(tab, TabView_2DLevel): return
+
+        area = tab.tabs.currentIndex()
+        names = tab.levelObj.areaTilesetNames(area)
+        if tab.tilesets is None or not names:
+            QtWidgets.QMessageBox.information(self, _('Area Tilesets'),
+                _("This level's tilesets can't be changed. Make sure the game's folder has been chosen in Open Level by Name."))
+            return
+
+        dlg = TilesetPickerDialog(self, tab.tilesets, names)
+        accepted = dlg.exec_() == QtWidgets.QDialog.Accepted
+        names = dlg.names()
+        dlg.deleteLater()
+        if accepted:
+            tab.setAreaTilesets(area, names)
 
 
     def handleAboutReggieNext(self):
@@ -2360,8 +4252,13 @@ class ReggieNextWindow(QtWidgets.QMainWindow):
 
         # Remove empty labels
         labels = [label for label in labels if label]
+        text = _('; ').join(labels)
 
-        self.statusLabel.setText(_('; ').join(labels))
+        # Setting a QLabel's text triggers a relayout of the statusbar,
+        # so skip it if nothing changed
+        if text == self.statusbarText: return
+        self.statusbarText = text
+        self.statusLabel.setText(text)
 
 
 
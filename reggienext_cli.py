@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+# reggienext_cli.py
+# Headless command-line interface for batch operations on many level
+# files at once, without opening a window.
+#
+# Usage: python3 reggienext_cli.py OPERATION [options] PATH [PATH ...]
+# PATHs may be files or folders (searched recursively). Run with -h
+# for the list of operations.
+
+
+################################################################
+################################################################
+
+# Imports
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import sys
+
+# Game modules need a QGuiApplication for their icons, but there's no
+# reason for that to need a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5 import QtGui
+
+import reggienext
+
+
+# Globals
+app = None
+
+
+
+def initWorker():
+    """
+    Set up a process (the main one, or a pool worker) to load levels:
+    create a windowless application and load the game modules
+    """
+    global app
+    if app is not None: return
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    app = QtGui.QGuiApplication(['reggienext_cli'])
+    reggienext.app = app
+    reggienext.loadGameModules()
+
+
+def loadLevel(path, writable=False):
+    """
+    Load and fully parse the level at path. Raises ValueError if it
+    isn't a recognized level file. writable must be True if the level
+    will be saved back to path (see reggienext.readLevelFile()).
+    """
+    levelClass, data = reggienext.readLevelFile(path, writable)
+    if levelClass is None:
+        raise ValueError('not a recognized level file')
+
+    levelObj = levelClass.loadFromBytes(data)
+    for progress in levelObj.preload(): pass
+    return levelObj
+
+
+def opValidate(path, args):
+    """
+    Check that the level loads, and report its type
+    """
+    levelObj = loadLevel(path)
+    return {'type': levelObj.TYPE_NAME}
+
+
+def opResave(path, args):
+    """
+    Load the level and save it again, in place or to args.out_dir
+    """
+    levelObj = loadLevel(path, writable=not args.out_dir)
+    dest = path
+    if args.out_dir:
+        dest = os.path.join(args.out_dir, os.path.relpath(path, args.base))
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+    levelObj.saveToFile(dest)
+    return {'savedTo': dest}
+
+
+def opSprites(path, args):
+    """
+    Count the sprites in the level by type
+    """
+    counts = collections.Counter(int(t) for t in loadLevel(path).spriteTypes())
+    if args.sprite is not None:
+        counts = {t: counts[t] for t in args.sprite if counts[t]}
+    return {'sprites': dict(counts)}
+
+
+def opTileset(path, args):
+    """
+    Report which of the requested tilesets the level uses
+    """
+    used = loadLevel(path).tilesetNames()
+    return {'tilesets': sorted(used & set(args.name))}
+
+
+OPERATIONS = {
+    'validate': opValidate,
+    'resave': opResave,
+    'sprites': opSprites,
+    'tileset': opTileset,
+    }
+
+
+def processFile(path, args):
+    """
+    Run the operation on one file (in a worker process). Returns
+    (path, result dict); failures are reported in the result rather
+    than raised, so one bad file doesn't stop the batch.
+    """
+    initWorker()
+    try:
+        return path, OPERATIONS[args.operation](path, args)
+    except Exception as e:
+        return path, {'error': str(e) or e.__class__.__name__}
+
+
+def findFiles(paths):
+    """
+    Expand folders in paths into the files they contain
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                files.extend(os.path.join(dirpath, fn) for fn in sorted(filenames))
+        else:
+            files.append(path)
+    return [os.path.abspath(f) for f in files]
+
+
+def runBatch(files, args):
+    """
+    Generator that runs the operation on every file, spread across a
+    process pool, and yields (path, result) in order
+    """
+    if args.jobs == 1 or len(files) == 1:
+        for path in files:
+            yield processFile(path, args)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(args.jobs, initializer=initWorker) as pool:
+        chunksize = max(1, len(files) // ((args.jobs or os.cpu_count() or 1) * 4))
+        yield from pool.map(processFile, files, [args] * len(files), chunksize=chunksize)
+
+
+def printResult(path, result, args):
+    """
+    Print the result for one file
+    """
+    if 'error' in result:
+        print('%s: ERROR: %s' % (path, result['error']))
+    elif args.operation == 'validate':
+        print('%s: OK (%s)' % (path, result['type']))
+    elif args.operation == 'resave':
+        print('%s: saved to %s' % (path, result['savedTo']))
+    elif args.operation == 'sprites':
+        if args.per_level:
+            counts = ', '.join('%d (x%d)' % item for item in sorted(result['sprites'].items()))
+            print('%s: %s' % (path, counts or 'no sprites'))
+    elif args.operation == 'tileset':
+        if result['tilesets']:
+            print('%s: %s' % (path, ', '.join(result['tilesets'])))
+
+
+def main():
+    """
+    Run the command-line interface
+    """
+    parser = argparse.ArgumentParser(description='Run batch operations on level files without opening Reggie Next.')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--json', metavar='FILE', help='also write the results to FILE as JSON')
+    subparsers = parser.add_subparsers(dest='operation', metavar='OPERATION')
+    subparsers.required = True
+
+    sub = subparsers.add_parser('validate', help='check that levels load')
+    sub.add_argument('paths', nargs='+', metavar='PATH')
+
+    sub = subparsers.add_parser('resave', help='load and save levels again')
+    sub.add_argument('-o', '--out-dir', help='save to this folder instead of overwriting the originals')
+    sub.add_argument('paths', nargs='+', metavar='PATH')
+
+    sub = subparsers.add_parser('sprites', help='count sprites by ID')
+    sub.add_argument('-s', '--sprite', type=int, action='append', help='only count this sprite ID (may be repeated)')
+    sub.add_argument('--per-level', action='store_true', help='print counts for every level, not just the total')
+    sub.add_argument('paths', nargs='+', metavar='PATH')
+
+    sub = subparsers.add_parser('tileset', help='find levels that use a tileset')
+    sub.add_argument('-n', '--name', action='append', required=True, help='tileset name, such as Pa1_nohara (may be repeated)')
+    sub.add_argument('paths', nargs='+', metavar='PATH')
+
+    args = parser.parse_args()
+
+    # initWorker() changes to the install folder, so every path given
+    # on the command line has to be made absolute before it runs
+    if args.json: args.json = os.path.abspath(args.json)
+    if getattr(args, 'out_dir', None): args.out_dir = os.path.abspath(args.out_dir)
+
+    files = findFiles(args.paths)  # already absolute
+    # resave -o keeps the folder structure below this
+    args.base = os.path.commonpath(files) if files else ''
+    if os.path.isfile(args.base): args.base = os.path.dirname(args.base)
+
+    results = {}
+    totals = collections.Counter()
+    failures = 0
+    for path, result in runBatch(files, args):
+        results[path] = result
+        printResult(path, result, args)
+        if 'error' in result:
+            failures += 1
+        elif args.operation == 'sprites':
+            totals.update(result['sprites'])
+
+    if args.operation == 'sprites':
+        print('Total:')
+        for spriteType, count in sorted(totals.items()):
+            print('  sprite %d: %d' % (spriteType, count))
+    print('%d file(s), %d failed' % (len(files), failures))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
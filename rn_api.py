@@ -30,10 +30,14 @@
 ################################################################
 
 import os
+import re
+import stat
+import tempfile
 
 from PyQt5 import QtWidgets, QtGui, QtCore
 
 import reggienext
+from lib import overlay, resourcetables
 
 
 # Enums
@@ -52,6 +56,8 @@ class RLevel:
     TYPE_NAME = ''
     TEMPLATES = ()
     FILE_EXTENSION = 'bin'
+    MAGIC = None  # bytes that files of this type have at MAGIC_OFFSET
+    MAGIC_OFFSET = 0
 
     itemTypes = ()
 
@@ -76,15 +82,55 @@ class RLevel:
         """
         Return True if the data appears to encode a level of this type; False otherwise.
         Should be very fast in execution, yet robust enough to distinguish correctly most
-        of the time.
+        of the time. data is only the start of the file (lib.detect.HEADER_SIZE bytes).
+        If MAGIC is set, this is only called for files that have it.
         """
         return False
 
 
+    @classmethod
+    def summarize(cls, header):
+        """
+        Return a dict of facts worth showing about a level before it's
+        opened (in a level browser, say), given only the start of its
+        file (lib.detect.HEADER_SIZE bytes). May be empty.
+        """
+        return {}
+
+
     @classmethod
     def loadFromBytes(cls, data):
         """
-        Load the level from binary data
+        Load the level from binary data. data may be any buffer (bytes,
+        memoryview, mmap...); avoid copying it where possible.
+        """
+        pass
+
+
+    def preload(self):
+        """
+        Generator that does any expensive parsing up front, yielding
+        its progress (0 to 1) now and then. Runs in a worker thread
+        while the level is being opened, so it must not touch the GUI,
+        and it may be abandoned between any two yields.
+        """
+        return
+        yield
+
+
+    def cacheState(self):
+        """
+        Return picklable data that lets restoreCacheState() skip
+        parsing the same file next time, or None if there's nothing
+        worth caching. Only called when the level matches its file.
+        """
+        return None
+
+
+    def restoreCacheState(self, state):
+        """
+        Apply data returned by cacheState() for the same file, right
+        after loadFromBytes(). preload() isn't called afterwards.
         """
         pass
 
@@ -96,6 +142,38 @@ class RLevel:
         return b''
 
 
+    def saveTo(self, f):
+        """
+        Write the level to f, a writable and seekable binary file.
+        Override this to stream the level out instead of building it
+        in memory; the default just writes the result of save().
+        """
+        f.write(self.save())
+
+
+    def saveToFile(self, path):
+        """
+        Save the level to the file at path. The level is written to a
+        temporary file first, which then replaces the original, so a
+        failed save never leaves a half-written level behind.
+        """
+        fd, tempPath = tempfile.mkstemp(prefix='.' + os.path.basename(path), suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self.saveTo(f)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # mkstemp() makes the file readable only by its owner, so
+            # give it the permissions of the file it replaces
+            if os.path.exists(path):
+                os.chmod(tempPath, stat.S_IMODE(os.stat(path).st_mode))
+            os.replace(tempPath, path)
+        except BaseException:
+            os.unlink(tempPath)
+            raise
+
+
     @classmethod
     def addItemType(cls, t):
         """
@@ -113,6 +191,103 @@ class RLevel_2D(RLevel):
     DIMENSIONS = DIMENSIONS_2D
 
 
+    def areaCount(self):
+        """
+        Return the number of areas in the level
+        """
+        return 1
+
+
+    def createItems(self, area):
+        """
+        Generator that yields the RLevelItem_2D's for area (0-based).
+        The caller adds them to the scene a few at a time, between
+        which the GUI keeps running.
+        """
+        return
+        yield
+
+
+    def spriteTypes(self):
+        """
+        Return an iterable of the type (ID) of every sprite in the
+        level, in all areas
+        """
+        return ()
+
+
+    def tilesetNames(self):
+        """
+        Return the set of names of the tilesets the level uses
+        """
+        return set()
+
+
+    def areaTilesetNames(self, area):
+        """
+        Return the list of tileset names area (0-based) uses, one per
+        slot ('' for empty slots), or an empty list if the level type
+        doesn't have tileset slots
+        """
+        return []
+
+
+    def setAreaTilesetNames(self, area, names):
+        """
+        Change the tilesets area uses to names, a list like the one
+        areaTilesetNames() returns
+        """
+        pass
+
+
+    def tilesetImageLoaded(self, filename, image):
+        """
+        Called with the decoded image (a QImage) of one of the tilesets
+        the level uses, once it's ready
+        """
+        pass
+
+
+    @classmethod
+    def loadTilesetImage(cls, data):
+        """
+        Return a QImage of all of the tiles in a tileset file of this
+        level type (data is its contents), or None if there's nothing
+        to show. Called from worker threads, so it mustn't touch the
+        GUI or use QPixmaps.
+        """
+        return None
+
+
+    @classmethod
+    def loadTilesetObjects(cls, data):
+        """
+        Return the object definitions in a tileset file of this level
+        type (data is its contents) as a list indexed by object number,
+        or None if it has none. Presenters use them to draw objects.
+        """
+        return None
+
+
+    def itemColumns(self, area):
+        """
+        Return a list of (lib.itemcolumns.ItemColumns, presenter class)
+        pairs for area. Items stored this way don't get a scene item
+        each; instead, a few presenters (RLevelItemPresenter_2D
+        subclasses) are bound to whichever ones are visible.
+        """
+        return []
+
+
+    def releaseArea(self, area):
+        """
+        Called when area's items have been thrown away, to free
+        anything cached for it. createItems() and itemColumns() must
+        still work for it afterwards.
+        """
+        pass
+
+
 
 class RLevelItem_2D(QtWidgets.QGraphicsItem):
     """
@@ -124,7 +299,93 @@ class RLevelItem_2D(QtWidgets.QGraphicsItem):
         """
         Initialize the item
         """
-        ...
+        super().__init__()
+
+
+
+class RLevelItemPresenter_2D(RLevelItem_2D):
+    """
+    A scene item that displays one item from a
+    lib.itemcolumns.ItemColumns. Presenters are created only for the
+    items that are visible, and are rebound to other items as the view
+    scrolls, so they mustn't keep any state of their own.
+    """
+    FILL = QtGui.QColor(0, 92, 196, 120)
+    OUTLINE = QtGui.QColor(0, 92, 196)
+
+    def __init__(self):
+        """
+        Initialize the presenter
+        """
+        super().__init__()
+        self.columns = None
+        self.index = None
+        self.rect = QtCore.QRectF()
+
+        # Shared by all presenters of a level, and set by the editor:
+        # the game's tileset catalog, or None if it isn't available
+        self.resources = None
+
+
+    def bind(self, columns, index):
+        """
+        Display item index of columns
+        """
+        self.columns = columns
+        self.index = index
+
+        scale = columns.unitsPerTile
+        self.prepareGeometryChange()
+        self.rect = QtCore.QRectF(0, 0, columns.width[index] / scale, columns.height[index] / scale)
+        self.setPos(columns.x[index] / scale, columns.y[index] / scale)
+        self.update()
+
+
+    def unbind(self):
+        """
+        Stop displaying any item
+        """
+        self.columns = self.index = None
+
+
+    def boundingRect(self):
+        """
+        Return the rectangle the presenter draws in
+        """
+        return self.rect
+
+
+    def label(self):
+        """
+        Return the text to draw on the item
+        """
+        return str(self.columns.type[self.index])
+
+
+    def usesTileset(self, filename):
+        """
+        Return True if the presenter draws from the named tileset, and
+        so needs redrawing once it's decoded
+        """
+        return False
+
+
+    def paint(self, painter, option, widget=None):
+        """
+        Draw the item as a labeled box. Subclasses should draw it
+        properly.
+        """
+        if self.columns is None: return
+
+        painter.setPen(QtGui.QPen(self.OUTLINE, 0))
+        painter.setBrush(self.FILL)
+        painter.drawRect(self.rect)
+
+        font = painter.font()
+        font.setPointSizeF(0.4)
+        painter.setFont(font)
+        painter.setPen(QtCore.Qt.white)
+        painter.drawText(self.rect, QtCore.Qt.AlignCenter, self.label())
 
 
 
@@ -159,6 +420,10 @@ def rIcon(name):
     return currentGameObj.getIcon(name)
 
 
+def rFrameScheduler():
+    return reggienext.getFrameScheduler()
+
+
 
 def _(*args):
     return reggienext._(*args)
@@ -197,6 +462,7 @@ class _GameObj:
         Clone this game obj from other
         """
         self.parentObj = other
+        self.mainInfo = None
 
         self.gameIcon = other.gameIcon
         self.gameName = other.gameName
@@ -208,6 +474,7 @@ class _GameObj:
         Set up a new game obj
         """
         self.parentObj = None
+        self.mainInfo = None
 
         self.gameIcon = None
         self.gameName = ''
@@ -238,6 +505,41 @@ class _GameObj:
         return initialList
 
 
+    def getTable(self, name, parser):
+        """
+        Return the keyed table in the file called name, parsed with
+        parser (see lib.overlay), as this game's copy laid over the
+        tables of its parents. Only the differences are kept in memory.
+        """
+        return overlay.resolve(self.getFiles(name), parser)
+
+
+    def getResourceTable(self, name):
+        """
+        Return the lib.resourcetables.ResourceTable for a resource file
+        such as 'bga.txt' or 'music.txt'
+        """
+        return resourcetables.loadTable(self.getFiles(name), resourcetables.FORMATS[name])
+
+
+    def getMainInfo(self):
+        """
+        Return the attributes of the most specific main.xml (the game's
+        name, levelFolder, fileExt...) as a dict
+        """
+        if self.mainInfo is None:
+            self.mainInfo = {}
+            paths = self.getFiles('main.xml')
+            if paths:
+                # These files aren't always well-formed XML (some have
+                # bare attributes), so just pick the <game> tag apart
+                with open(paths[-1], 'r', encoding='utf-8', errors='replace') as f:
+                    tag = re.search(r'<game\b([^>]*)>', f.read())
+                if tag is not None:
+                    self.mainInfo = dict(re.findall(r'(\w+)="([^"]*)"', tag.group(1)))
+        return self.mainInfo
+
+
     def getIcon(self, name):
         """
         Get the icon called name
@@ -0,0 +1,245 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# test_compression.py
+# Tests for lib.compression, against data compressed by small reference
+# encoders for each format
+
+
+################################################################
+################################################################
+
+# Imports
+import os
+import struct
+import tempfile
+import unittest
+
+from lib import compression
+
+
+# Tokens are ('lit', byte) or ('ref', displacement, length). This
+# stream covers overlapping and non-overlapping back-references of
+# every length class the formats have.
+TOKENS = (
+    [('lit', b) for b in b'ABCDEFGH']
+    + [('ref', 1, 20), ('ref', 8, 8), ('ref', 3, 5)]
+    + [('lit', b) for b in b'xyz']
+    + [('ref', 16, 16), ('ref', 2, 0x111 + 300), ('ref', 40, 0x11 + 100)]
+    + [('lit', 0x10)]
+    )
+
+
+
+def expand(tokens):
+    """
+    Return the data tokens decompress to, one byte at a time
+    """
+    out = bytearray()
+    for token in tokens:
+        if token[0] == 'lit':
+            out.append(token[1])
+        else:
+            for i in range(token[2]):
+                out.append(out[-token[1]])
+    return bytes(out)
+
+
+def splitReferences(tokens, maxLength):
+    """
+    Split references longer than maxLength into several, none of them
+    shorter than 3 bytes
+    """
+    split = []
+    for token in tokens:
+        while token[0] == 'ref' and token[2] > maxLength:
+            length = min(maxLength, token[2] - 3)
+            split.append(('ref', token[1], length))
+            token = ('ref', token[1], token[2] - length)
+        split.append(token)
+    return split
+
+
+def encodeLZ10(tokens):
+    """
+    Encode tokens as LZ10
+    """
+    size = len(expand(tokens))
+    split = splitReferences(tokens, 18)
+    out = bytearray([compression.LZ10, size & 0xFF, size >> 8 & 0xFF, size >> 16])
+    for i in range(0, len(split), 8):
+        group = split[i:i + 8]
+        out.append(sum(0x80 >> bit for bit, t in enumerate(group) if t[0] == 'ref'))
+        for token in group:
+            if token[0] == 'lit':
+                out.append(token[1])
+            else:
+                disp, length = token[1] - 1, token[2]
+                out += bytes([(length - 3) << 4 | disp >> 8, disp & 0xFF])
+    return bytes(out)
+
+
+def encodeLZ11(tokens, extendedSize=False):
+    """
+    Encode tokens as LZ11. If extendedSize, the size is stored in the
+    4-byte field that's normally used for sizes over 16 MB.
+    """
+    size = len(expand(tokens))
+    if extendedSize:
+        out = bytearray([compression.LZ11, 0, 0, 0]) + struct.pack('<I', size)
+    else:
+        out = bytearray([compression.LZ11, size & 0xFF, size >> 8 & 0xFF, size >> 16])
+
+    for i in range(0, len(tokens), 8):
+        group = tokens[i:i + 8]
+        out.append(sum(0x80 >> bit for bit, t in enumerate(group) if t[0] == 'ref'))
+        for token in group:
+            if token[0] == 'lit':
+                out.append(token[1])
+                continue
+            disp, length = token[1] - 1, token[2]
+            if length <= 16:
+                out += bytes([(length - 1) << 4 | disp >> 8, disp & 0xFF])
+            elif length <= 0x110:
+                v = length - 0x11
+                out += bytes([v >> 4, (v & 0xF) << 4 | disp >> 8, disp & 0xFF])
+            else:
+                v = length - 0x111
+                out += bytes([0x10 | v >> 12, v >> 4 & 0xFF, (v & 0xF) << 4 | disp >> 8, disp & 0xFF])
+    return bytes(out)
+
+
+def encodeYaz0(tokens):
+    """
+    Encode tokens as Yaz0
+    """
+    out = bytearray(compression.YAZ0_MAGIC + struct.pack('>I', len(expand(tokens))) + bytes(8))
+    tokens = splitReferences(tokens, 0x111)
+    for i in range(0, len(tokens), 8):
+        group = tokens[i:i + 8]
+        out.append(sum(0x80 >> bit for bit, t in enumerate(group) if t[0] == 'lit'))
+        for token in group:
+            if token[0] == 'lit':
+                out.append(token[1])
+                continue
+            disp, length = token[1] - 1, token[2]
+            if length <= 17:
+                out += bytes([(length - 2) << 4 | disp >> 8, disp & 0xFF])
+            else:
+                out += bytes([disp >> 8, disp & 0xFF, length - 0x12])
+    return bytes(out)
+
+
+
+class DecompressionTests(unittest.TestCase):
+    """
+    Tests for decompressing each format
+    """
+    def testLZ10(self):
+        data = encodeLZ10(TOKENS)
+        self.assertEqual(compression.detectCompression(data), 'lz10')
+        self.assertEqual(bytes(compression.decompress(data)), expand(TOKENS))
+        self.assertEqual(bytes(compression.decompress(compression.LZ77_MAGIC + data)), expand(TOKENS))
+
+
+    def testLZ11(self):
+        for extendedSize in (False, True):
+            data = encodeLZ11(TOKENS, extendedSize)
+            self.assertEqual(compression.detectCompression(data), 'lz11')
+            self.assertEqual(bytes(compression.decompress(data)), expand(TOKENS))
+
+
+    def testYaz0(self):
+        data = encodeYaz0(TOKENS)
+        self.assertEqual(compression.detectCompression(data), 'yaz0')
+        self.assertEqual(bytes(compression.decompress(data)), expand(TOKENS))
+
+
+    def testTruncated(self):
+        for data in (encodeLZ10(TOKENS), encodeLZ11(TOKENS)):
+            with self.assertRaises(compression.CompressionError):
+                compression.decompressLZ77(data[:-2])
+        with self.assertRaises(compression.CompressionError):
+            compression.decompressYaz0(encodeYaz0(TOKENS)[:-2])
+
+
+    def testBadBackReference(self):
+        # One literal, then a reference two bytes back
+        data = bytes([compression.LZ10, 4, 0, 0, 0x40, 1, 0x00, 0x01])
+        with self.assertRaises(compression.CompressionError):
+            compression.decompress(data)
+
+
+    def testUncompressed(self):
+        # Starts with 0x10, but claims to expand far more than LZ10 can
+        data = b'\x10\xFF\xFF\xFF plain text'
+        self.assertIsNone(compression.detectCompression(data))
+        self.assertEqual(compression.decompress(data), data)
+        self.assertEqual(compression.detectCompression(data, 1 << 24), 'lz10')
+
+        self.assertIsNone(compression.detectCompression(b'\x11\0\0\0'))
+        self.assertIsNone(compression.detectCompression(b'U\xAA8-'))
+
+
+
+class DecompressFilesTests(unittest.TestCase):
+    """
+    Tests for decompressing many files, some of which are broken
+    """
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.files = {
+            'a.bin': encodeLZ10(TOKENS),
+            'b.bin': encodeYaz0(TOKENS),
+            'broken.bin': encodeLZ11(TOKENS)[:20],
+            'c.bin': encodeLZ11(TOKENS),
+            'plain.txt': b'not compressed',
+            }
+        for name, data in self.files.items():
+            with open(os.path.join(self.folder.name, name), 'wb') as f:
+                f.write(data)
+
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+
+    def checkResults(self, results):
+        results = {os.path.basename(path): (data, error) for path, data, error in results}
+        self.assertEqual(sorted(results), sorted(self.files))
+        for name in ('a.bin', 'b.bin', 'c.bin'):
+            self.assertEqual(results[name], (expand(TOKENS), None))
+        self.assertEqual(results['plain.txt'], (b'not compressed', None))
+        self.assertIsNone(results['broken.bin'][0])
+        self.assertTrue(results['broken.bin'][1])
+
+
+    def testSerial(self):
+        paths = [os.path.join(self.folder.name, name) for name in sorted(self.files)]
+        self.checkResults(compression.tryDecompressFile(path) for path in paths)
+
+
+    def testPool(self):
+        self.assertGreaterEqual(len(self.files), compression.MIN_POOL_BATCH)
+        self.checkResults(compression.decompressFolder(self.folder.name, processes=2))
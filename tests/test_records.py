@@ -0,0 +1,108 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# test_records.py
+# Round-trip tests for lib.records: NumPy and struct decoding must agree
+
+
+################################################################
+################################################################
+
+# Imports
+import struct
+import unittest
+
+from lib import records
+
+
+SPRITE_FORMAT = records.RecordFormat('Sprite', '>HHH8s2x', ('type', 'x', 'y', 'data'), terminated=True, terminatorSize=4)
+OBJECT_FORMAT = records.RecordFormat('Object', '>HHHHH', ('type', 'x', 'y', 'width', 'height'), terminated=True, terminatorSize=2)
+ZONE_FORMAT = records.RecordFormat('Zone', '>HhBxfI', ('x', 'y', 'id', 'speed', 'flags'))
+
+SPRITES = [
+    (20, 100, 200, b'\0\0\0\0\0\x05\0\0'),  # trailing NULs
+    (21, 0, 0, b'\0' * 8),
+    (22, 65535, 1, b'\x10\0\0\0\0\0\0\x01'),
+    ]
+
+
+
+class RecordFormatTests(unittest.TestCase):
+    """
+    Tests for RecordFormat and RecordTable
+    """
+    def decodeBoth(self, fmt, data):
+        """
+        Decode data with both backends (just struct if NumPy is missing)
+        """
+        tables = [fmt.decode(data, useNumpy=False)]
+        if records.numpy is not None:
+            tables.append(fmt.decode(data, useNumpy=True))
+        return tables
+
+
+    def testMatchesStruct(self):
+        data = SPRITE_FORMAT.encode(SPRITES)
+        expected = [r for r in struct.iter_unpack('>HHH8s2x', data[:-SPRITE_FORMAT.terminatorSize])]
+        for table in self.decodeBoth(SPRITE_FORMAT, data):
+            self.assertEqual(table.tuples(), expected)
+            self.assertEqual([tuple(r) for r in table], expected)
+            self.assertEqual(tuple(table[0]), expected[0])
+            self.assertEqual(table[1].data, b'\0' * 8)
+            self.assertEqual([tuple(r) for r in table[1:]], expected[1:])
+
+
+    def testRoundTrip(self):
+        data = SPRITE_FORMAT.encode(SPRITES)
+        for table in self.decodeBoth(SPRITE_FORMAT, data):
+            self.assertEqual(SPRITE_FORMAT.encode(table.tuples()), data)
+
+
+    def testTerminator(self):
+        data = SPRITE_FORMAT.encode(SPRITES) + SPRITE_FORMAT.encode(SPRITES)
+        for table in self.decodeBoth(SPRITE_FORMAT, data):
+            self.assertEqual(len(table), len(SPRITES))
+
+
+    def testTerminatorSize(self):
+        # Retail files end sprites with 4 0xFF bytes and objects with 2
+        data = SPRITE_FORMAT.encode(SPRITES)
+        self.assertEqual(len(data), len(SPRITES) * SPRITE_FORMAT.size + 4)
+        self.assertEqual(data[-4:], b'\xFF' * 4)
+
+        objects = [(0x1001, 2, 3, 4, 5), (7, 0, 0, 1, 1)]
+        data = OBJECT_FORMAT.encode(objects)
+        self.assertEqual(data, struct.pack('>5H5H', *objects[0], *objects[1]) + b'\xFF\xFF')
+        for table in self.decodeBoth(OBJECT_FORMAT, data):
+            self.assertEqual(table.tuples(), objects)
+        for table in self.decodeBoth(OBJECT_FORMAT, data + bytes(8)):
+            self.assertEqual(table.tuples(), objects)
+
+
+    def testSignedAndFloatFields(self):
+        rows = [(1, -2, 3, 0.5, 0xDEADBEEF), (65535, -32768, 255, -1.25, 0)]
+        data = ZONE_FORMAT.encode(rows)
+        for table in self.decodeBoth(ZONE_FORMAT, data):
+            self.assertEqual(table.tuples(), rows)
+            self.assertEqual(list(table.column('y')), [-2, -32768])
@@ -0,0 +1,172 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# test_spritedata.py
+# Tests for lib.spritedata's field codecs: SpriteField, the generated
+# getters and the column-wide NumPy and pure-Python paths must agree
+
+
+################################################################
+################################################################
+
+# Imports
+import random
+import unittest
+import xml.etree.ElementTree as etree
+
+from lib import itemcolumns, spritedata
+
+
+FIELD_XML = [
+    '<value nybble="5" title="One nybble" />',
+    '<value nybble="3-6" title="Across bytes" />',
+    '<list nybble="12" title="List"><entry value="0">A</entry><entry value="3">B</entry></list>',
+    '<checkbox nybble="9" mask="4" title="Checkbox" />',
+    '<checkbox nybble="1" title="First nybble" />',
+    '<bitfield startbit="13" bitnum="7" title="Bitfield" />',
+    '<value nybble="1-12" title="First six bytes" />',
+    '<value nybble="16" title="Last nybble" />',
+    '<value nybble="11-14" title="Across nybble 12" />',
+    '<checkbox nybble="13" mask="8" title="Late checkbox" />',
+    '<bitfield startbit="54" bitnum="10" title="Last bits" />',
+    '<value nybble="1-16" title="Everything" />',
+    ]
+
+
+
+class SpriteFieldTests(unittest.TestCase):
+    """
+    Tests for reading and writing sprite settings fields
+    """
+    def setUp(self):
+        self.texts = []
+        self.fields = [spritedata.compileField(etree.fromstring(xml), self.texts) for xml in FIELD_XML]
+
+        rng = random.Random(5)
+        self.settings = [bytes(rng.randrange(256) for i in range(8)) for j in range(20)]
+        self.settings.append(bytes(8))
+        self.settings.append(b'\xFF' * 8)
+
+
+    def makeColumns(self):
+        """
+        Return ItemColumns holding one sprite per settings value, with
+        alternating types 1 and 2
+        """
+        columns = itemcolumns.ItemColumns(8, 16)
+        for i, data in enumerate(self.settings):
+            columns.append(1 + i % 2, 0, 0, 16, 16, 0, data)
+        return columns
+
+
+    def withoutNumpy(self, function, *args):
+        """
+        Call function with spritedata's NumPy support turned off
+        """
+        numpy = spritedata.numpy
+        try:
+            spritedata.numpy = None
+            return function(*args)
+        finally:
+            spritedata.numpy = numpy
+
+
+    def testLayout(self):
+        shifts = [(f.shift, f.mask) for f in self.fields]
+        self.assertEqual(shifts[0], (44, 0xF))
+        self.assertEqual(shifts[1], (40, 0xFFFF))
+        self.assertEqual(shifts[5], (44, 0x7F))
+        self.assertEqual(shifts[6], (16, (1 << 48) - 1))
+
+
+    def testLastNybbles(self):
+        # Nybbles 13-16 are the last two of the eight settings bytes
+        data = bytes.fromhex('000000000000a5c3')
+        settings = spritedata.settingsToInt(data)
+        self.assertEqual(spritedata.intToSettings(settings), data)
+
+        nybble16 = spritedata.compileField(etree.fromstring('<value nybble="16" />'), [])
+        self.assertEqual(nybble16.get(settings), 0x3)
+        self.assertEqual(spritedata.intToSettings(nybble16.set(settings, 0xE)), bytes.fromhex('000000000000a5ce'))
+
+        lastBits = spritedata.compileField(etree.fromstring('<bitfield startbit="54" bitnum="10" />'), [])
+        self.assertEqual(lastBits.get(settings), 0x1C3)
+        self.assertEqual(spritedata.intToSettings(lastBits.set(settings, 0)), bytes.fromhex('000000000000a400'))
+
+
+    def testGetters(self):
+        decoder = spritedata.compileDecoder(spritedata.SpriteDef(1, 'Test', tuple(self.fields)))
+        for data in self.settings:
+            settings = spritedata.settingsToInt(data)
+            expected = tuple(field.get(settings) for field in self.fields)
+            self.assertEqual(tuple(spritedata.fieldGetter(field)(data) for field in self.fields), expected)
+            self.assertEqual(decoder(data), expected)
+
+
+    def testSet(self):
+        for field in self.fields:
+            for data in self.settings:
+                settings = spritedata.settingsToInt(data)
+                for value in (0, 1, 5, field.mask, True, False):
+                    new = field.set(settings, value)
+                    if field.kind == 'checkbox':
+                        self.assertEqual(field.get(new), bool(value))
+                    else:
+                        self.assertEqual(field.get(new), value & field.mask)
+                    # Other bits are left alone
+                    self.assertEqual(new & ~(field.mask << field.shift), settings & ~(field.mask << field.shift))
+
+
+    def testFieldValues(self):
+        columns = self.makeColumns()
+        for field in self.fields:
+            expected = [field.get(spritedata.settingsToInt(data)) for data in self.settings]
+            for spriteType in (None, 2):
+                results = [self.withoutNumpy(spritedata.fieldValues, field, columns, spriteType)]
+                if spritedata.numpy is not None:
+                    results.append(spritedata.fieldValues(field, columns, spriteType))
+                for indices, values in results:
+                    indices = list(indices)
+                    self.assertEqual(indices, [i for i in range(len(expected)) if spriteType is None or i % 2 == 1])
+                    self.assertEqual([bool(v) if field.kind == 'checkbox' else int(v) for v in values],
+                                     [expected[i] for i in indices])
+
+
+    def testSetFieldValues(self):
+        indices = [0, 3, 4, 10, len(self.settings) - 1]
+        for field in self.fields:
+            for value in (0, 6, True, False):
+                expected = self.makeColumns()
+                for i in indices:
+                    settings = field.set(spritedata.settingsToInt(self.settings[i]), value)
+                    expected.data[i * 8:(i + 1) * 8] = spritedata.intToSettings(settings)
+
+                columns = self.makeColumns()
+                self.withoutNumpy(spritedata.setFieldValues, field, columns, indices, value)
+                self.assertEqual(columns.data, expected.data, (field.title, value))
+
+                if spritedata.numpy is not None:
+                    columns = self.makeColumns()
+                    spritedata.setFieldValues(field, columns, indices, value)
+                    self.assertEqual(columns.data, expected.data, (field.title, value))
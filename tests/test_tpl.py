@@ -0,0 +1,132 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# test_tpl.py
+# Tests for lib.tpl: the NumPy and pure-Python decoders must agree with
+# each other and with a pixel-by-pixel reference
+
+
+################################################################
+################################################################
+
+# Imports
+import random
+import struct
+import unittest
+
+from lib import tpl
+
+
+SIZES = [(4, 4), (8, 12), (10, 6), (3, 5)]
+
+
+
+def referencePixel(data, format, x, y, paddedWidth):
+    """
+    Return the ARGB32 value of one pixel, read straight from its block
+    """
+    block = (y // 4) * (paddedWidth // 4) + x // 4
+    idx = (y % 4) * 4 + x % 4
+
+    if format == tpl.FORMAT_RGBA8:
+        base = block * 64
+        a, r = data[base + idx * 2], data[base + idx * 2 + 1]
+        g, b = data[base + 32 + idx * 2], data[base + 33 + idx * 2]
+        return a << 24 | r << 16 | g << 8 | b
+
+    v = struct.unpack_from('>H', data, (block * 16 + idx) * 2)[0]
+    if v & 0x8000:
+        r, g, b = v >> 10 & 0x1F, v >> 5 & 0x1F, v & 0x1F
+        return 0xFF000000 | (r << 3 | r >> 2) << 16 | (g << 3 | g >> 2) << 8 | (b << 3 | b >> 2)
+    a = v >> 12 & 7
+    return (a << 5 | a << 2 | a >> 1) << 24 | (v >> 8 & 0xF) * 0x11 << 16 | (v >> 4 & 0xF) * 0x11 << 8 | (v & 0xF) * 0x11
+
+
+def referenceDecode(data, width, height, format):
+    """
+    Decode a texture one pixel at a time
+    """
+    paddedWidth = tpl.paddedSize(width, height)[0]
+    return b''.join(struct.pack('=I', referencePixel(data, format, x, y, paddedWidth))
+                    for y in range(height) for x in range(width))
+
+
+
+class TPLTests(unittest.TestCase):
+    """
+    Tests for decoding TPL textures
+    """
+    def randomTexture(self, width, height, format):
+        """
+        Return random texture data of the right size
+        """
+        paddedWidth, paddedHeight = tpl.paddedSize(width, height)
+        rng = random.Random(width * 1000 + height * 10 + format)
+        return bytes(rng.randrange(256) for i in range(paddedWidth * paddedHeight * tpl.PIXEL_SIZES[format]))
+
+
+    def decodeBoth(self, data, width, height, format):
+        """
+        Decode with both backends (just the fallback if NumPy is
+        missing)
+        """
+        results = []
+        numpy = tpl.numpy
+        try:
+            tpl.numpy = None
+            results.append(tpl.decodeTexture(data, width, height, format))
+        finally:
+            tpl.numpy = numpy
+        if numpy is not None:
+            results.append(tpl.decodeTexture(data, width, height, format))
+        return results
+
+
+    def testFormats(self):
+        for format in (tpl.FORMAT_RGB5A3, tpl.FORMAT_RGBA8):
+            for width, height in SIZES:
+                data = self.randomTexture(width, height, format)
+                expected = referenceDecode(data, width, height, format)
+                for pixels in self.decodeBoth(data, width, height, format):
+                    self.assertEqual(pixels, expected, (format, width, height))
+
+
+    def testDecodeTPL(self):
+        width, height, format = 10, 6, tpl.FORMAT_RGB5A3
+        texture = self.randomTexture(width, height, format)
+        header = tpl.TPL_MAGIC + struct.pack('>II', 1, 12) + struct.pack('>II', 20, 0)
+        header += tpl.TPL_IMAGE_HEADER.pack(height, width, format, 64, 0, 0)
+        data = header + bytes(64 - len(header)) + texture
+
+        self.assertEqual(tpl.parseTPL(data), [(format, width, height, 64)])
+        self.assertEqual(tpl.decodeTPL(data), (width, height, referenceDecode(texture, width, height, format)))
+
+
+    def testErrors(self):
+        with self.assertRaises(tpl.TPLError):
+            tpl.decodeTexture(bytes(8), 4, 4, tpl.FORMAT_RGBA8)
+        with self.assertRaises(tpl.TPLError):
+            tpl.decodeTexture(bytes(64), 4, 4, 14)
+        with self.assertRaises(tpl.TPLError):
+            tpl.parseTPL(b'Yaz0' + bytes(12))
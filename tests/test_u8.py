@@ -0,0 +1,111 @@
+#!/usr/bin/python
+# -*- coding: latin-1 -*-
+
+# Reggie Next - Level Editor
+# Version 1.0.0 "Amp"
+# Copyright (C) 2009-2015 Treeki, Tempus, angelsl, JasonP27, Kamek64,
+# MalStar1000, RoadrunnerWMC
+
+# This file is part of Reggie Next.
+
+# Reggie Next is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Reggie Next is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with Reggie Next.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# test_u8.py
+# Tests for lib.u8: parsing archives, and reading back what U8Writer wrote
+
+
+################################################################
+################################################################
+
+# Imports
+import io
+import struct
+import unittest
+
+from lib import u8
+
+
+FILES = {
+    'course/course1.bin': b'\x01\x02\x03',
+    'course/course1_bgdatL1.bin': bytes(range(256)) * 3,
+    'course/empty.bin': b'',
+    'readme.txt': b'hello',
+    }
+
+
+
+class U8Tests(unittest.TestCase):
+    """
+    Tests for U8Writer and U8Archive
+    """
+    def writeArchive(self, files):
+        """
+        Return the bytes of an archive holding files, a {path: contents}
+        dict; each file is written in two chunks
+        """
+        writer = u8.U8Writer()
+        for path, contents in files.items():
+            writer.addFile(path, iter([contents[:1], contents[1:]]))
+        f = io.BytesIO()
+        size = writer.write(f)
+        self.assertEqual(size, len(f.getvalue()))
+        return f.getvalue()
+
+
+    def testRoundTrip(self):
+        data = self.writeArchive(FILES)
+        self.assertTrue(u8.U8Archive.looksValid(data))
+        with u8.U8Archive(data) as arc:
+            self.assertEqual(sorted(arc.files), sorted(FILES))
+            for path, contents in FILES.items():
+                self.assertEqual(bytes(arc[path]), contents)
+                self.assertEqual(arc.files[path][0] % u8.DATA_ALIGNMENT, 0)
+            self.assertEqual(sorted(arc.listdir()), ['course', 'readme.txt'])
+            self.assertEqual(sorted(arc.listdir('course')), ['course1.bin', 'course1_bgdatL1.bin', 'empty.bin'])
+            self.assertIsNone(arc.get('missing.bin'))
+
+
+    def testHeaderOnly(self):
+        data = self.writeArchive(FILES)
+        dataOffset = struct.unpack_from('>I', data, 12)[0]
+        with u8.U8Archive(data[:dataOffset], checkBounds=False) as arc:
+            self.assertEqual(sorted(arc.files), sorted(FILES))
+
+
+    def testTruncated(self):
+        data = self.writeArchive(FILES)
+        for size in (0, 16, 40, len(data) - 1):
+            with self.assertRaises(u8.U8Error):
+                u8.U8Archive(data[:size])
+
+
+    def testRootOffsetPastEnd(self):
+        data = bytearray(self.writeArchive(FILES))
+        struct.pack_into('>I', data, 4, len(data) + 100)
+        with self.assertRaises(u8.U8Error):
+            u8.U8Archive(data)
+
+
+    def testNoRootNode(self):
+        data = bytearray(self.writeArchive(FILES))
+        struct.pack_into('>I', data, 0x28, 0)  # the root node's node count
+        with self.assertRaises(u8.U8Error):
+            u8.U8Archive(data)
+
+
+    def testNotU8(self):
+        self.assertFalse(u8.U8Archive.looksValid(b'Yaz0' + bytes(12)))
+        with self.assertRaises(u8.U8Error):
+            u8.U8Archive(b'Yaz0' + bytes(60))